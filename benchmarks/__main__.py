@@ -0,0 +1,120 @@
+"""Benchmark the DB and Cluster operations.
+
+    python -m benchmarks --records 10000,100000 --output results.json
+    python -m benchmarks --baseline results.json --threshold 0.2 --output new.json
+
+Every benchmark runs on generated values of each size and number of keys, and reports the
+operations per second, the median and 99th percentile latency and the peak memory of a run.
+With --baseline the run fails if the median latency of a benchmark grew by more than the threshold.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from . import suite  # noqa: F401, registers the benchmarks
+from .datasets import Dataset
+from .runner import BENCHMARKS
+from .runner import compare
+from .runner import Result
+from .runner import run
+
+RESULTS_VERSION = 1
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(part) for part in text.split(",")]
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-6:.1f}µs"
+
+
+def _format_size(size: int) -> str:
+    if size >= 2 ** 20:
+        return f"{size / 2 ** 20:.1f} MiB"
+    return f"{size / 2 ** 10:.1f} KiB"
+
+
+def _format_result(result: Result) -> str:
+    memory = "-" if result.peak_memory is None else _format_size(result.peak_memory)
+    return (f"{result.name:>22} {result.records:>9} {result.keys:>4} {result.ops_per_sec:>12.1f} "
+            f"{_format_time(result.p50):>10} {_format_time(result.p99):>10} {memory:>12}")
+
+
+def read_results(filename: str) -> List[Result]:
+    with open(filename) as f:
+        data = json.load(f)
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{filename!r} is not a results file of version {RESULTS_VERSION}")
+    return [Result(**result) for result in data["results"]]
+
+
+def write_results(filename: str, results: List[Result]) -> None:
+    data: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [result._asdict() for result in results],
+    }
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=_int_list, default=[10_000, 100_000, 1_000_000],
+                        help="the sizes of the datasets, comma separated (default: 10000,100000,1000000)")
+    parser.add_argument("--keys", type=_int_list, default=[4, 16],
+                        help="the number of keys of the datasets, comma separated (default: 4,16)")
+    parser.add_argument("--only", type=lambda text: text.split(","), default=None,
+                        help=f"the benchmarks to run, comma separated, out of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=None, help="the number of runs of every benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="don't measure the peak memory")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results to this JSON file of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="the allowed growth of the median latency over the baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    print(f"{'benchmark':>22} {'records':>9} {'keys':>4} {'ops/sec':>12} {'p50':>10} {'p99':>10} {'peak memory':>12}")
+    results: List[Result] = []
+    with tempfile.TemporaryDirectory() as directory:
+        for records in args.records:
+            for key_count in args.keys:
+                dataset = Dataset(records, key_count, directory)
+                for name in names:
+                    result = run(BENCHMARKS[name], dataset, args.repeat, memory=not args.no_memory)
+                    print(_format_result(result), flush=True)
+                    results.append(result)
+
+    if args.output:
+        write_results(args.output, results)
+
+    if args.baseline:
+        regressions = compare(read_results(args.baseline), results, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression.name} ({regression.records} records, {regression.keys} keys) "
+                  f"{_format_time(regression.baseline)} -> {_format_time(regression.current)} "
+                  f"({regression.ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
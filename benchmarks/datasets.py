@@ -0,0 +1,63 @@
+"""Generated values for the benchmarks, the same for every run"""
+import os
+import random
+from typing import Any
+from typing import Dict
+from typing import List
+
+from pysondb import DB
+
+# the keys of every dataset, the datasets with more keys add "field4", "field5", ...
+BASE_KEYS = ["name", "age", "email", "active"]
+
+
+class Dataset:
+    """The values of a benchmark and the files written from them, the files are only written once"""
+
+    def __init__(self, records: int, key_count: int, directory: str, seed: int = 0) -> None:
+        if key_count < len(BASE_KEYS):
+            raise ValueError(f"A dataset has at least {len(BASE_KEYS)} keys")
+
+        self.records = records
+        self.keys = BASE_KEYS + [f"field{i}" for i in range(len(BASE_KEYS), key_count)]
+        self.directory = directory
+        self._values = make_values(records, self.keys, seed)
+        self._files: Dict[str, str] = {}
+
+    def values(self) -> List[Dict[str, Any]]:
+        """A copy of the values, for the benchmarks that change them"""
+        return [dict(value) for value in self._values]
+
+    def db(self, **options: Any) -> DB:
+        """A DB holding the values, with the ids "1", "2", ..."""
+        db = DB(keys=self.keys, **options)
+        db.set_id_generator("counter")
+        db.add_many(self.values())
+        return db
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{self.records}-{len(self.keys)}-{name}")
+
+    def db_file(self, verify_data: bool = True) -> str:
+        """The path of a file written by `DB.commit` with the values, and with a header for `verify="auto"`"""
+        name = "db.json" if verify_data else "db-unverified.json"
+        if name not in self._files:
+            self._files[name] = self.path(name)
+            self.db(verify_data=verify_data).commit(self._files[name], header=True)
+        return self._files[name]
+
+
+def make_values(records: int, keys: List[str], seed: int = 0) -> List[Dict[str, Any]]:
+    rand = random.Random(seed)
+    values = []
+    for i in range(records):
+        value: Dict[str, Any] = {
+            "name": f"user{i}",
+            "age": rand.randrange(100),
+            "email": f"user{i}@example.com",
+            "active": rand.random() < 0.5,
+        }
+        for key in keys[len(BASE_KEYS):]:
+            value[key] = rand.randrange(1000) if rand.random() < 0.5 else f"{key}-{rand.randrange(1000)}"
+        values.append(value)
+    return values
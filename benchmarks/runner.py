@@ -0,0 +1,144 @@
+"""Timing, memory and comparison of the benchmarks"""
+import gc
+import math
+import time
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from .datasets import Dataset
+
+BenchmarkFunc = Callable[[Dataset, "Timer"], None]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: BenchmarkFunc
+    # the number of timed runs, the benchmarks of bulk operations need fewer runs
+    repeat: int
+
+
+class Result(NamedTuple):
+    name: str
+    records: int
+    keys: int
+    runs: int
+    ops_per_sec: float
+    p50: float
+    p99: float
+    # the largest number of bytes allocated at once during a run, None if memory was not measured
+    peak_memory: Optional[int]
+
+
+class Regression(NamedTuple):
+    name: str
+    records: int
+    keys: int
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, repeat: int = 20) -> Callable[[BenchmarkFunc], BenchmarkFunc]:
+    """Register a benchmark. It is called with a dataset and a timer, and times each operation with
+    `with timer:` in a `for _ in timer.runs():` loop, so the setup of every run is not timed."""
+    def register(func: BenchmarkFunc) -> BenchmarkFunc:
+        if name in BENCHMARKS:
+            raise ValueError(f"A benchmark named {name!r} already exists")
+        BENCHMARKS[name] = Benchmark(name, func, repeat)
+        return func
+    return register
+
+
+class Timer:
+    """Collects the duration of each run of a benchmark.
+
+    The memory is measured on an extra run after the timed runs, tracing the allocations
+    slows down the operation, so the traced run is not timed."""
+
+    def __init__(self, repeat: int, memory: bool = True) -> None:
+        self.repeat = repeat
+        self.durations: List[float] = []
+        self.peak_memory: Optional[int] = None
+        self._memory = memory
+        self._tracing = False
+        self._gc_enabled = False
+        self._start = 0.0
+
+    def runs(self) -> Iterator[int]:
+        for i in range(self.repeat):
+            yield i
+        if self._memory:
+            self._tracing = True
+            yield self.repeat
+            self._tracing = False
+
+    def __enter__(self) -> "Timer":
+        # like timeit, a collection of the garbage of the setup must not be timed
+        self._gc_enabled = gc.isenabled()
+        gc.disable()
+        if self._tracing:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        duration = time.perf_counter() - self._start
+        if self._gc_enabled:
+            gc.enable()
+        if not self._tracing:
+            self.durations.append(duration)
+            return None
+
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.peak_memory = max(self.peak_memory or 0, peak)
+
+
+def percentile(durations: List[float], percent: float) -> float:
+    """The nearest-rank percentile of the durations"""
+    ordered = sorted(durations)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def run(bench: Benchmark, dataset: Dataset, repeat: Optional[int] = None, memory: bool = True) -> Result:
+    timer = Timer(bench.repeat if repeat is None else repeat, memory)
+    bench.func(dataset, timer)
+    if not timer.durations:
+        raise RuntimeError(f"The benchmark {bench.name!r} did not time any operation")
+
+    return Result(
+        name=bench.name,
+        records=dataset.records,
+        keys=len(dataset.keys),
+        runs=len(timer.durations),
+        ops_per_sec=len(timer.durations) / sum(timer.durations),
+        p50=percentile(timer.durations, 50),
+        p99=percentile(timer.durations, 99),
+        peak_memory=timer.peak_memory,
+    )
+
+
+def compare(baseline: List[Result], current: List[Result], threshold: float) -> List[Regression]:
+    """The results whose median latency grew by more than `threshold` (0.2 for 20%) since the baseline.
+    Results that are not in both runs are not compared."""
+    previous: Dict[Tuple[str, int, int], Result] = {(r.name, r.records, r.keys): r for r in baseline}
+    regressions = []
+    for result in current:
+        before = previous.get((result.name, result.records, result.keys))
+        if before is not None and result.p50 > before.p50 * (1 + threshold):
+            regressions.append(Regression(result.name, result.records, result.keys, before.p50, result.p50))
+    return regressions
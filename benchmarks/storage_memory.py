@@ -0,0 +1,45 @@
+"""Compare the memory used by the storage kinds of a DB.
+
+    python -m benchmarks.storage_memory --records 1000000
+"""
+import argparse
+import gc
+import tracemalloc
+from typing import Dict
+
+from pysondb import DB
+
+KEYS = ["name", "age", "email", "active"]
+
+
+def measure(storage: str, records: int) -> int:
+    """Get the number of bytes the DB holds once `records` values are added to it"""
+    gc.collect()
+    tracemalloc.start()
+    db = DB(keys=KEYS, storage=storage)
+    ids = map(str, range(records))
+    db.set_id_generator(lambda: next(ids))
+    db.add_many([
+        {"name": f"user{i}", "age": i % 100, "email": f"user{i}@example.com", "active": i % 2 == 0}
+        for i in range(records)
+    ])
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del db
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    sizes: Dict[str, int] = {}
+    for storage in ("dict", "tuple", "columns"):
+        sizes[storage] = measure(storage, args.records)
+        print(f"{storage:>8}: {sizes[storage] / 2 ** 20:8.1f} MiB "
+              f"({sizes[storage] / sizes['dict']:.0%} of dict)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""The benchmarks of the DB and Cluster operations"""
+from .datasets import Dataset
+from .runner import benchmark
+from .runner import Timer
+from pysondb import Cluster
+from pysondb import DB
+
+
+@benchmark("add", repeat=200)
+def add(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for i in timer.runs():
+        value = {key: i for key in dataset.keys}
+        with timer:
+            db.add(value)
+
+
+@benchmark("add_many", repeat=3)
+def add_many(dataset: Dataset, timer: Timer) -> None:
+    for _ in timer.runs():
+        db = DB(keys=dataset.keys)
+        values = dataset.values()
+        with timer:
+            db.add_many(values)
+
+
+@benchmark("get_by_id", repeat=200)
+def get_by_id(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for i in timer.runs():
+        _id = str(i * 7919 % dataset.records + 1)
+        with timer:
+            db.get_by_id(_id)
+
+
+@benchmark("get_by_query", repeat=10)
+def get_by_query(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for i in timer.runs():
+        with timer:
+            db.get_by_query({"age": i % 100, "active": True})
+
+
+@benchmark("get_by_query_indexed", repeat=100)
+def get_by_query_indexed(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    db.create_index("age")
+    for i in timer.runs():
+        with timer:
+            db.get_by_query({"age": i % 100})
+
+
+@benchmark("get_by_query_range", repeat=50)
+def get_by_query_range(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    db.create_index("age", kind="sorted")
+    for i in timer.runs():
+        with timer:
+            db.get_by_query({"age": {"$gte": i % 100, "$lt": i % 100 + 2}})
+
+
+@benchmark("get_all", repeat=5)
+def get_all(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for _ in timer.runs():
+        with timer:
+            db.get_all()
+
+
+@benchmark("iter", repeat=3)
+def iter_values(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for _ in timer.runs():
+        with timer:
+            for _ in db.iter():
+                pass
+
+
+@benchmark("aggregate", repeat=10)
+def aggregate(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for _ in timer.runs():
+        with timer:
+            db.aggregate("active", {"age": ["sum", "min", "max"]})
+
+
+@benchmark("update_by_query", repeat=10)
+def update_by_query(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    for i in timer.runs():
+        with timer:
+            db.update_by_query({"age": i % 100}, {"active": i % 2 == 0})
+
+
+@benchmark("delete_by_query", repeat=3)
+def delete_by_query(dataset: Dataset, timer: Timer) -> None:
+    for _ in timer.runs():
+        db = dataset.db()
+        with timer:
+            db.delete_by_query({"age": {"$lt": 50}})
+
+
+@benchmark("commit", repeat=3)
+def commit(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    filename = dataset.path("commit.json")
+    for _ in timer.runs():
+        with timer:
+            db.commit(filename)
+
+
+@benchmark("commit_delta", repeat=20)
+def commit_delta(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    filename = dataset.path("commit-delta.json")
+    db.commit(filename)
+    for i in timer.runs():
+        db.update_by_id(str(i % dataset.records + 1), {"active": i % 2 == 0})
+        with timer:
+            db.commit(filename, mode="delta")
+
+
+@benchmark("load", repeat=3)
+def load(dataset: Dataset, timer: Timer) -> None:
+    filename = dataset.db_file()
+    for _ in timer.runs():
+        db = DB(keys=dataset.keys)
+        with timer:
+            db.load(filename)
+
+
+@benchmark("load_trusted", repeat=3)
+def load_trusted(dataset: Dataset, timer: Timer) -> None:
+    filename = dataset.db_file()
+    for _ in timer.runs():
+        db = DB(keys=dataset.keys)
+        with timer:
+            db.load(filename, verify="auto")
+
+
+@benchmark("commit_gzip", repeat=3)
+def commit_gzip(dataset: Dataset, timer: Timer) -> None:
+    db = dataset.db()
+    filename = dataset.path("commit.json.gz")
+    for _ in timer.runs():
+        with timer:
+            db.commit(filename)
+
+
+@benchmark("load_gzip", repeat=3)
+def load_gzip(dataset: Dataset, timer: Timer) -> None:
+    filename = dataset.path("load.json.gz")
+    dataset.db().commit(filename)
+    for _ in timer.runs():
+        db = DB(keys=dataset.keys)
+        with timer:
+            db.load(filename)
+
+
+@benchmark("cluster_commit", repeat=3)
+def cluster_commit(dataset: Dataset, timer: Timer) -> None:
+    cluster = Cluster({"users": dataset.db(), "empty": DB(keys=dataset.keys)})
+    filename = dataset.path("cluster.json")
+    for _ in timer.runs():
+        with timer:
+            cluster.commit(filename)
+
+
+@benchmark("cluster_load", repeat=3)
+def cluster_load(dataset: Dataset, timer: Timer) -> None:
+    filename = dataset.path("cluster-load.json")
+    Cluster({"users": dataset.db(), "empty": DB(keys=dataset.keys)}).commit(filename)
+    for _ in timer.runs():
+        cluster = Cluster({"users": DB(keys=dataset.keys), "empty": DB(keys=dataset.keys)})
+        with timer:
+            cluster.load(filename)
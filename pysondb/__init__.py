@@ -1,2 +1,6 @@
+from .aio import AsyncCluster  # noqa: F401
+from .aio import AsyncDB  # noqa: F401
 from .cluster import Cluster  # noqa: F401
 from .core import DB  # noqa: F401
+from .mapped import MappedDB  # noqa: F401
+from .sharded import ShardedDB  # noqa: F401
@@ -0,0 +1,123 @@
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import List
+
+AGGREGATE_OPS = ("count", "sum", "min", "max", "avg")
+
+
+class _Stats:
+    """The running results of the operators on the values of a single key.
+    None and the values that can't be compared with (or added to) the others are left out of
+    min, max, sum and avg, the same way a query doesn't match them"""
+
+    __slots__ = ("count", "used", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.used = 0
+        self.total: Any = 0
+        self.min: Any = None
+        self.max: Any = None
+
+    def add(self, value: Any, total: bool) -> None:
+        self.count += 1
+        if value is None:
+            return
+        try:
+            if self.used:
+                smaller, larger = value < self.min, value > self.max
+            else:
+                # the first value must be comparable too, a dict can't be the min of the ones after it
+                value < value
+                smaller = larger = True
+            new_total = self.total + value if total else self.total
+        except TypeError:
+            return
+
+        if smaller:
+            self.min = value
+        if larger:
+            self.max = value
+        self.total = new_total
+        self.used += 1
+
+    def result(self, ops: List[str]) -> Dict[str, Any]:
+        results = {"count": self.count, "sum": self.total, "min": self.min, "max": self.max,
+                   "avg": self.total / self.used if self.used else None}
+        return {op: results[op] for op in ops}
+
+
+class Aggregation:
+    """Counts the records of each group and applies the operators to the values of their keys,
+    one record at a time, so the records don't have to be copied or collected"""
+
+    def __init__(self, ops: Dict[str, List[str]]) -> None:
+        for key, names in ops.items():
+            for op in names:
+                if op not in AGGREGATE_OPS:
+                    raise ValueError(f"Unknown aggregate operator {op!r} for the key {key!r}, "
+                                     f"use one of {list(AGGREGATE_OPS)}")
+
+        self._ops = {key: list(names) for key, names in ops.items()}
+        # the sum is only added up if it is needed, so min and max also work on strings
+        self._totals = {key: "sum" in names or "avg" in names for key, names in ops.items()}
+        self._counts: Dict[Hashable, int] = {}
+        self._stats: Dict[Hashable, Dict[str, _Stats]] = {}
+
+    @property
+    def needs_values(self) -> bool:
+        """Whether the values of the records are used, or only the number of records in each group"""
+        return bool(self._ops)
+
+    def add(self, group: Any, record: Dict[str, Any]) -> None:
+        try:
+            known = group in self._counts
+        except TypeError:
+            group = _hashable(group)
+            known = group in self._counts
+        if not known:
+            self._counts[group] = 0
+            self._stats[group] = {key: _Stats() for key in self._ops}
+
+        self._counts[group] += 1
+        for key, stats in self._stats[group].items():
+            if key in record:
+                stats.add(record[key], self._totals[key])
+
+    def add_count(self, group: Hashable, count: int) -> None:
+        """Add the number of records of a group, without their values"""
+        self._counts[group] = self._counts.get(group, 0) + count
+        self._stats.setdefault(group, {})
+
+    def result(self) -> Dict[Any, Dict[str, Any]]:
+        results: Dict[Any, Dict[str, Any]] = {}
+        for group, count in self._counts.items():
+            result: Dict[str, Any] = {"count": count}
+            for key, stats in self._stats[group].items():
+                result[key] = stats.result(self._ops[key])
+            results[group] = result
+        return results
+
+
+def _hashable(value: Any) -> Hashable:
+    """A group key for a value that can't be hashed, lists become tuples and dicts tuples of their sorted items"""
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in sorted(value.items()))
+    return value
+
+
+def distinct(values: Iterable[Any]) -> List[Any]:
+    """The distinct values in the order they first appear, values that can't be hashed are compared one by one"""
+    seen: Dict[Any, None] = {}
+    unhashable: List[Any] = []
+    for value in values:
+        try:
+            seen.setdefault(value, None)
+        except TypeError:
+            if value not in unhashable:
+                unhashable.append(value)
+    return list(seen) + unhashable
@@ -0,0 +1,299 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TypeVar
+from typing import Union
+
+from .cluster import Cluster
+from .core import DB
+from .stream import ProgressCallback
+
+T = TypeVar("T")
+
+
+class ReadWriteLock:
+    """An asyncio lock that lets many readers in at once, but gives the writers exclusive access.
+    Waiting writers block new readers, so that the writers are not starved"""
+
+    def __init__(self) -> None:
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+        # created on first use, so that it belongs to the running event loop
+        self._cond: Optional[asyncio.Condition] = None
+
+    def read(self) -> "_Guard":
+        return _Guard(self._acquire_read, self._release_read)
+
+    def write(self) -> "_Guard":
+        return _Guard(self._acquire_write, self._release_write)
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _acquire_read(self) -> None:
+        async with self._condition():
+            await self._condition().wait_for(lambda: not self._writer and not self._waiting_writers)
+            self._readers += 1
+
+    async def _release_read(self) -> None:
+        async with self._condition():
+            self._readers -= 1
+            if not self._readers:
+                self._condition().notify_all()
+
+    async def _acquire_write(self) -> None:
+        async with self._condition():
+            self._waiting_writers += 1
+            try:
+                await self._condition().wait_for(lambda: not self._writer and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    async def _release_write(self) -> None:
+        async with self._condition():
+            self._writer = False
+            self._condition().notify_all()
+
+
+class _Guard:
+    def __init__(self, acquire: Callable[[], Any], release: Callable[[], Any]) -> None:
+        self._acquire = acquire
+        self._release = release
+
+    async def __aenter__(self) -> None:
+        await self._acquire()
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self._release()
+
+
+class AsyncDB:
+    """Use a DB from asyncio code.
+
+    The file I/O, the serialization and the scans over the DB run in an executor, so they
+    don't block the event loop. The writes are serialized by a lock that still lets
+    concurrent reads run together. The in memory lookups by id stay synchronous."""
+
+    def __init__(self, db: DB, executor: Optional[Executor] = None, lock: Optional[ReadWriteLock] = None) -> None:
+        self.db = db
+        self._executor = executor
+        self._lock = lock if lock is not None else ReadWriteLock()
+
+    def __repr__(self) -> str:
+        return repr(self.db)
+
+    def __len__(self) -> int:
+        return len(self.db)
+
+    @property
+    def keys(self) -> List[str]:
+        return self.db.keys
+
+    @property
+    def indexes(self) -> List[str]:
+        return self.db.indexes
+
+    def get_by_id(self, _id: str) -> Union[None, Dict[str, Any]]:
+        return self.db.get_by_id(_id)
+
+    def id_exists(self, _id: str) -> bool:
+        return self.db.id_exists(_id)
+
+    def set_id_generator(self, func: Union[str, Callable[[], str]]) -> None:
+        self.db.set_id_generator(func)
+
+    def reserve_ids(self, n: int) -> List[str]:
+        return self.db.reserve_ids(n)
+
+    async def load(self, filename: str, force: bool = False, progress: Optional[ProgressCallback] = None,
+                   verify: Union[bool, str] = True) -> None:
+        """Load an already existing DB, `progress` is called from the executor thread"""
+        async with self._lock.write():
+            await self._run(partial(self.db.load, filename, force, progress=progress, verify=verify))
+
+    async def commit(self, filename: str, indent: Optional[int] = None, format: str = "json",
+                     compression: Optional[str] = None, compression_level: Optional[int] = None,
+                     mode: str = "full", header: bool = False) -> None:
+        """Store the DB in a file, returns once the data is on the disk"""
+        async with self._lock.write():
+            future = await self._run(partial(self.db.commit, filename, indent, format=format, compression=compression,
+                                             compression_level=compression_level, mode=mode, header=header))
+
+        if future is not None:
+            # the DB writes its commits on its own background thread
+            await asyncio.wrap_future(future)
+
+    async def compact(self, filename: str, indent: Optional[int] = None, format: str = "json",
+                      compression: Optional[str] = None, compression_level: Optional[int] = None,
+                      header: bool = False) -> None:
+        async with self._lock.write():
+            future = await self._run(partial(self.db.compact, filename, indent, format=format, compression=compression,
+                                             compression_level=compression_level, header=header))
+
+        if future is not None:
+            await asyncio.wrap_future(future)
+
+    async def squash(self, filename: str, indent: Optional[int] = None, format: str = "json",
+                     compression: Optional[str] = None, compression_level: Optional[int] = None,
+                     header: bool = False) -> None:
+        async with self._lock.write():
+            future = await self._run(partial(self.db.squash, filename, indent, format=format, compression=compression,
+                                             compression_level=compression_level, header=header))
+
+        if future is not None:
+            await asyncio.wrap_future(future)
+
+    async def create_index(self, key: str, kind: str = "hash") -> None:
+        async with self._lock.write():
+            await self._run(self.db.create_index, key, kind)
+
+    async def drop_index(self, key: str) -> None:
+        async with self._lock.write():
+            self.db.drop_index(key)
+
+    async def add(self, data: Dict[str, Any]) -> str:
+        async with self._lock.write():
+            return self.db.add(data)
+
+    async def add_many(self, data: List[Dict[str, Any]]) -> None:
+        async with self._lock.write():
+            await self._run(self.db.add_many, data)
+
+    async def get_by_query(self, query: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        async with self._lock.read():
+            return await self._run(self.db.get_by_query, query)
+
+    async def get_all(self) -> Dict[str, Dict[str, Any]]:
+        async with self._lock.read():
+            return await self._run(self.db.get_all)
+
+    async def values(self, count: int = 5, last: bool = False) -> Dict[str, Dict[str, Any]]:
+        async with self._lock.read():
+            return await self._run(self.db.values, count, last)
+
+    async def explain(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._lock.read():
+            return await self._run(self.db.explain, query)
+
+    async def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        async with self._lock.read():
+            return await self._run(self.db.count, query)
+
+    async def distinct(self, key: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        async with self._lock.read():
+            return await self._run(self.db.distinct, key, query)
+
+    async def aggregate(self, group_by: Optional[str] = None, ops: Optional[Dict[str, List[str]]] = None,
+                        query: Optional[Dict[str, Any]] = None) -> Dict[Any, Dict[str, Any]]:
+        async with self._lock.read():
+            return await self._run(self.db.aggregate, group_by, ops, query)
+
+    async def pop(self, _id: str) -> Union[None, Dict[str, Any]]:
+        async with self._lock.write():
+            return self.db.pop(_id)
+
+    async def update_by_id(self, _id: str, data: Dict[str, Any]) -> None:
+        async with self._lock.write():
+            self.db.update_by_id(_id, data)
+
+    async def update_by_query(self, query: Dict[str, Any], new_data: Dict[str, Any]) -> List[str]:
+        async with self._lock.write():
+            return await self._run(self.db.update_by_query, query, new_data)
+
+    async def delete_by_id(self, _id: str) -> None:
+        async with self._lock.write():
+            self.db.delete_by_id(_id)
+
+    async def delete_all(self) -> None:
+        async with self._lock.write():
+            await self._run(self.db.delete_all)
+
+    async def delete_by_query(self, query: Dict[str, Any]) -> List[str]:
+        async with self._lock.write():
+            return await self._run(self.db.delete_by_query, query)
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+
+class AsyncCluster:
+    """Use a Cluster from asyncio code.
+
+    The DBs of the cluster are wrapped in `AsyncDB`s that share a single lock with the cluster,
+    so that a commit of the cluster never runs alongside a write to one of its DBs."""
+
+    def __init__(self, cluster: Cluster, executor: Optional[Executor] = None) -> None:
+        self.cluster = cluster
+        self._executor = executor
+        self._lock = ReadWriteLock()
+        self._async_dbs: Dict[str, AsyncDB] = {}
+
+    def __repr__(self) -> str:
+        return repr(self.cluster)
+
+    def __getattr__(self, k: object) -> Union[AsyncDB, None]:
+        if isinstance(k, str) and not k.startswith("_"):
+            return self._get_db(k)
+
+        return None
+
+    def __getitem__(self, k: object) -> Union[AsyncDB, None]:
+        if isinstance(k, str):
+            return self._get_db(k)
+
+        return None
+
+    @property
+    def databases(self) -> List[str]:
+        return self.cluster.databases
+
+    async def add_db(self, db_name: str, db: DB) -> None:
+        async with self._lock.write():
+            self.cluster.add_db(db_name, db)
+
+    async def delete_db(self, db_name: str) -> None:
+        async with self._lock.write():
+            self.cluster.delete_db(db_name)
+
+    async def load(self, filename: str, progress: Optional[ProgressCallback] = None,
+                   verify: Union[bool, str] = True) -> None:
+        """Load the cluster, `progress` is called from the executor thread"""
+        async with self._lock.write():
+            await self._run(partial(self.cluster.load, filename, progress=progress, verify=verify))
+
+    async def commit(self, filename: str, indent: Optional[int] = None, layout: Optional[str] = None,
+                     compression: Optional[str] = None, compression_level: Optional[int] = None,
+                     header: bool = False) -> None:
+        """Store the cluster in a file, returns once the data is on the disk"""
+        async with self._lock.write():
+            future = await self._run(partial(self.cluster.commit, filename, indent, layout=layout,
+                                             compression=compression, compression_level=compression_level,
+                                             header=header))
+
+        if future is not None:
+            await asyncio.wrap_future(future)
+
+    def _get_db(self, name: str) -> Union[AsyncDB, None]:
+        db = self.cluster[name]
+        if db is None:
+            return None
+
+        # a dynamic cluster creates new DBs when it is loaded
+        if name not in self._async_dbs or self._async_dbs[name].db is not db:
+            self._async_dbs[name] = AsyncDB(db, executor=self._executor, lock=self._lock)
+        return self._async_dbs[name]
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
@@ -0,0 +1,179 @@
+import json
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+from typing import Union
+
+# the first bytes of a binary DB file, a JSON file can never start with them
+MAGIC = b"\x00PYSONDB\x01"
+
+_HEADER = struct.Struct("<I")
+_SECTION = struct.Struct("<BQ")
+_STRINGS = struct.Struct("<IBB")
+_SIZE = struct.Struct("<Q")
+
+# the types of the columns, a column holds the values of a single key for all the records
+_INT, _FLOAT, _BOOL, _STR, _JSON = range(5)
+
+_INT64 = (-2 ** 63, 2 ** 63 - 1)
+_UINT_SIZE = array("I").itemsize
+
+
+class Columns(NamedTuple):
+    """The ids and the values of each key of the records in a binary file, in the same order"""
+    keys: List[str]
+    ids: List[str]
+    columns: List[List[Any]]
+
+
+def dump(data: Dict[str, Dict[str, Any]], keys: List[str], f: BinaryIO) -> None:
+    """Write the values of a DB to a binary file.
+
+    The file starts with a JSON header that holds the keys, followed by a column of ids
+    and a column for every key. The numbers are stored as fixed size binary values and
+    the strings are stored once in a string table of each column, that the column refers to.
+    If some values don't have exactly the keys of the DB, all the values are stored as JSON."""
+    columnar = all(len(v) == len(keys) and all(k in v for k in keys) for v in data.values())
+    header = {"keys": keys, "count": len(data), "layout": "columns" if columnar else "json"}
+    header_bytes = json.dumps(header).encode()
+
+    f.write(MAGIC)
+    f.write(_HEADER.pack(len(header_bytes)))
+    f.write(header_bytes)
+
+    if not columnar:
+        _write_section(f, _JSON, json.dumps(data).encode())
+        return None
+
+    _write_section(f, _STR, _encode_strings(list(data)))
+    for k in keys:
+        _write_section(f, *_encode_column([v[k] for v in data.values()]))
+
+
+def load(f: BinaryIO) -> Union[Columns, Dict[str, Dict[str, Any]]]:
+    """Read a binary DB file, returns the columns of the file or the values of a file
+    that is stored as JSON"""
+    buf = f.read()
+    if not buf.startswith(MAGIC):
+        raise ValueError("Not a binary DB file")
+
+    pos = len(MAGIC)
+    (size,) = _HEADER.unpack_from(buf, pos)
+    pos += _HEADER.size
+    header = json.loads(buf[pos:pos + size])
+    pos += size
+
+    keys: List[str] = header["keys"]
+    sections = []
+    while pos < len(buf):
+        kind, size = _SECTION.unpack_from(buf, pos)
+        pos += _SECTION.size
+        sections.append(_DECODERS[kind](buf[pos:pos + size]))
+        pos += size
+
+    if header["layout"] == "json":
+        data: Dict[str, Dict[str, Any]] = sections[0]
+        return data
+
+    if len(sections) != len(keys) + 1 or not all(len(c) == header["count"] for c in sections):
+        raise ValueError("The binary DB file is truncated")
+
+    return Columns(keys, sections[0], sections[1:])
+
+
+def _write_section(f: BinaryIO, kind: int, payload: bytes) -> None:
+    f.write(_SECTION.pack(kind, len(payload)))
+    f.write(payload)
+
+
+def _encode_column(values: List[Any]) -> Tuple[int, bytes]:
+    """Pick the most compact type that can hold all the values of a column"""
+    types = set(map(type, values))
+    if types == {int} and _INT64[0] <= min(values) and max(values) <= _INT64[1]:
+        return _INT, _to_bytes(array("q", values))
+    if types == {float}:
+        return _FLOAT, _to_bytes(array("d", values))
+    if types == {bool}:
+        return _BOOL, bytes(values)
+    if types == {str}:
+        return _STR, _encode_strings(values)
+    return _JSON, json.dumps(values).encode()
+
+
+def _encode_strings(values: List[str]) -> bytes:
+    """A table of the distinct strings, followed by the position of each value in the table.
+    The strings of the table are separated by NUL characters, or given by their lengths if
+    one of them holds a NUL. If all the values are distinct the positions are left out"""
+    table: Dict[str, int] = {}
+    positions = array("I", [table.setdefault(v, len(table)) for v in values])
+    text = "\0".join(table)
+    separated = text.count("\0") == max(len(table) - 1, 0)
+
+    payload = [_STRINGS.pack(len(table), separated, len(values) == len(table))]
+    if not separated:
+        text = "".join(table)
+        payload.append(_to_bytes(array("I", map(len, table))))
+    text_bytes = text.encode()
+    payload.extend((_SIZE.pack(len(text_bytes)), text_bytes))
+    if len(values) != len(table):
+        payload.append(_to_bytes(positions))
+    return b"".join(payload)
+
+
+def _decode_strings(payload: bytes) -> List[str]:
+    count, separated, distinct = _STRINGS.unpack_from(payload)
+    pos = _STRINGS.size
+    if not separated:
+        lengths = _from_bytes("I", payload[pos:pos + _UINT_SIZE * count])
+        pos += _UINT_SIZE * count
+
+    (size,) = _SIZE.unpack_from(payload, pos)
+    pos += _SIZE.size
+    text = payload[pos:pos + size].decode()
+    pos += size
+
+    if not count:
+        table: List[str] = []
+    elif separated:
+        table = text.split("\0")
+    else:
+        # the lengths are in characters, so the table is sliced from the decoded text
+        ends = list(accumulate(lengths))
+        table = [text[start:end] for start, end in zip([0] + ends, ends)]
+
+    if distinct:
+        return table
+    return list(map(table.__getitem__, _from_bytes("I", payload[pos:])))
+
+
+def _to_bytes(values: "array[Any]") -> bytes:
+    """The bytes of the array in little endian order"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, payload: bytes) -> "array[Any]":
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+_DECODERS: Dict[int, Callable[[bytes], Any]] = {
+    _INT: lambda payload: _from_bytes("q", payload).tolist(),
+    _FLOAT: lambda payload: _from_bytes("d", payload).tolist(),
+    _BOOL: lambda payload: list(map(bool, payload)),
+    _STR: _decode_strings,
+    _JSON: json.loads,
+}
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Hashable
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from .query import Conditions
+
+
+class CacheInfo(NamedTuple):
+    """The statistics of a query cache, like `functools.lru_cache().cache_info()`"""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class QueryCache:
+    """A LRU cache of the ids matched by the queries of a DB.
+
+    Every entry remembers the generation of the DB it was computed for, the DB counts up its
+    generation on every change, so an entry of an older generation is never returned."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, Tuple[str, ...]]]" = OrderedDict()
+        # the readers of a thread safe DB share the cache
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: int) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def contains(self, key: Hashable, generation: int) -> bool:
+        """Whether the ids of the key are cached for the generation, without counting a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] == generation
+
+    def put(self, key: Hashable, generation: int, ids: Tuple[str, ...]) -> None:
+        with self._lock:
+            self._entries[key] = (generation, ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+def query_key(conditions: Conditions) -> Optional[Hashable]:
+    """A hashable key of the conditions of a query, None if an argument can't be hashed.
+    The types are a part of the key, since `1`, `1.0` and `True` or a list and a tuple don't match the same values"""
+    try:
+        key = _freeze(conditions)
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(map(_freeze, value)))
+    if isinstance(value, (set, frozenset)):
+        return (type(value), frozenset(map(_freeze, value)))
+    return (type(value), value)
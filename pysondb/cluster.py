@@ -1,42 +1,105 @@
 import json
+import os
+import threading
 import warnings
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Any
+from typing import Callable
+from typing import Collection
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import TypeVar
 from typing import Union
+from urllib.parse import quote
 
+from .compression import compression_for
+from .compression import DECOMPRESSION_ERRORS
+from .compression import open_data
+from .compression import SUFFIXES
 from .core import DB
+from .files import atomic_write
+from .files import BackgroundWriter
+from .header import file_checksum
+from .header import header_path
+from .header import matches
+from .header import read_header
+from .header import write_header
+from .metrics import file_size
+from .metrics import instrumented
+from .metrics import Metrics
+from .stream import JSONObjectStream
+from .stream import ProgressCallback
 
 ClusterDataType = Dict[str,
                        Dict[str, Union[List[str], Dict[str, Dict[str, Any]]]]]
+DBDataType = Dict[str, Dict[str, Any]]
+
+T = TypeVar("T")
+
+# the file in a cluster directory that lists its DBs
+MANIFEST = "manifest.json"
+
+# the methods that are counted and timed by the metrics of a cluster
+_METRIC_METHODS = ("add_db", "delete_db", "commit", "load")
 
 
 class Cluster:
     """Use multiple DB from a single entry point"""
 
-    def __init__(self, dbs: Dict[str, DB], dynamic: bool = False) -> None:
+    def __init__(self, dbs: Dict[str, DB], dynamic: bool = False, async_commit: bool = False,
+                 max_workers: Optional[int] = None, lazy: bool = False, metrics: Union[bool, Metrics] = False) -> None:
+        """`max_workers` is the number of threads used to read and write the files of a cluster directory.
+        With `lazy=True` the values of a DB are only read from the file the first time it is accessed.
+        With `metrics=True` (or a `Metrics` shared with other clusters) the commits and loads are counted and timed,
+        the DBs of the cluster have their own metrics"""
 
         self._dbs: Dict[str, DB] = dbs
         self._d_loading = dynamic
+        self._writer = BackgroundWriter() if async_commit else None
+        self._max_workers = max_workers
+        self._lazy = lazy
+
+        # the DBs that are not read from the file yet -> a function that reads their values
+        self._unloaded: Dict[str, Callable[[], DBDataType]] = {}
+        self._unloaded_lock = threading.Lock()
+
+        # the cluster directory the DBs were last loaded from or committed to
+        self._directory: Optional[str] = None
+        # the file of each DB in that directory
+        self._files: Dict[str, str] = {}
         self._verify_dbs()
 
+        self._metrics = Metrics() if metrics is True else metrics or None
+        if self._metrics is not None:
+            for name in _METRIC_METHODS:
+                setattr(self, name, instrumented(self._metrics, name, getattr(self, name)))
+
     def __repr__(self) -> str:
         return f"A Cluster of {{ {', '.join(self._dbs)} }}"
 
     def __getattr__(self, k: object) -> Union[DB, None]:
-        if isinstance(k, str):
-            return self._dbs.get(k)
+        if isinstance(k, str) and not k.startswith("_"):
+            return self._get_db(k)
 
         return None
 
     def __getitem__(self, k: object) -> Union[DB, None]:
         if isinstance(k, str):
-            return self._dbs.get(k)
+            return self._get_db(k)
 
         return None
 
+    @property
+    def metrics(self) -> Optional[Metrics]:
+        """The metrics of the commits and loads of the cluster, None unless the cluster was created with `metrics`"""
+        return self._metrics
+
     @property
     def databases(self) -> List[str]:
         """Returns the names of all the DB's in the cluster"""
@@ -63,6 +126,7 @@ class Cluster:
 
         if self._d_loading:
             self._dbs[db_name] = db
+            self._unloaded.pop(db_name, None)
 
         else:
             warnings.warn(UserWarning(
@@ -72,56 +136,403 @@ class Cluster:
         if self._d_loading:
             if db_name in self._dbs:
                 del self._dbs[db_name]
+                self._unloaded.pop(db_name, None)
 
         else:
             warnings.warn(UserWarning(
                 "Cannot delete delete a db from a cluster that is not dynamic"))
 
-    def commit(self, filename: str, indent: Optional[int] = None) -> None:
-        """commmit all the data from all the db to a single file"""
+    def commit(self, filename: str, indent: Optional[int] = None, layout: Optional[str] = None,
+               compression: Optional[str] = None, compression_level: Optional[int] = None,
+               header: bool = False) -> Optional["Future[None]"]:
+        """commmit all the data from all the db to a single file, or to a cluster directory.
+        `layout` is either "file" or "directory", by default a directory is used if `filename` is one.
+        `compression` is 'gzip', 'lzma' or 'zlib', a cluster file also picks it by its extension ('.gz', '.xz'
+        or '.zz'), in a directory each DB file is compressed. `compression_level` goes from 0 to 9, the default is 6.
+        With `header=True` each file gets a header next to it, so that `load(verify="auto")` can skip verifying it.
+        With `async_commit=True` the files are written on a background thread from a snapshot of the cluster,
+        and the returned future is done once the data is on the disk"""
+        if layout is None:
+            layout = "directory" if Path(filename).is_dir() else "file"
+
+        if layout == "directory":
+            job = self._directory_commit_job(filename, indent, compression_for("", compression), compression_level,
+                                             header)
+        elif layout == "file":
+            job = self._file_commit_job(filename, indent, compression_for(filename, compression), compression_level,
+                                        header)
+        else:
+            raise ValueError(f"Unknown cluster layout {layout!r}, use 'file' or 'directory'")
+
+        if self._writer is None:
+            job()
+            return None
+        return self._writer.submit(job)
+
+    def load(self, filename: str, progress: Optional[ProgressCallback] = None,
+             verify: Union[bool, str] = True) -> None:
+        """load the cluster from a single file or from a cluster directory,
+        the values of each DB are verified as they are read from the file.
+        `progress` is called with the number of bytes read so far and the size of the files.
+        With `verify="auto"` the values are not verified if the file was written by a commit of DBs
+        with the same keys and types and was not changed since, `verify=False` never verifies them"""
+        if verify not in (True, False, "auto"):
+            raise ValueError(f"Unknown verify {verify!r}, use True, False or 'auto'")
+
+        if self._writer is not None:
+            # read the file only after the pending commits are written
+            self._writer.wait()
+
+        if Path(filename).is_dir():
+            self._unloaded = {}
+            self._load_directory(filename, progress, verify)
+
+        elif Path(filename).is_file():
+            self._unloaded = {}
+            try:
+                if self._lazy:
+                    # a lazy cluster reads a single DB from the file, the checksum of the file can't be checked
+                    self._load_file_lazy(filename, bool(verify))
+                elif not (verify == "auto" and self._load_file_trusted(filename, progress)):
+                    with open_data(filename, progress) as (f, report):
+                        stream = JSONObjectStream(f, progress=report, total=os.path.getsize(filename))
+                        loaded = self._load_dbs(stream, bool(verify))
+                        stream.finish()
+                    self._set_loaded(loaded)
+                if self._metrics is not None and not self._lazy:
+                    self._metrics.count_bytes("load", read=file_size(filename))
+
+            except (json.JSONDecodeError,) + DECOMPRESSION_ERRORS:
+                warnings.warn(UserWarning(
+                    f"Error while decoding {filename!r}."), stacklevel=2)
+                self._dbs = {}
+                return None
+
+            self._directory = None
+
+    def _get_db(self, name: str) -> Union[DB, None]:
+        """Get a DB of the cluster, a DB of a lazy cluster is read from the file here"""
+        if name in self._unloaded:
+            with self._unloaded_lock:
+                load = self._unloaded.get(name)
+                if load is not None:
+                    db = self._dbs[name]
+                    db._set_db(load())
+                    db._rebuild_indexes()
+                    db._db_updated = False
+                    del self._unloaded[name]
+
+        return self._dbs.get(name)
+
+    def _load_all(self) -> None:
+        for name in list(self._unloaded):
+            self._get_db(name)
+
+    def _file_commit_job(self, filename: str, indent: Optional[int], compression: Optional[str] = None,
+                         compression_level: Optional[int] = None, header: bool = False) -> Callable[[], None]:
+        self._load_all()
         data: ClusterDataType = {}
+        headers = {}
         for db in self._dbs:
             data[db] = {}
             data[db]["keys"] = self._dbs[db].keys
-            data[db]["data"] = self._dbs[db]._db
-
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=indent)
-
-    def load(self, filename: str) -> None:
-        """load the cluster"""
-        if Path(filename).is_file():
-            with open(filename, "r") as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    warnings.warn(UserWarning(
-                        f"Error while decoding {filename!r}."), stacklevel=2)
-                    self._dbs = {}
-                    return None
-
-            if self._d_loading:
-                # Create the DBs dict
-                self._dbs = {i: DB(keys=[]) for i in data}
-
-                # add the to the DB in the cluster
-                for d in self._dbs:
-                    self._dbs[d]._keys = sorted(data[d]["keys"])
-
-            # verify and add the data to the DB
-            req_data: Dict[str, Dict[str, Dict[str, Any]]] = {
-                i: data[i]["data"] for i in self._dbs}
-
-            # verify
-            for rk, rv in req_data.items():
-
-                try:
-                    for v in rv.values():
-                        self._dbs[rk]._verify_data(v)
-                except KeyError:
-                    raise KeyError(f"The key provided for the DB {rk!r} -> ({self._dbs[rk].keys})"
-                                   f" does not match the keys in the cluster data ({list(v.keys())})") from None
-
-            # add the data to DB
-            for rk, rv in req_data.items():
-                self._dbs[rk]._db = rv.copy()
+            data[db]["data"] = snapshot = self._snapshot(self._dbs[db])
+            if self._dbs[db]._verify:
+                headers[db] = self._dbs[db]._schema.header(len(snapshot))
+
+        def job() -> None:
+            atomic_write(filename, lambda f: json.dump(data, f, indent=indent),
+                         compression=compression, level=compression_level)
+            if header:
+                write_header(filename, {"dbs": headers})
+            if self._metrics is not None:
+                self._metrics.count_bytes("commit", written=file_size(filename))
+
+        return job
+
+    def _directory_commit_job(self, directory: str, indent: Optional[int], compression: Optional[str] = None,
+                              compression_level: Optional[int] = None, header: bool = False) -> Callable[[], None]:
+        """Get a function that writes the DBs that changed to their files, and the manifest"""
+        files = {name: _db_file(name) + (SUFFIXES[compression] if compression else "") for name in self._dbs}
+        if directory != self._directory:
+            self._load_all()
+        else:
+            # a DB that moves to another file (like one with another compression) is written, so it is read first
+            for name in [name for name in self._unloaded if files[name] != self._files.get(name)]:
+                self._get_db(name)
+        manifest = {"dbs": {name: {"keys": db.keys, "file": files[name]} for name, db in self._dbs.items()}}
+
+        # the DBs that were not changed since the directory was loaded or committed are not written again,
+        # this includes the DBs that were never read from it
+        dirty = {
+            name: self._snapshot(db) for name, db in self._dbs.items()
+            if name not in self._unloaded
+            and (db._db_updated or directory != self._directory or not Path(directory, files[name]).is_file())
+        }
+        headers = {
+            name: self._dbs[name]._schema.header(len(dirty[name]))
+            for name in dirty if header and self._dbs[name]._verify
+        }
+        written = [self._dbs[name] for name in dirty]
+        for db in written:
+            db._db_updated = False
+        self._directory = directory
+        self._files = files
+
+        def write(name: str) -> None:
+            path = os.path.join(directory, files[name])
+            atomic_write(path, lambda f: json.dump(dirty[name], f, indent=indent),
+                         compression=compression, level=compression_level)
+            if name in headers:
+                write_header(path, headers[name])
+
+        def job() -> None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                old_files = _manifest_files(directory)
+                _map_threads(write, list(dirty), self._max_workers)
+                # the manifest is written last, so that it never lists a DB file that is not written yet
+                atomic_write(os.path.join(directory, MANIFEST), lambda f: json.dump(manifest, f, indent=indent))
+            except BaseException:
+                # the next commit writes the DBs again, the files in the directory may be older than the DBs
+                for db in written:
+                    db._db_updated = True
+                self._directory = None
+                raise
+            _remove_stale_files(directory, old_files - set(files.values()))
+            if self._metrics is not None:
+                paths = [os.path.join(directory, files[name]) for name in dirty] + [os.path.join(directory, MANIFEST)]
+                self._metrics.count_bytes("commit", written=sum(map(file_size, paths)))
+
+        return job
+
+    def _snapshot(self, db: DB) -> DBDataType:
+        if self._writer is None:
+            return db._as_dict()
+        # the values are updated in place, so the background writer needs a snapshot
+        return {i: dict(x) for i, x in db._db.items()}
+
+    def _load_directory(self, directory: str, progress: Optional[ProgressCallback],
+                        verify: Union[bool, str] = True) -> None:
+        """Read the DBs of a cluster directory concurrently, or only its manifest for a lazy cluster"""
+        with open(os.path.join(directory, MANIFEST), "r") as f:
+            manifest: Dict[str, Dict[str, Any]] = json.load(f)["dbs"]
+
+        dbs = {
+            name: DB(keys=info["keys"]) if self._d_loading else self._dbs[name]
+            for name, info in manifest.items() if self._d_loading or name in self._dbs
+        }
+        paths = {name: os.path.join(directory, manifest[name]["file"]) for name in dbs}
+
+        if self._lazy:
+            self._set_unloaded(dbs, {
+                name: partial(self._read_directory_db, paths[name], name, db, manifest[name]["keys"], None, verify)
+                for name, db in dbs.items()
+            })
+
+        else:
+            report = _combined_progress(progress, list(paths.values()))
+
+            def load(name: str) -> DBDataType:
+                return self._read_directory_db(paths[name], name, dbs[name], manifest[name]["keys"],
+                                               None if report is None else partial(report, paths[name]), verify)
+
+            names = list(dbs)
+            self._set_loaded({name: (dbs[name], data)
+                              for name, data in zip(names, _map_threads(load, names, self._max_workers))})
+            if self._metrics is not None:
+                paths_read = list(paths.values()) + [os.path.join(directory, MANIFEST)]
+                self._metrics.count_bytes("load", read=sum(map(file_size, paths_read)))
+
+        self._directory = directory
+        self._files = {name: manifest[name]["file"] for name in dbs}
+
+    def _read_directory_db(self, path: str, name: str, db: DB, keys: List[str],
+                           progress: Optional[ProgressCallback], verify: Union[bool, str] = True) -> DBDataType:
+        # load into a new DB, so that a DB is only changed once all of its values are verified
+        loader = DB(keys=db.keys, verify_data=db._verify, types=db._schema.types)
+        try:
+            loader._load_db_file(path, progress=progress, verify=verify)
+        except KeyError:
+            raise KeyError(f"The key provided for the DB {name!r} -> ({db.keys})"
+                           f" does not match the keys in the cluster data ({keys})") from None
+        return loader._as_dict()
+
+    def _load_file_lazy(self, filename: str, verify: bool = True) -> None:
+        """Find the DBs of a cluster file without keeping their values,
+        a non dynamic cluster already knows its DBs so the file is not read at all"""
+        if self._d_loading:
+            keys: Dict[str, List[str]] = {}
+            with open_data(filename) as (f, _):
+                stream = JSONObjectStream(f)
+                for name in stream.iter_keys():
+                    for field in stream.iter_keys():
+                        if field == "keys":
+                            keys[name] = stream.read_value()
+                        else:
+                            # the values are read once the DB is used
+                            stream.skip_value()
+                stream.finish()
+            dbs = {name: DB(keys=k) for name, k in keys.items()}
+
+        else:
+            dbs = dict(self._dbs)
+
+        self._set_unloaded(dbs, {
+            name: partial(self._read_file_db, filename, name, db, verify) for name, db in dbs.items()
+        })
+
+    def _load_file_trusted(self, filename: str, progress: Optional[ProgressCallback]) -> bool:
+        """Load a cluster file without verifying the values of the DBs whose header shows that they were written
+        by a DB with the same schema. Returns False if the file has no header, or was changed since"""
+        header = read_header(filename)
+        if header is None or not matches(header, file_checksum(filename)):
+            return False
+
+        with open_data(filename, progress) as (f, report):
+            stream = JSONObjectStream(f, progress=report, total=os.path.getsize(filename))
+            loaded = self._load_dbs(stream, verify=False)
+            stream.finish()
+
+        for name, (db, data) in loaded.items():
+            if not db._schema.trusts(header.get("dbs", {}).get(name)):
+                # the values of the other DBs are verified once they are read
+                for _id, v in data.items():
+                    self._verify_db_data(name, db, v, _id)
+
+        self._set_loaded(loaded)
+        return True
+
+    def _read_file_db(self, filename: str, name: str, db: DB, verify: bool = True) -> DBDataType:
+        """Read the values of a single DB from a cluster file, the DBs before it are skipped"""
+        with open_data(filename) as (f, _):
+            stream = JSONObjectStream(f)
+            try:
+                for key in stream.iter_keys():
+                    if key == name:
+                        return self._read_db(stream, name, db, verify)
+                    stream.skip_value()
+
+            except (json.JSONDecodeError,) + DECOMPRESSION_ERRORS:
+                warnings.warn(UserWarning(
+                    f"Error while decoding {filename!r}, loading an empty DB."), stacklevel=4)
+                return {}
+
+        raise KeyError(f"The DB {name!r} is not a part of the cluster data")
+
+    def _set_unloaded(self, dbs: Dict[str, DB], loaders: Dict[str, Callable[[], DBDataType]]) -> None:
+        self._set_loaded({name: (db, {}) for name, db in dbs.items()})
+        self._unloaded = loaders
+
+    def _set_loaded(self, loaded: Dict[str, Tuple[DB, DBDataType]]) -> None:
+        if self._d_loading:
+            self._dbs = {i: db for i, (db, _) in loaded.items()}
+
+        for name in self._dbs:
+            if name not in loaded:
+                raise KeyError(f"The DB {name!r} is not a part of the cluster data")
+
+        # add the data to DB
+        for name, (db, data) in loaded.items():
+            db._set_db(data)
+            db._rebuild_indexes()
+            db._db_updated = False
+
+    def _load_dbs(self, stream: JSONObjectStream, verify: bool = True) -> Dict[str, Tuple[DB, DBDataType]]:
+        """Read and verify the data of the DBs in the cluster from the stream"""
+        loaded: Dict[str, Tuple[DB, DBDataType]] = {}
+        for name in stream.iter_keys():
+            if not self._d_loading and name not in self._dbs:
+                # only the DBs in the cluster are loaded
+                stream.skip_value()
+                continue
+
+            db = DB(keys=[]) if self._d_loading else self._dbs[name]
+            loaded[name] = (db, self._read_db(stream, name, db, verify))
+
+        return loaded
+
+    def _read_db(self, stream: JSONObjectStream, name: str, db: DB, verify: bool = True) -> DBDataType:
+        """Read and verify the `{"keys": ..., "data": ...}` of a DB from the stream"""
+        data: DBDataType = {}
+
+        # in a dynamic cluster the values can only be verified once the keys are known
+        verified = not self._d_loading and verify
+        for field in stream.iter_keys():
+            if field == "keys" and self._d_loading:
+                db._set_keys(stream.read_value())
+                if verify:
+                    for _id, v in data.items():
+                        self._verify_db_data(name, db, v, _id)
+                verified = verify
+
+            elif field == "data":
+                for _id, v in stream.iter_object():
+                    if verified:
+                        self._verify_db_data(name, db, v, _id)
+                    data[_id] = v
+
+            else:
+                stream.skip_value()
+
+        return data
+
+    def _verify_db_data(self, name: str, db: DB, data: Dict[str, Any], _id: str) -> None:
+        try:
+            db._verify_data(data, _id)
+        except KeyError:
+            raise KeyError(f"The key provided for the DB {name!r} -> ({db.keys}) does not match the keys"
+                           f" in the cluster data ({list(data.keys())}) of the id {_id!r}") from None
+
+
+def _db_file(name: str) -> str:
+    """The name of the file of a DB in a cluster directory"""
+    return f"{quote(name, safe='')}.db.json"
+
+
+def _manifest_files(directory: str) -> Set[str]:
+    """The DB files listed in the manifest of a cluster directory, none if it has no manifest"""
+    try:
+        with open(os.path.join(directory, MANIFEST), "r") as f:
+            return {info["file"] for info in json.load(f)["dbs"].values()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+
+def _remove_stale_files(directory: str, files: Collection[str]) -> None:
+    """Remove the DB files (and their headers) of a cluster directory that its last manifest listed but the new
+    one doesn't, like the files of deleted DBs and the files written with another compression.
+    The other files of the directory are never touched"""
+    for name in files:
+        if os.path.basename(name) != name:
+            # a manifest only lists the files in its directory
+            continue
+        for path in (os.path.join(directory, name), header_path(os.path.join(directory, name))):
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+def _map_threads(func: Callable[[str], T], items: List[str], max_workers: Optional[int]) -> List[T]:
+    if len(items) < 2:
+        return list(map(func, items))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pysondb-cluster") as executor:
+        return list(executor.map(func, items))
+
+
+def _combined_progress(progress: Optional[ProgressCallback],
+                       paths: List[str]) -> Optional[Callable[[str, int, int], None]]:
+    """Report the progress of reading multiple files at once as the progress of reading all of them"""
+    if progress is None:
+        return None
+
+    total = sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+    done: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def update(path: str, read: int, _: int) -> None:
+        with lock:
+            done[path] = read
+            progress(sum(done.values()), total)
+
+    return update
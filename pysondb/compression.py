@@ -0,0 +1,169 @@
+import gzip
+import io
+import lzma
+import os
+import zlib
+from contextlib import contextmanager
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import cast
+from typing import IO
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+from .stream import ProgressCallback
+
+COMPRESSIONS = ("gzip", "lzma", "zlib")
+
+# the file extensions that select a compression, and the extension of the files written with each
+EXTENSIONS = {".gz": "gzip", ".xz": "lzma", ".lzma": "lzma", ".zz": "zlib"}
+SUFFIXES = {"gzip": ".gz", "lzma": ".xz", "zlib": ".zz"}
+
+DEFAULT_LEVEL = 6
+
+# the errors raised while reading a broken compressed file, gzip raises an OSError before Python 3.8
+DECOMPRESSION_ERRORS: Tuple[Type[Exception], ...] = (
+    EOFError, zlib.error, lzma.LZMAError, getattr(gzip, "BadGzipFile", OSError),
+)
+
+_CHUNK_SIZE = 1 << 16
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+
+def compression_for(filename: str, compression: Optional[str] = None) -> Optional[str]:
+    """The compression of a file that is written, the `compression` argument or the one of the extension"""
+    if compression is not None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r}, use one of {list(COMPRESSIONS)}")
+        return compression
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def detect(head: bytes) -> Optional[str]:
+    """The compression of a file from its first bytes, None if it is not compressed.
+    A JSON file never starts with these bytes, and neither does a binary or a mapped file"""
+    if head.startswith(_GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(_XZ_MAGIC):
+        return "lzma"
+    # the zlib header is a 0x78 followed by a byte that makes the pair a multiple of 31
+    if len(head) >= 2 and head[0] == 0x78 and (head[0] << 8 | head[1]) % 31 == 0:
+        return "zlib"
+    return None
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress the content of a file if it is compressed"""
+    compression = detect(data[:len(_XZ_MAGIC)])
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "lzma":
+        return lzma.decompress(data)
+    if compression == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+@contextmanager
+def open_data(filename: str, progress: Optional[ProgressCallback] = None
+              ) -> Iterator[Tuple[BinaryIO, Optional[ProgressCallback]]]:
+    """Open a file for reading, a compressed file is decompressed while it is read.
+    Also returns a progress callback that reports the bytes read from the file, not the decompressed bytes"""
+    with open(filename, "rb") as f:
+        compression = detect(f.read(len(_XZ_MAGIC)))
+        f.seek(0)
+        if compression is None:
+            yield f, progress
+            return None
+
+        with _reader(f, compression) as data:
+            yield data, None if progress is None else _file_progress(f, progress)
+
+
+def _file_progress(f: BinaryIO, progress: ProgressCallback) -> ProgressCallback:
+    def report(_: int, total: int) -> None:
+        progress(f.tell(), total)
+    return report
+
+
+def write_compressed(f: IO[Any], write: Callable[[IO[Any]], None], compression: str,
+                     level: Optional[int] = None, binary: bool = False) -> None:
+    """Write to the file through a compressor, the text written by `write` is encoded as UTF-8"""
+    level = DEFAULT_LEVEL if level is None else level
+    if not 0 <= level <= 9:
+        raise ValueError(f"The compression level must be between 0 and 9, not {level}")
+
+    with _writer(f, compression, level) as out:
+        if binary:
+            write(out)
+            return None
+
+        text = io.TextIOWrapper(out, encoding="utf-8")
+        write(text)
+        text.flush()
+        # the compressor is closed by the with block, the wrapper must not close it first
+        text.detach()
+
+
+def _reader(f: BinaryIO, compression: str) -> BinaryIO:
+    if compression == "gzip":
+        return cast(BinaryIO, gzip.GzipFile(fileobj=f, mode="rb"))
+    if compression == "lzma":
+        return cast(BinaryIO, lzma.LZMAFile(f, "rb"))
+    return cast(BinaryIO, io.BufferedReader(_ZlibReader(f), _CHUNK_SIZE))
+
+
+def _writer(f: IO[Any], compression: str, level: int) -> BinaryIO:
+    if compression == "gzip":
+        # without the time in the header, the same values are always written as the same bytes
+        return cast(BinaryIO, gzip.GzipFile(filename="", fileobj=f, mode="wb", compresslevel=level, mtime=0))
+    if compression == "lzma":
+        return cast(BinaryIO, lzma.LZMAFile(f, "wb", preset=level))
+    return cast(BinaryIO, io.BufferedWriter(_ZlibWriter(f, level), _CHUNK_SIZE))
+
+
+class _ZlibReader(io.RawIOBase):
+    """Decompresses a zlib stream while it is read, the stdlib only has file objects for gzip and lzma"""
+
+    def __init__(self, f: BinaryIO) -> None:
+        self._f = f
+        self._decompressor = zlib.decompressobj()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        size = len(b)
+        data = b""
+        while not data and not self._decompressor.eof:
+            chunk = self._decompressor.unconsumed_tail or self._f.read(_CHUNK_SIZE)
+            if not chunk:
+                raise EOFError("The compressed file ended before the end of the stream")
+            data = self._decompressor.decompress(chunk, size)
+
+        b[:len(data)] = data
+        return len(data)
+
+
+class _ZlibWriter(io.RawIOBase):
+    """Compresses the data written to it into a zlib stream, the stream ends when it is closed"""
+
+    def __init__(self, f: IO[Any], level: int) -> None:
+        self._f = f
+        self._compressor = zlib.compressobj(level)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        self._f.write(self._compressor.compress(b))
+        return len(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._f.write(self._compressor.flush())
+        super().close()
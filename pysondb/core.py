@@ -1,39 +1,173 @@
 import json
+import os
+import struct
 import sys
+import threading
+import time
 import warnings
+from concurrent.futures import Future
+from contextlib import contextmanager
 from copy import deepcopy
+from functools import partial
+from itertools import islice
 from pathlib import Path
 from pprint import pformat
 from random import randint
 from typing import Any
 from typing import Callable
+from typing import cast
+from typing import Collection
 from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import MutableMapping
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
+from . import binary
+from . import mapped
+from .aggregate import Aggregation
+from .aggregate import distinct
+from .cache import CacheInfo
+from .cache import query_key
+from .cache import QueryCache
+from .compression import compression_for
+from .compression import DECOMPRESSION_ERRORS
+from .compression import open_data
+from .cursor import Batch
+from .cursor import Cursor
+from .cursor import decode_token
+from .cursor import Resume
+from .delta import Changes
+from .delta import delta_path
+from .delta import delta_paths
+from .delta import read_delta
+from .delta import remove_deltas
+from .delta import write_delta
+from .files import atomic_write
+from .files import BackgroundWriter
+from .header import file_checksum
+from .header import matches
+from .header import read_header
+from .header import write_header
+from .ids import IdGenerator
+from .ids import new_id_generator
+from .index import IdSet
+from .index import Index
+from .index import INDEX_TYPES
+from .journal import Journal
+from .locks import locked
+from .locks import RWLock
+from .metrics import file_size
+from .metrics import instrumented
+from .metrics import Metrics
+from .query import Conditions
+from .query import match
+from .query import normalize_query
+from .schema import KeyType
+from .schema import Schema
+from .storage import new_store
+from .storage import STORAGE_TYPES
+from .storage import store_from_columns
+from .stream import JSONObjectStream
+from .stream import ProgressCallback
+from .views import FrozenView
+
+# a cursor reads each of its batches with `_read_batch`, so a batch is read while holding the read lock
+_READ_METHODS = (
+    "id_exists", "get_by_id", "get_by_query", "get_all", "values", "count", "distinct", "aggregate", "explain",
+    "_read_batch",
+)
+_WRITE_METHODS = (
+    "load", "set_id_generator", "reserve_ids", "create_index", "drop_index", "add", "add_many", "pop",
+    "update_by_id", "update_by_query", "delete_by_id", "delete_all", "delete_by_query",
+)
+_COMMIT_METHODS = ("commit", "compact")
+
+# the operation names of the methods that are not named after the operation, the batches of a cursor count as "iter"
+_OP_NAMES = {"_read_batch": "iter"}
+
+# the formats of the DB files, the format of a file is detected when it is loaded
+FORMATS = ("json", "binary", "mapped")
+
+# a full commit rewrites the file, a delta commit writes the values that changed since to a file next to it
+COMMIT_MODES = ("full", "delta")
+
 
 class DB:
 
-    def __init__(self, keys: List[str], verify_data: bool = True,  dynamic: bool = False) -> None:
-        """Perform CRUD operations on a JSON DB"""
+    def __init__(self, keys: List[str], verify_data: bool = True,  dynamic: bool = False,
+                 copy_on_read: bool = True, journal: bool = False, compact_size: Optional[int] = None,
+                 async_commit: bool = False, thread_safe: bool = False, storage: str = "dict",
+                 id_generator: Union[None, str, Callable[[], str]] = None,
+                 types: Optional[Dict[str, KeyType]] = None, query_cache: int = 0,
+                 metrics: Union[bool, Metrics] = False) -> None:
+        """Perform CRUD operations on a JSON DB.
+        With `copy_on_read=False` the get methods return read-only views instead of deep copies.
+        With `journal=True` a commit only appends the changes to a log next to the DB file,
+        the log is folded into the DB file by `compact` or once it grows beyond `compact_size` bytes.
+        With `async_commit=True` the files are written on a background thread.
+        With `thread_safe=True` the DB can be shared by threads, the reads run concurrently
+        while the writes get exclusive access.
+        `storage` is how the values are kept in memory, 'dict' stores them as they are, 'tuple' stores
+        the values of each record in a tuple and 'columns' stores the values of each key in a list.
+        `id_generator` is passed to `set_id_generator`, by default the ids are random 20 digit numbers.
+        `types` maps some of the keys to the type of their values (or a tuple of types), like `{"age": int}`.
+        `query_cache` is the number of queries whose matching ids are cached until the DB changes, 0 disables it.
+        With `metrics=True` (or a `Metrics` shared with other DBs) the calls of the methods are counted and timed"""
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown storage {storage!r}, use one of {sorted(STORAGE_TYPES)}")
 
-        # An in memory copy of the db
-        self._db: Dict[str, Dict[str, Any]] = {}
+        self._storage = storage
         self._verify = verify_data
-        self._keys = sorted(keys)
-        self._id_generator = self._generate_id
+        self._schema = Schema(keys, types)
+        self._keys = self._schema.keys
+
+        # An in memory copy of the db
+        self._db: MutableMapping[str, Dict[str, Any]] = new_store(storage, self._keys)
+        self._id_generator: Callable[[], str] = self._generate_id
+        if id_generator is not None:
+            self.set_id_generator(id_generator)
         self._d_loading = dynamic
+        self._copy_on_read = copy_on_read
+
+        # secondary indexes, key -> index of the values of that key
+        self._indexes: Dict[str, Index] = {}
+
+        self._journal = Journal(compact_size) if journal else None
+        self._writer = BackgroundWriter() if async_commit else None
 
         # a flag to check whether any CRUD operation have been performed on the DB
         self._db_updated: bool = False
+        # the ids of the values that changed since the DB file was written, for the delta commits
+        self._changes = Changes()
+
+        # counts up on every change of the values, the cached queries of an older generation are stale
+        self._generation = 0
+        self._query_cache = QueryCache(query_cache) if query_cache > 0 else None
+
+        self._lock = RWLock() if thread_safe else None
+        if self._lock is not None:
+            self._make_thread_safe(self._lock)
+
+        self._metrics = Metrics() if metrics is True else metrics or None
+        if self._metrics is not None:
+            # the time waiting for the lock is a part of the operation
+            self._instrument(self._metrics)
 
     def __repr__(self) -> str:
         """A pretty format of the DB"""
+        if self._lock is not None:
+            with self._lock.read():
+                return self._format()
+        return self._format()
+
+    def _format(self) -> str:
         if sys.version_info >= (3, 8):
-            return pformat(self._db, sort_dicts=False, width=80)
+            return pformat(self._as_dict(), sort_dicts=False, width=80)
         else:
-            return pformat(self._db)
+            return pformat(self._as_dict())
 
     def __len__(self) -> int:
         """Get the number of entries in the DB"""
@@ -43,10 +177,45 @@ class DB:
     def keys(self) -> List[str]:
         return self._keys
 
-    def load(self, filename: str, force: bool = False) -> None:
-        """Load an already existing DB"""
+    @property
+    def indexes(self) -> List[str]:
+        """Returns the keys that are indexed"""
+        return sorted(self._indexes)
+
+    @property
+    def metrics(self) -> Optional[Metrics]:
+        """The metrics of the operations of the DB, None unless the DB was created with `metrics`"""
+        return self._metrics
+
+    def load(self, filename: str, force: bool = False, progress: Optional[ProgressCallback] = None,
+             verify: Union[bool, str] = True) -> None:
+        """Load an already existing DB.
+        `progress` is called with the number of bytes read so far and the size of the file.
+        With `verify="auto"` the values are not verified if the file was written by a commit of a DB
+        with the same keys and types and was not changed since, `verify=False` never verifies them"""
+        if verify not in (True, False, "auto"):
+            raise ValueError(f"Unknown verify {verify!r}, use True, False or 'auto'")
+
         if not self._db_updated or force is True:
-            self._load_json_db(filename)
+            if self._writer is not None:
+                # read the file only after the pending commits are written
+                self._writer.wait()
+            self._load_db_file(filename, progress=progress, verify=verify)
+            if self._journal is not None:
+                self._replay_journal(filename)
+            else:
+                self._apply_deltas(filename, verify=bool(verify) and self._verify)
+            if self._metrics is not None:
+                size = file_size(filename)
+                if self._journal is not None:
+                    size += file_size(Journal.log_path(filename))
+                else:
+                    size += sum(file_size(path) for _, path in delta_paths(filename)[:self._changes.seq])
+                self._metrics.count_bytes("load", read=size)
+            self._generation += 1
+            self._rebuild_indexes()
+            if isinstance(self._id_generator, IdGenerator):
+                self._id_generator.seen(self._db)
             self._db_updated = False
 
         else:
@@ -54,24 +223,125 @@ class DB:
                 "You have un-committed data in your DB. This data will be lost during the "
                 "loading of an external DB. If this is intentional use 'force=True'"), stacklevel=2)
 
-    def commit(self, filename: str, indent: Optional[int] = None) -> None:
-        """Store the current instance of the DB in a file"""
-        self._dump_db_to_json(filename, indent=indent)
-        self._db_updated = False
+    def commit(self, filename: str, indent: Optional[int] = None, format: str = "json",
+               compression: Optional[str] = None, compression_level: Optional[int] = None,
+               mode: str = "full", header: bool = False) -> Optional["Future[None]"]:
+        """Store the current instance of the DB in a file.
+        `format` is 'json', 'binary' or 'mapped', a binary file is smaller and faster to load
+        and a mapped file can be opened by a `MappedDB`.
+        `compression` is 'gzip', 'lzma' or 'zlib', by default it is chosen by the extension of the file
+        ('.gz', '.xz' or '.zz'). `compression_level` goes from 0 (fastest) to 9 (smallest), the default is 6.
+        With `mode="delta"` only the values added, updated or deleted since the file was loaded or last written
+        are written, to a delta file next to it (`<filename>.delta.<n>`), `load` applies the deltas to the file.
+        The file is written in full if the DB was not loaded from it or written to it before.
+        With `header=True` a file that is written in full gets a header next to it (`<filename>.header`),
+        so that `load(verify="auto")` can skip verifying its values.
+        With `async_commit=True` the file is written on a background thread from a snapshot of the DB,
+        and the returned future is done once the data is on the disk"""
+        if mode not in COMMIT_MODES:
+            raise ValueError(f"Unknown mode {mode!r}, use one of {list(COMMIT_MODES)}")
+        compression = self._check_format(filename, format, compression)
+
+        job: Optional[Callable[[], None]] = None
+        if mode == "delta":
+            if self._journal is not None:
+                raise ValueError("A journaled DB appends its changes to the journal, use mode='full'")
+            job = self._delta_job(filename, compression, compression_level)
+
+        elif self._journal is not None and self._journal.base == filename:
+            lines = self._journal.take()
+            if not self._journal.needs_compaction():
+                job = partial(self._append_journal, filename, lines, self._journal.checksum)
+
+        if job is None:
+            job = self._dump_job(filename, indent, format, compression, compression_level, header)
+
+        return self._run_write(job)
+
+    def compact(self, filename: str, indent: Optional[int] = None, format: str = "json",
+                compression: Optional[str] = None, compression_level: Optional[int] = None,
+                header: bool = False) -> Optional["Future[None]"]:
+        """Write the entire DB to the file and remove its journal"""
+        compression = self._check_format(filename, format, compression)
+        job = self._dump_job(filename, indent, format, compression, compression_level, header)
+        return self._run_write(job)
+
+    def squash(self, filename: str, indent: Optional[int] = None, format: str = "json",
+               compression: Optional[str] = None, compression_level: Optional[int] = None,
+               header: bool = False) -> Optional["Future[None]"]:
+        """Merge the deltas of the file back into it, the same as `compact`.
+        Load the file first, the DB holds the file and its deltas once it is loaded"""
+        # not wrapped by `_make_thread_safe` and `_instrument`, the call of `compact` holds the lock
+        return self.compact(filename, indent, format, compression, compression_level, header)
 
-    def set_id_generator(self, func: Callable[[], str]) -> None:
+    @contextmanager
+    def write_batch(self) -> Iterator[None]:
+        """Hold the write lock of a thread safe DB across multiple changes,
+        no other thread can read or write until the block ends"""
+        if self._lock is None:
+            yield
+            return None
+
+        with self._lock.write():
+            yield
+
+    def set_id_generator(self, func: Union[str, Callable[[], str]]) -> None:
+        """Use a function to create the ids of the new values, or one of the built in generators:
+        'counter' for the ids 1, 2, 3 ..., 'time' for time ordered ids and 'uuid' for uuid4 hex ids"""
+        if isinstance(func, str):
+            func = new_id_generator(func)
+        if isinstance(func, IdGenerator):
+            func.seen(self._db)
         self._id_generator = func
 
+    def reserve_ids(self, n: int) -> List[str]:
+        """Get n new ids at once. The ids of the built in generators are not checked against the
+        ids in the DB, since they never collide"""
+        generate = self._id_generator
+        if isinstance(generate, IdGenerator):
+            return generate.reserve(n)
+
+        if generate != self._generate_id:
+            return [str(generate()) for _ in range(n)]
+
+        ids: Dict[str, None] = {}
+        while len(ids) < n:
+            ids[self._generate_id()] = None
+        return list(ids)
+
     def id_exists(self, _id: str) -> bool:
         return _id in self._db
 
+    def create_index(self, key: str, kind: str = "hash") -> None:
+        """Index the values of a key, so that queries on that key don't have to scan the DB.
+        A 'hash' index answers equality and '$in' queries, a 'sorted' index also answers range queries"""
+        if key not in self._keys and not self._d_loading:
+            raise KeyError(f"Cannot index {key!r}, it is not one of the keys in the DB")
+
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown index kind {kind!r}, use one of {sorted(INDEX_TYPES)}")
+
+        if not isinstance(self._indexes.get(key), INDEX_TYPES[kind]):
+            index = INDEX_TYPES[kind](key)
+            index.rebuild(self._db.items())
+            self._indexes[key] = index
+
+    def drop_index(self, key: str) -> None:
+        """Remove the index of a key"""
+        self._indexes.pop(key, None)
+
+    def query_cache_info(self) -> CacheInfo:
+        """The hits, misses, maximum size and current size of the query cache"""
+        if self._query_cache is None:
+            return CacheInfo(0, 0, 0, 0)
+        return self._query_cache.info()
+
     def add(self, data: Dict[str, Any]) -> str:
         """Add a value to the DB"""
 
         if self._verify_data(data):
             _id = str(self._id_generator())
-            self._db[_id] = data
-            self._db
+            self._insert(_id, data)
             self._db_updated = True
             return _id
         return "0"
@@ -80,56 +350,150 @@ class DB:
         """Add more than one value to the DB at a time"""
 
         if self._verify:
-            for d in data:
-                self._verify_data(d)
-
-        for d in data:
-            self._db[str(self._id_generator())] = d
+            self._schema.validate_many(data)
 
+        self._insert_many(list(zip(self.reserve_ids(len(data)), data)))
         self._db_updated = True
 
     def get_by_id(self, _id: str) -> Union[None, Dict[str, Any]]:
         """Get the value from the DB based on the _id"""
         _id = str(_id)
         if _id in self._db:
-            return deepcopy(self._db[_id])
+            return self._read(self._db[_id])
 
         return None
 
     def get_by_query(self, query: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
         """Get the values from the DB based on the query conditions"""
-        return deepcopy({
-            i: x
-            for i, x in self._db.items()
-            if all(k in x and x[k] == v for k, v in query.items())
-        })
+        return self._read_many(self._query_ids(query))
 
     def get_all(self) -> Dict[str, Dict[str, Any]]:
         """Returns the entire DB"""
-        return deepcopy(self._db)
+        if not self._copy_on_read:
+            # a live view over the whole DB, nothing is copied
+            return cast(Dict[str, Dict[str, Any]], FrozenView(self._db))
+        return deepcopy(self._as_dict())
 
     def pop(self, _id: str) -> Union[None, Dict[str, Any]]:
         """Remove and return item of the specified id"""
 
-        data = self.get_by_id(_id)
+        if self._copy_on_read:
+            data = self.get_by_id(_id)
+        else:
+            # the value is no longer a part of the DB, so it can be handed out as is
+            data = self._db.get(str(_id))
         self.delete_by_id(_id)
         self._db_updated = True
         return data
 
     def values(self, count: int = 5, last: bool = False) -> Dict[str, Dict[str, Any]]:
-        if not last:
-            keys = list(self._db)[:count]
-        else:
-            keys = list(self._db)[-count:]
+        # the same values as slicing a list of the ids, without building the list
+        window = slice(-count, None) if last else slice(count)
+        start, stop, _ = window.indices(len(self._db))
+        return dict(islice(self.iter(offset=start, batch_size=max(stop - start, 1)), stop - start))
+
+    def iter(self, query: Optional[Dict[str, Any]] = None, offset: int = 0, limit: Optional[int] = None,
+             batch_size: int = 1000, cursor: Optional[str] = None) -> Cursor:
+        """Iterate over the (id, value) pairs of the DB in its order, or over the ones that match the query.
+        The values are read `batch_size` at a time, `offset` skips the first values and `limit` stops after
+        that many values. `Cursor.token` is the position after the last value returned, pass it as `cursor`
+        (with the same query) to continue from there, even if the DB changed in the meantime.
+        If the last value returned was deleted since, the ids of the 'counter' and 'time' generators tell where
+        to continue. With other ids the cursor assumes that no other value before it was deleted, and skips
+        a value for each one that was"""
+        conditions = None if query is None else normalize_query(query)
+        position, last_id = (0, None) if cursor is None else decode_token(cursor)
+        return Cursor(partial(self._read_batch, conditions), position, last_id, skip=offset, limit=limit,
+                      batch_size=batch_size)
+
+    def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        """Get the number of values that match the query, or of all the values.
+        The conditions on indexed keys are counted from the indexes"""
+        if query is None:
+            return len(self._db)
+        return len(self._query_ids(query))
+
+    def distinct(self, key: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Get the distinct values of a key, in the values that match the query or in all the values.
+        Without a query the values are taken from the index of the key, if it has one"""
+        self._check_key(key)
+        groups = self._index_groups(key, query)
+        if groups is not None:
+            return [value for value, _ in groups]
+        return distinct(record[key] for record in self._records(query) if key in record)
+
+    def aggregate(self, group_by: Optional[str] = None, ops: Optional[Dict[str, List[str]]] = None,
+                  query: Optional[Dict[str, Any]] = None) -> Dict[Any, Dict[str, Any]]:
+        """Count the values that match the query (or all the values) in groups of the same value of `group_by`,
+        and apply the operators ('count', 'sum', 'min', 'max', 'avg') to the values of the keys in `ops`.
+        Returns `{group: {"count": ..., key: {op: result}}}`, the only group is None without `group_by`.
+        None and the values that can't be compared or added are left out of min, max, sum and avg,
+        a list or dict `group_by` value is grouped as a tuple. The values are read in place, they are not copied"""
+        aggregation = Aggregation(ops or {})
+        for key in ops or {}:
+            self._check_key(key)
+        if group_by is None:
+            for record in self._records(query):
+                aggregation.add(None, record)
+            return aggregation.result()
 
-        return deepcopy({i: self._db[i] for i in keys})
+        self._check_key(group_by)
+        groups = self._index_groups(group_by, query)
+        if groups is None:
+            for record in self._records(query):
+                if group_by in record:
+                    aggregation.add(record[group_by], record)
+            return aggregation.result()
+
+        for value, ids in groups:
+            if not aggregation.needs_values:
+                # the number of values in each group is all that is needed
+                aggregation.add_count(value, len(ids))
+                continue
+            for _id in ids:
+                aggregation.add(value, self._db[_id])
+        return aggregation.result()
+
+    def explain(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the query like `get_by_query`, `update_by_query` and `delete_by_query` would, and describe how it ran.
+        The plan is 'full_scan', 'index_lookup' or 'index_intersection', `indexes` are the index lookups
+        and `filter` the conditions checked on the values. `estimated` is the number of values the plan expected
+        to check, `examined` the number it checked and `time` the seconds spent in each phase.
+        `cached` is True if the query cache holds the result, the query would then not run at all"""
+        start = time.perf_counter()
+        conditions = normalize_query(query)
+        key = query_key(conditions) if self._query_cache is not None else None
+        cached = self._query_cache is not None and key is not None and self._query_cache.contains(key, self._generation)
+        planned = time.perf_counter()
+
+        lookups, rest = self._lookup_indexes(conditions)
+        looked_up = time.perf_counter()
+        ids, estimated, examined = self._match_ids(lookups, rest)
+        end = time.perf_counter()
+
+        return {
+            "plan": "full_scan" if not lookups else "index_lookup" if len(lookups) == 1 else "index_intersection",
+            "cached": cached,
+            "indexes": [
+                {"key": k, "kind": self._indexes[k].kind, "operators": ops, "matched": len(matched)}
+                for k, ops, matched in lookups
+            ],
+            "filter": rest,
+            "estimated": estimated,
+            "examined": examined,
+            "returned": len(ids),
+            "time": {"plan": planned - start, "index": looked_up - planned, "filter": end - looked_up,
+                     "total": end - start},
+        }
 
     def update_by_id(self, _id: str, data: Dict[str, Any]) -> None:
         """Update a value by it id"""
         if self._db:
             if all(i in self._keys for i in data):
                 if _id in self._db:
-                    self._db[_id].update(data)
+                    if self._verify:
+                        self._schema.validate_update(data, _id)
+                    self._update_record(_id, data)
                     self._db_updated = True
             else:
                 raise KeyError(
@@ -140,11 +504,12 @@ class DB:
         """Update values based on the query"""
         if self._db:
             if all(i in self._keys for i in query) and all(i in self._keys for i in new_data):
-                ids = list(
-                    self.get_by_query(query)
-                )  # get the ids of all the values that need to updated
+                if self._verify:
+                    self._schema.validate_update(new_data)
+                # get the ids of all the values that need to updated
+                ids = self._query_ids(query)
                 for i in ids:
-                    self._db[i].update(new_data)
+                    self._update_record(i, new_data)
                 self._db_updated = True
                 return ids
 
@@ -157,17 +522,19 @@ class DB:
     def delete_by_id(self, _id: str) -> None:
         """Delete values based in id"""
         if _id in self._db:
+            self._on_delete(_id, self._db[_id])
             del self._db[_id]
             self._db_updated = True
 
     def delete_all(self) -> None:
         """Delete all the values from the DB"""
         self._db.clear()
+        self._on_clear()
         self._db_updated = True
 
     def delete_by_query(self, query: Dict[str, Any]) -> List[str]:
         """Delete values based on a query"""
-        _ids = list(self.get_by_query(query).keys())
+        _ids = self._query_ids(query)
         for _id in _ids:
             self.delete_by_id(_id)
         self._db_updated = True
@@ -182,43 +549,609 @@ class DB:
 
         return str(_id)
 
-    def _load_json_db(self, filename: str) -> None:
-        """Loads the JSON file if it exists"""
+    def _instrument(self, metrics: Metrics) -> None:
+        """Replace the methods of this instance with ones that count and time their calls,
+        the DBs without metrics keep calling the plain methods"""
+        for name in _READ_METHODS + _WRITE_METHODS + _COMMIT_METHODS:
+            setattr(self, name, instrumented(metrics, _OP_NAMES.get(name, name), getattr(self, name)))
+
+    def _make_thread_safe(self, lock: RWLock) -> None:
+        """Replace the public methods of this instance with ones that hold the lock,
+        the DBs that are not thread safe keep calling the plain methods"""
+        commit_lock = threading.Lock()
+
+        @contextmanager
+        def commit_guard() -> Iterator[None]:
+            # a commit only reads the DB, but the commits must not run alongside each other
+            with lock.read(), commit_lock:
+                yield
+
+        for name in _READ_METHODS:
+            setattr(self, name, locked(lock.read, getattr(self, name)))
+        for name in _WRITE_METHODS:
+            setattr(self, name, locked(lock.write, getattr(self, name)))
+        for name in _COMMIT_METHODS:
+            setattr(self, name, locked(commit_guard, getattr(self, name)))
+
+    def _read(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a deep copy or a read-only view of a value, based on `copy_on_read`"""
+        if self._copy_on_read:
+            return deepcopy(data)
+        # the views behave like a dict for reading, but cannot be modified
+        return cast(Dict[str, Any], FrozenView(data))
+
+    def _read_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if self._copy_on_read:
+            return deepcopy({i: self._db[i] for i in ids})
+        return {i: cast(Dict[str, Any], FrozenView(self._db[i])) for i in ids}
+
+    def _read_batch(self, conditions: Optional[Conditions], position: int, last_id: Optional[str],
+                    skip: int, size: int, resume: Resume = None) -> Tuple[Batch, Resume]:
+        """Read the next `size` values of a cursor that match the conditions, after skipping `skip` of them"""
+        if resume is not None and resume[0] == self._generation and not skip:
+            start, ids = position, resume[1]
+        else:
+            start = self._locate(position, last_id)
+            if conditions is None:
+                start, skip = start + skip, 0
+            ids = islice(self._db, start, None)
+
+        batch: Batch = []
+        i = start
+        for i, _id in enumerate(ids, start + 1):
+            value = self._db[_id]
+            if conditions is not None and not match(value, conditions):
+                continue
+            if skip:
+                skip -= 1
+                continue
+
+            batch.append((i, _id, self._read(value)))
+            if len(batch) == size:
+                break
+
+        if self._metrics is not None:
+            self._metrics.count_scan(i - start, len(batch))
+        return batch, (self._generation, ids)
+
+    def _locate(self, position: int, last_id: Optional[str]) -> int:
+        """The position after `last_id`, which was the id before `position` when the position was taken"""
+        if last_id is None or next(islice(self._db, position - 1, None), None) == last_id:
+            return position
+
+        # the DB changed since, so the id is searched for
+        for i, _id in enumerate(self._db, 1):
+            if _id == last_id:
+                return i
+
+        # the id was deleted, the values are in the order of their ids if an ordered generator created them
+        sort_key = self._id_generator.sort_key if isinstance(self._id_generator, IdGenerator) else None
+        last_key = sort_key(last_id) if sort_key is not None else None
+        if sort_key is not None and last_key is not None:
+            for i, _id in enumerate(self._db):
+                key = sort_key(_id)
+                if key is not None and key > last_key:
+                    return i
+            return len(self._db)
+        # otherwise the values after it are taken to have moved up by one
+        return max(position - 1, 0)
+
+    def _check_key(self, key: str) -> None:
+        if key not in self._keys and not self._d_loading:
+            raise KeyError(f"{key!r} is not one of the keys in the DB")
+
+    def _records(self, query: Optional[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """The values that match the query, or all the values, without copying them"""
+        if query is None:
+            return iter(self._db.values())
+        return (self._db[i] for i in self._query_ids(query))
+
+    def _index_groups(self, key: str, query: Optional[Dict[str, Any]]) -> Optional[List[Tuple[Any, Collection[str]]]]:
+        """The distinct values of the key and the ids of the values holding each, from the index of the key.
+        None if the key has no index that holds all of its values"""
+        index = self._indexes.get(key)
+        groups = index.groups() if index is not None else None
+        if groups is None:
+            return None
+        if query is None:
+            return [(value, ids) for value, ids in groups]
+
+        matched = dict.fromkeys(self._query_ids(query))
+        result: List[Tuple[Any, Collection[str]]] = []
+        for value, ids in groups:
+            ids = [i for i in ids if i in matched]
+            if ids:
+                result.append((value, ids))
+        return result
+
+    def _query_ids(self, query: Dict[str, Any]) -> List[str]:
+        """Get the ids of all the values that match the query, from the query cache if it has them"""
+        conditions = normalize_query(query)
+        key = query_key(conditions) if self._query_cache is not None else None
+        if self._query_cache is None or key is None:
+            return self._find_ids(conditions)
+
+        ids = self._query_cache.get(key, self._generation)
+        if ids is None:
+            ids = tuple(self._find_ids(conditions))
+            self._query_cache.put(key, self._generation, ids)
+        elif self._metrics is not None:
+            self._metrics.count_scan(0, len(ids))
+        # the cached ids are never handed out, so the caller can't change them
+        return list(ids)
+
+    def _find_ids(self, conditions: Conditions) -> List[str]:
+        """The conditions on indexed keys are resolved first, the rest are checked on the matched values"""
+        ids, _, examined = self._match_ids(*self._lookup_indexes(conditions))
+        return self._count_scan(examined, ids)
+
+    def _match_ids(self, lookups: List[Tuple[str, List[str], IdSet]], rest: Conditions) -> Tuple[List[str], int, int]:
+        """Get the ids that match the index lookups and the rest of the conditions, the number of values
+        the plan expected to check and the number of values whose conditions were checked"""
+        if not lookups:
+            return [i for i, x in self._db.items() if match(x, rest)], len(self._db), len(self._db)
+
+        # intersect starting from the smallest set of ids
+        id_sets = sorted((ids for _, _, ids in lookups), key=len)
+        smallest, others = id_sets[0], id_sets[1:]
+        candidates = [i for i in smallest if all(i in ids for ids in others)] if others else list(smallest)
+        if not rest:
+            # the indexes answered the whole query, the values are not read
+            return candidates, len(smallest), 0
+        return [i for i in candidates if match(self._db[i], rest)], len(smallest), len(candidates)
+
+    def _lookup_indexes(self, conditions: Conditions) -> Tuple[List[Tuple[str, List[str], IdSet]], Conditions]:
+        """Get the ids matched by the index of each indexed key with the operators the index resolved,
+        and the conditions that are left to check on the values. Stops at the first index that matches nothing"""
+        lookups: List[Tuple[str, List[str], IdSet]] = []
+        rest = {}
+        for k, ops in conditions.items():
+            index = self._indexes.get(k)
+            indexed = {op: arg for op, arg in ops.items() if index is not None and op in index.operators}
+            ids = index.lookup(indexed) if index is not None and indexed else None
+            if ids is None:
+                rest[k] = ops
+                continue
+
+            lookups.append((k, list(indexed), ids))
+            if not ids:
+                return [lookups[-1]], {}
+            if len(indexed) < len(ops):
+                rest[k] = {op: arg for op, arg in ops.items() if op not in indexed}
+        return lookups, rest
+
+    def _count_scan(self, scanned: int, ids: List[str]) -> List[str]:
+        """Count the values checked by a query and the ones that matched, returns the matched ids"""
+        if self._metrics is not None:
+            self._metrics.count_scan(scanned, len(ids))
+        return ids
+
+    def _insert(self, _id: str, data: Dict[str, Any]) -> None:
+        """Store an already verified value under the id"""
+        self._db[_id] = data
+        self._on_add(_id, data)
+
+    def _insert_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store many already verified values, the indexes are updated once for all of them"""
+        for _id, data in items:
+            self._db[_id] = data
+        self._generation += 1
+        for index in self._indexes.values():
+            index.add_many(items)
+        for _id, data in items:
+            self._changes.add(_id)
+            if self._journal is not None:
+                self._journal.record("add", _id, data)
+
+    def _update_record(self, _id: str, data: Dict[str, Any]) -> None:
+        """Update the value of an existing id and keep the indexes and the journal up to date"""
+        record = self._db[_id]
+        # the id stays in the index of a key whose value doesn't change, it keeps its place in the index
+        indexes = [
+            self._indexes[k] for k, v in data.items()
+            if k in self._indexes and (k not in record or type(record[k]) is not type(v) or record[k] != v)
+        ]
+        for index in indexes:
+            index.remove(_id, record)
+        record.update(data)
+        # a compact storage hands out a new dict, so the record is stored again
+        self._db[_id] = record
+        self._generation += 1
+        self._changes.update(_id)
+        for index in indexes:
+            index.add(_id, record)
+        if self._journal is not None:
+            self._journal.record("update", _id, dict(data))
+
+    def _on_add(self, _id: str, data: Dict[str, Any]) -> None:
+        """Called after a value is added to the DB"""
+        self._generation += 1
+        self._changes.add(_id)
+        for index in self._indexes.values():
+            index.add(_id, data)
+        if self._journal is not None:
+            self._journal.record("add", _id, data)
+
+    def _on_delete(self, _id: str, data: Dict[str, Any]) -> None:
+        """Called before a value is deleted from the DB"""
+        self._generation += 1
+        self._changes.delete(_id)
+        for index in self._indexes.values():
+            index.remove(_id, data)
+        if self._journal is not None:
+            self._journal.record("delete", _id)
+
+    def _on_clear(self) -> None:
+        """Called after all the values are deleted from the DB"""
+        self._generation += 1
+        self._changes.clear()
+        for index in self._indexes.values():
+            index.clear()
+        if self._journal is not None:
+            self._journal.record("clear")
+
+    def _replay_journal(self, filename: str) -> None:
+        """Apply the changes from the journal of the file to the loaded DB"""
+        assert self._journal is not None
+        for entry in self._journal.read(filename):
+            op, _id = entry["op"], str(entry.get("id"))
+            if op == "add":
+                self._verify_data(entry["data"], _id)
+                self._db[_id] = entry["data"]
+            elif op == "update":
+                if _id in self._db:
+                    self._db[_id] = {**self._db[_id], **entry["data"]}
+            elif op == "delete":
+                self._db.pop(_id, None)
+            elif op == "clear":
+                self._db.clear()
+
+        if Path(filename).is_file():
+            self._journal.attach(filename)
+
+    def _apply_deltas(self, filename: str, verify: bool = True) -> None:
+        """Apply the deltas of the file to the loaded DB, in order. A delta that was written for
+        another version of the file (or can't be read) ends the chain, the deltas after it are ignored"""
+        if not Path(filename).is_file():
+            self._changes.reset()
+            return None
+
+        paths = delta_paths(filename)
+        if not paths:
+            self._changes.attach(filename)
+            return None
+
+        base = file_checksum(filename)
+        seq = 0
+        for n, path in paths:
+            delta = read_delta(path) if n == seq + 1 else None
+            if delta is None or delta.get("base") != base:
+                warnings.warn(UserWarning(
+                    f"Ignoring {path!r} and the deltas after it, they don't follow {filename!r}"), stacklevel=4)
+                break
+
+            if delta["cleared"]:
+                self._db.clear()
+            for _id in delta["deleted"]:
+                self._db.pop(_id, None)
+            for values in (delta["added"], delta["updated"]):
+                for _id, val in values.items():
+                    if verify:
+                        self._schema.validate(val, _id)
+                    self._db[_id] = val
+            seq = n
+
+        self._changes.attach(filename, seq, base, stale=seq < len(paths))
+
+    def _rebuild_indexes(self) -> None:
+        for index in self._indexes.values():
+            index.rebuild(self._db.items())
+
+    def _load_db_file(self, filename: str, progress: Optional[ProgressCallback] = None,
+                      verify: Union[bool, str] = True) -> None:
+        """Load a JSON, a binary or a mapped file, based on the first bytes of the file"""
+        if verify == "auto":
+            if self._load_trusted(filename, progress=progress):
+                return None
+            verify = True
+        verify = bool(verify) and self._verify
+
+        magic = b""
+        if Path(filename).is_file():
+            # the format of a compressed file is in its decompressed bytes
+            with open_data(filename) as (f, _):
+                magic = f.read(len(binary.MAGIC))
+
+        if magic == binary.MAGIC:
+            self._load_binary_db(filename, verify, progress=progress)
+        elif magic == mapped.MAGIC:
+            self._load_mapped_db(filename, verify, progress=progress)
+        else:
+            self._load_json_db(filename, verify, progress=progress)
+
+    def _load_trusted(self, filename: str, progress: Optional[ProgressCallback] = None) -> bool:
+        """Load a file without verifying its values, if its header was written by a DB with the same schema
+        and the file was not changed since. Returns False if the values of the file must be verified"""
+        header = read_header(filename)
+        if header is None or not self._schema.trusts(header, dynamic=self._d_loading):
+            return False
+        if not matches(header, file_checksum(filename)):
+            return False
+
+        # the values were verified by the DB that wrote the file
+        self._load_db_file(filename, progress=progress, verify=False)
+        return True
+
+    def _load_mapped_db(self, filename: str, verify: bool = True,
+                        progress: Optional[ProgressCallback] = None) -> None:
+        """Read all the values of a mapped file"""
+        try:
+            mapped_db = mapped.MappedDB(filename)
+        except ValueError:
+            warnings.warn(UserWarning(
+                f"Error while decoding {filename!r}, loading an empty DB."), stacklevel=4)
+            self._db = new_store(self._storage, self._keys)
+            return None
+
+        with mapped_db:
+            if self._d_loading:
+                if not len(mapped_db):
+                    return None
+                self._set_keys(mapped_db.keys)
+
+            data = new_store(self._storage, self._keys)
+            for _id, val in mapped_db._iter_records():
+                if verify:
+                    self._schema.validate(val, _id)
+                data[_id] = val
+
+        if progress is not None:
+            size = os.path.getsize(filename)
+            progress(size, size)
+        self._db = data
+
+    def _load_binary_db(self, filename: str, verify: bool = True,
+                        progress: Optional[ProgressCallback] = None) -> None:
+        """Load a binary file, the keys of the file are verified once for all the values"""
+        try:
+            with open_data(filename) as (f, _):
+                loaded = binary.load(f)
+        except (ValueError, struct.error) + DECOMPRESSION_ERRORS:
+            warnings.warn(UserWarning(
+                f"Error while decoding {filename!r}, loading an empty DB."), stacklevel=4)
+            self._db = new_store(self._storage, self._keys)
+            return None
+
+        if progress is not None:
+            size = os.path.getsize(filename)
+            progress(size, size)
+
+        if isinstance(loaded, dict):
+            data = new_store(self._storage, self._keys)
+            for _id, val in loaded.items():
+                if self._d_loading and not data:
+                    self._set_keys(list(val.keys()))
+                    data = new_store(self._storage, self._keys)
+                if verify:
+                    self._schema.validate(val, _id)
+                data[_id] = val
+
+            if not (self._d_loading and not data):
+                self._db = data
+            return None
+
+        if self._d_loading:
+            if not loaded.ids:
+                return None
+            self._set_keys(loaded.keys)
+
+        if verify:
+            # the values of a key are checked together
+            self._schema.validate_columns(loaded.keys, loaded.ids, loaded.columns)
+
+        self._db = store_from_columns(self._storage, loaded.keys, loaded.ids, loaded.columns)
+
+    def _load_json_db(self, filename: str, verify: bool = True,
+                      progress: Optional[ProgressCallback] = None) -> None:
+        """Loads the JSON file if it exists, the values are verified as they are read from the file"""
         if Path(filename).is_file():
             try:
-                with open(filename, "r") as f:
-                    data = json.load(f)
+                with open_data(filename, progress) as (f, report):
+                    stream = JSONObjectStream(f, progress=report, total=os.path.getsize(filename))
+                    data = new_store(self._storage, self._keys)
+
+                    for _id, val in stream.iter_object():
+                        if self._d_loading and not data:
+                            try:
+                                self._set_keys(list(val.keys()))
+                            except AttributeError:
+                                return None
+                            data = new_store(self._storage, self._keys)
+
+                        if verify:
+                            self._schema.validate(val, _id)
+                        data[_id] = val
+
+                    stream.finish()
+                    if self._d_loading and not data:
+                        return None
+
+                    self._db = data
 
-                    if self._d_loading:
-                        try:
-                            self._keys = sorted(list(data.values())[0].keys())
-                        except (IndexError, AttributeError):
-                            self._keys = self._keys
-                            return None
+            except (json.decoder.JSONDecodeError,) + DECOMPRESSION_ERRORS:
+                warnings.warn(UserWarning(
+                    f"Error while decoding {filename!r}, loading an empty DB."), stacklevel=3)
+                self._db = new_store(self._storage, self._keys)
 
-                    for val in data.values():
-                        self._verify_data(val)
+    def _set_db(self, data: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the values of the DB with values that are already verified"""
+        if STORAGE_TYPES[self._storage] is None:
+            self._db = data
+        else:
+            self._db = new_store(self._storage, self._keys)
+            self._db.update(data)
+        self._generation += 1
+        self._changes.reset()
+
+        if isinstance(self._id_generator, IdGenerator):
+            self._id_generator.seen(self._db)
+
+    def _as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """The values of the DB as a dict, the records of a compact storage are built here"""
+        if isinstance(self._db, dict):
+            return self._db
+        return dict(self._db.items())
+
+    def _dump_db(self, filename: str, indent: Optional[int] = None,
+                 data: Optional[Dict[str, Dict[str, Any]]] = None, format: str = "json",
+                 compression: Optional[str] = None, compression_level: Optional[int] = None,
+                 header: bool = False) -> None:
+        """dump the current instance of the DB (or a snapshot of it) in a file"""
+        data = self._as_dict() if data is None else data
+        if format == "binary":
+            atomic_write(filename, partial(binary.dump, data, self._keys), binary=True,
+                         compression=compression, level=compression_level)
+        elif format == "mapped":
+            atomic_write(filename, partial(mapped.dump, data, self._keys), binary=True)
+        else:
+            # json.dump writes the text in chunks, so a compressed file is compressed as it is written
+            atomic_write(filename, lambda f: json.dump(data, f, indent=indent),
+                         compression=compression, level=compression_level)
 
-                    self._db = data.copy()
+        if header and self._verify:
+            # the values were verified when they were added, so a load can trust the file
+            write_header(filename, self._schema.header(len(data)))
+        if self._metrics is not None:
+            self._metrics.count_bytes("commit", written=file_size(filename))
 
-            except json.decoder.JSONDecodeError:
-                self._db = {}
+    def _append_journal(self, filename: str, lines: str, base: Dict[str, int]) -> None:
+        assert self._journal is not None
+        if self._journal.abandoned(base):
+            # an earlier append failed, the file is written in full by the next commit
+            return None
+        try:
+            written = Journal.append(filename, lines, base)
+        except BaseException:
+            # the lines are lost, so the log can't go on
+            self._journal.abandon(base)
+            raise
+        if self._metrics is not None:
+            self._metrics.count_bytes("commit", written=written)
 
-    def _dump_db_to_json(self, filename: str, indent: Optional[int] = None) -> None:
-        """dump the current instance of the DB in a file"""
-        with open(filename, "w") as f:
-            json.dump(self._db, f, indent=indent)
+    def _check_format(self, filename: str, format: str, compression: Optional[str]) -> Optional[str]:
+        """Check the format of a commit, returns the compression of the file"""
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}, use one of {list(FORMATS)}")
+
+        compression = compression_for(filename, compression)
+        if compression is not None and format == "mapped":
+            raise ValueError("A mapped file can't be compressed, since it is read without loading it")
+        return compression
+
+    def _dump_job(self, filename: str, indent: Optional[int], format: str = "json",
+                  compression: Optional[str] = None, compression_level: Optional[int] = None,
+                  header: bool = False) -> Callable[[], None]:
+        """Get a function that writes the entire DB to the file, as it is at the time of the call"""
+        # the background writer needs a snapshot, since the values are updated in place
+        data = self._as_dict() if self._writer is None else {i: dict(x) for i, x in self._db.items()}
+        if self._journal is not None:
+            self._journal.reset(filename)
+        self._changes.reset(filename)
+        chain = self._changes.checksum
+        log = self._journal.checksum if self._journal is not None else {}
+
+        def job() -> None:
+            try:
+                self._dump_db(filename, indent=indent, data=data, format=format,
+                              compression=compression, compression_level=compression_level, header=header)
+            except BaseException:
+                # the journal and the deltas of the file must not follow the old file
+                self._changes.abandon(chain)
+                if self._journal is not None:
+                    self._journal.abandon(log)
+                raise
+            if self._journal is not None:
+                # if this is interrupted the old log doesn't match the new file, so it is not replayed
+                Journal.remove(filename)
+            # if this is interrupted the old deltas don't match the new file, so they are ignored
+            remove_deltas(filename)
 
-    def _verify_data(self, data: Dict[str, Any]) -> bool:
+        return job
+
+    def _delta_job(self, filename: str, compression: Optional[str] = None,
+                   compression_level: Optional[int] = None) -> Optional[Callable[[], None]]:
+        """Get a function that writes the values that changed since the last commit to the next delta of the file,
+        None if the file must be written in full"""
+        changes = self._changes
+        if changes.base != filename:
+            return None
+        if not (len(changes) or changes.cleared or changes.stale):
+            # nothing changed, no delta is written
+            return lambda: None
+
+        stale, base = changes.stale, changes.checksum
+        taken = changes.take()
+        cleared, added, updated, deleted = taken
+        seq = changes.seq
+        # the values are copied, since they are updated in place and the background writer writes them later
+        delta: Dict[str, Any] = {
+            "cleared": cleared,
+            "added": {i: dict(self._db[i]) for i in added},
+            "updated": {i: dict(self._db[i]) for i in updated},
+            "deleted": deleted,
+        }
+
+        def job() -> None:
+            path = delta_path(filename, seq)
+            try:
+                if not base:
+                    # the file is written by an earlier job, so it is read once it is on the disk
+                    base.update(file_checksum(filename))
+                if stale:
+                    remove_deltas(filename, after=seq - 1)
+                write_delta(path, {"base": base, **delta}, compression, compression_level)
+            except BaseException:
+                if self._writer is None:
+                    # the changes are written by the next delta commit
+                    changes.stale = stale
+                    changes.restore(taken)
+                else:
+                    # the later deltas may already be taken, the chain can't go on without this one
+                    changes.abandon(base)
+                raise
+
+            if self._metrics is not None:
+                self._metrics.count_bytes("commit", written=file_size(path))
+
+        return job
+
+    def _run_write(self, job: Callable[[], None]) -> Optional["Future[None]"]:
+        """Run a job that writes the DB to its file, the DB is marked as not committed again if it fails"""
+        self._db_updated = False
+
+        def run() -> None:
+            try:
+                job()
+            except BaseException:
+                # a load must not silently drop the values that are not on the disk
+                self._db_updated = True
+                raise
+
+        if self._writer is None:
+            run()
+            return None
+        return self._writer.submit(run)
+
+    def _set_keys(self, keys: List[str]) -> None:
+        """Change the keys of a dynamic DB, the types of the keys are kept"""
+        self._schema = Schema(keys, self._schema.types)
+        self._keys = self._schema.keys
+
+    def _verify_data(self, data: Dict[str, Any], _id: Optional[str] = None) -> bool:
         """verify whether the data provided has the same keys
-         as provided in the keys list"""
+         as provided in the keys list, and the types of the typed keys"""
 
         if self._verify:
-            if self._keys == sorted(data.keys()):
-                return True
-
-            else:
-                raise KeyError(
-                    "The keys provided in the data does not match the provided keys.")
+            self._schema.validate(data, _id)
 
         return True
@@ -0,0 +1,88 @@
+import base64
+import json
+from collections import deque
+from typing import Any
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# the position in the DB after a value, and the value: (position, id, value)
+Batch = List[Tuple[int, str, Dict[str, Any]]]
+
+# the generation of the DB when a batch was read and an iterator over the ids after the batch,
+# the next batch continues with the iterator if the DB did not change since
+Resume = Optional[Tuple[int, Iterator[str]]]
+
+# called with the position of the cursor, the number of matching values to skip, the size of the batch
+# and where the last batch ended
+FetchBatch = Callable[[int, Optional[str], int, int, Resume], Tuple[Batch, Resume]]
+
+
+class Cursor(Iterator[Tuple[str, Dict[str, Any]]]):
+    """Iterates over the (id, value) pairs of a DB, reading the values a batch at a time.
+
+    Only the current batch is held in memory. The position of the cursor is the number of
+    ids in the DB before the next value and the id before it, so the cursor can find its
+    place again when the DB changed between the batches, and `token` can continue the
+    iteration later with `DB.iter(cursor=token)`."""
+
+    def __init__(self, fetch: FetchBatch, position: int = 0, last_id: Optional[str] = None,
+                 skip: int = 0, limit: Optional[int] = None, batch_size: int = 1000) -> None:
+        if batch_size < 1:
+            raise ValueError("The batch_size must be at least 1")
+
+        self._fetch = fetch
+        self._position = position
+        self._last_id = last_id
+        self._skip = skip
+        self._left = limit
+        self._batch_size = batch_size
+        self._batch: Deque[Tuple[int, str, Dict[str, Any]]] = deque()
+        self._resume: Resume = None
+        self._done = limit is not None and limit <= 0
+
+    def __iter__(self) -> "Cursor":
+        return self
+
+    def __next__(self) -> Tuple[str, Dict[str, Any]]:
+        if not self._batch:
+            self._read_batch()
+            if not self._batch:
+                raise StopIteration
+
+        self._position, _id, value = self._batch.popleft()
+        self._last_id = _id
+        return _id, value
+
+    @property
+    def token(self) -> str:
+        """The position after the last value that was returned, as an opaque string"""
+        text = json.dumps([self._position, self._last_id])
+        return base64.urlsafe_b64encode(text.encode()).decode()
+
+    def _read_batch(self) -> None:
+        if self._done:
+            return None
+
+        size = self._batch_size if self._left is None else min(self._batch_size, self._left)
+        batch, self._resume = self._fetch(self._position, self._last_id, self._skip, size, self._resume)
+        self._skip = 0
+        if self._left is not None:
+            self._left -= len(batch)
+
+        # a short batch means that the end of the DB was reached
+        self._done = len(batch) < size or self._left == 0
+        self._batch.extend(batch)
+
+
+def decode_token(token: str) -> Tuple[int, Optional[str]]:
+    """The position of a cursor from its token"""
+    try:
+        position, last_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Not a cursor token {token!r}") from None
+    return int(position), last_id
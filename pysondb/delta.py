@@ -0,0 +1,166 @@
+import json
+import os
+import re
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .compression import decompress
+from .compression import DECOMPRESSION_ERRORS
+from .files import atomic_write
+from .index import IdSet
+
+
+class Changes:
+    """The ids of the values added, updated and deleted since the DB file was last written,
+    a delta commit writes only the values of these ids.
+
+    The ids are only tracked once the DB is loaded from a file or written to it in full,
+    before that every value is new and a delta commit writes the entire file anyway."""
+
+    def __init__(self) -> None:
+        # the DB file the deltas belong to, the number of its deltas and the size and checksum of the file.
+        # The checksum is filled in once the file is on the disk, a new file gets a new dict
+        self.base: Optional[str] = None
+        self.seq = 0
+        self.checksum: Dict[str, int] = {}
+        # the file has deltas after the last one that was loaded, they are removed by the next delta
+        self.stale = False
+
+        self.cleared = False
+        self.added: IdSet = {}
+        self.updated: IdSet = {}
+        self.deleted: IdSet = {}
+
+    def __len__(self) -> int:
+        """Get the number of values that changed"""
+        return len(self.added) + len(self.updated) + len(self.deleted)
+
+    def add(self, _id: str) -> None:
+        if self.base is None:
+            return None
+        if _id in self.deleted:
+            # the id was deleted and added again, so the value of the file is replaced
+            del self.deleted[_id]
+            self.updated[_id] = None
+        else:
+            self.added[_id] = None
+
+    def update(self, _id: str) -> None:
+        if self.base is not None and _id not in self.added:
+            self.updated[_id] = None
+
+    def delete(self, _id: str) -> None:
+        if self.base is None:
+            return None
+        if _id in self.added:
+            # the value never made it to a file
+            del self.added[_id]
+            return None
+        self.updated.pop(_id, None)
+        self.deleted[_id] = None
+
+    def clear(self) -> None:
+        if self.base is None:
+            return None
+        self.cleared = True
+        self.added.clear()
+        self.updated.clear()
+        self.deleted.clear()
+
+    def take(self) -> Tuple[bool, List[str], List[str], List[str]]:
+        """Get whether the DB was cleared and the ids that were added, updated and deleted,
+        and start tracking the changes of the next delta"""
+        changes = (self.cleared, list(self.added), list(self.updated), list(self.deleted))
+        self.seq += 1
+        self.stale = False
+        self.cleared = False
+        self.added.clear()
+        self.updated.clear()
+        self.deleted.clear()
+        return changes
+
+    def restore(self, changes: Tuple[bool, List[str], List[str], List[str]]) -> None:
+        """Put back the changes of the last `take` whose delta could not be written,
+        in front of the changes made since"""
+        cleared, added, updated, deleted = changes
+        self.seq -= 1
+        if self.cleared:
+            # the values of the lost delta were cleared since
+            return None
+
+        later = (list(self.added), list(self.updated), list(self.deleted))
+        self.cleared = cleared
+        self.added = dict.fromkeys(added)
+        self.updated = dict.fromkeys(updated)
+        self.deleted = dict.fromkeys(deleted)
+        for ids, apply in zip(later, (self.add, self.update, self.delete)):
+            for _id in ids:
+                apply(_id)
+
+    def abandon(self, checksum: Dict[str, int]) -> None:
+        """Stop the chain of deltas of the file with this checksum, after one of its deltas could not be written.
+        The next delta commit writes the file in full"""
+        if self.checksum is checksum:
+            self.base = None
+
+    def attach(self, filename: str, seq: int = 0, checksum: Optional[Dict[str, int]] = None,
+               stale: bool = False) -> None:
+        """Track the changes made after the DB file and `seq` of its deltas were loaded"""
+        self.reset(filename)
+        self.seq = seq
+        self.checksum = {} if checksum is None else checksum
+        self.stale = stale
+
+    def reset(self, filename: Optional[str] = None) -> None:
+        """Track the changes made after the DB file is written in full, None stops tracking them.
+        The old deltas must be removed with `remove_deltas` once the DB file is written"""
+        self.base = filename
+        self.seq = 0
+        self.checksum = {}
+        self.stale = False
+        self.cleared = False
+        self.added.clear()
+        self.updated.clear()
+        self.deleted.clear()
+
+
+def delta_path(filename: str, seq: int) -> str:
+    return f"{filename}.delta.{seq}"
+
+
+def delta_paths(filename: str) -> List[Tuple[int, str]]:
+    """Get the sequence numbers and the paths of the deltas of a DB file, in order"""
+    directory, name = os.path.split(os.path.abspath(filename))
+    pattern = re.compile(rf"{re.escape(name)}\.delta\.(\d+)")
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+
+    found = ((pattern.fullmatch(n), n) for n in names)
+    return sorted((int(m.group(1)), os.path.join(os.path.dirname(filename), n)) for m, n in found if m)
+
+
+def remove_deltas(filename: str, after: int = 0) -> None:
+    """Remove the deltas of a DB file, or only the ones after the delta `after`"""
+    for seq, path in delta_paths(filename):
+        if seq > after:
+            os.remove(path)
+
+
+def write_delta(path: str, delta: Dict[str, Any], compression: Optional[str] = None,
+                level: Optional[int] = None) -> None:
+    atomic_write(path, lambda f: json.dump(delta, f, separators=(",", ":")), compression=compression, level=level)
+
+
+def read_delta(path: str) -> Optional[Dict[str, Any]]:
+    """Read a delta, None if it can't be read"""
+    try:
+        with open(path, "rb") as f:
+            delta = json.loads(decompress(f.read()))
+    except (OSError, ValueError) + DECOMPRESSION_ERRORS:
+        return None
+    return delta if isinstance(delta, dict) else None
@@ -0,0 +1,74 @@
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Any
+from typing import Callable
+from typing import IO
+from typing import Optional
+
+from .compression import write_compressed
+
+
+def atomic_write(filename: str, write: Callable[[IO[Any]], None], binary: bool = False,
+                 compression: Optional[str] = None, level: Optional[int] = None) -> None:
+    """Write a file through a temporary file that replaces it once the data is on the disk,
+    so that a crash in the middle of a write never leaves a partially written file behind.
+    With a `compression` the data is compressed while it is written"""
+    tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "xb" if binary or compression is not None else "x") as f:
+            if compression is None:
+                write(f)
+            else:
+                write_compressed(f, write, compression, level, binary)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.isfile(filename):
+            # keep the permissions of the file that is replaced
+            os.chmod(tmp, os.stat(filename).st_mode)
+        os.replace(tmp, filename)
+
+    except BaseException:
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+        raise
+
+    _fsync_dir(os.path.dirname(os.path.abspath(filename)))
+
+
+def _fsync_dir(dirname: str) -> None:
+    """Make the rename of a file durable, this is not supported on every platform"""
+    try:
+        fd = os.open(dirname, os.O_RDONLY)
+    except OSError:
+        return None
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BackgroundWriter:
+    """Run the writes of a DB on a background thread, one at a time and in the order they are submitted"""
+
+    def __init__(self) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last: Optional["Future[None]"] = None
+
+    def submit(self, job: Callable[[], None]) -> "Future[None]":
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pysondb-writer")
+
+        self._last = self._executor.submit(job)
+        return self._last
+
+    def wait(self) -> None:
+        """Wait for all the submitted writes to finish, their errors are reported by their futures"""
+        if self._last is not None:
+            wait([self._last])
@@ -0,0 +1,48 @@
+import json
+import zlib
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+_CHUNK_SIZE = 1 << 16
+
+
+def header_path(filename: str) -> str:
+    return f"{filename}.header"
+
+
+def file_checksum(filename: str) -> Dict[str, int]:
+    """The size and the checksum of a file, read in chunks.
+    The journal and the deltas of a DB file only apply to the file they were written for"""
+    crc = size = 0
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return {"size": size, "checksum": crc}
+
+
+def write_header(filename: str, info: Dict[str, Any]) -> None:
+    """Write the header of a file that was just written, with the size and the checksum of the file.
+
+    The header is stored next to the file as `<filename>.header`. It is not written atomically,
+    a header that is missing, broken or older than the file is never trusted, so the values of
+    the file are verified when it is loaded."""
+    header = {**info, **file_checksum(filename)}
+    with open(header_path(filename), "w") as f:
+        json.dump(header, f)
+
+
+def read_header(filename: str) -> Optional[Dict[str, Any]]:
+    """Read the header of a file, None if the file has no header that can be read"""
+    try:
+        with open(header_path(filename), "r") as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return header if isinstance(header, dict) else None
+
+
+def matches(header: Dict[str, Any], checksum: Dict[str, int]) -> bool:
+    """Whether the header was written for the file with this size and checksum, see `file_checksum`"""
+    return header.get("size") == checksum["size"] and header.get("checksum") == checksum["checksum"]
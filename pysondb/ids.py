@@ -0,0 +1,131 @@
+import os
+import random
+import threading
+import time
+import uuid
+from abc import ABC
+from abc import abstractmethod
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+
+class IdGenerator(ABC):
+    """A built in id generator, the ids it creates never collide with each other,
+    so the DB does not have to check them against the ids it already holds"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def __call__(self) -> str:
+        """Get a new id"""
+
+    @abstractmethod
+    def reserve(self, n: int) -> List[str]:
+        """Get n new ids at once"""
+
+    def seen(self, ids: Iterable[str]) -> None:
+        """Called with the ids that are already in the DB, when the DB is loaded"""
+        return None
+
+    def sort_key(self, _id: str) -> Optional[Tuple[int, str]]:
+        """A key that sorts the ids in the order they were created, None if the ids are not ordered
+        or the id was not created by this generator"""
+        return None
+
+
+class CounterIds(IdGenerator):
+    """Monotonic ids '1', '2', '3' ..., they continue after the largest number in the loaded DB"""
+
+    def __init__(self, start: int = 1) -> None:
+        super().__init__()
+        self._next = start
+
+    def __call__(self) -> str:
+        with self._lock:
+            _id = self._next
+            self._next += 1
+        return str(_id)
+
+    def reserve(self, n: int) -> List[str]:
+        with self._lock:
+            start = self._next
+            self._next += n
+        return list(map(str, range(start, start + n)))
+
+    def seen(self, ids: Iterable[str]) -> None:
+        largest = max((int(i) for i in ids if i.isdigit()), default=0)
+        with self._lock:
+            self._next = max(self._next, largest + 1)
+
+    def sort_key(self, _id: str) -> Optional[Tuple[int, str]]:
+        # the numbers are compared by their length first, without parsing them
+        return (len(_id), _id) if _id.isdigit() else None
+
+
+class TimeIds(IdGenerator):
+    """Time ordered ids, in the style of ULIDs.
+
+    An id is 32 hex digits, the milliseconds since the epoch followed by a counter that
+    starts at a random value every millisecond. So the ids sort in the order they were
+    created, and the ids from different processes don't collide."""
+
+    # the counter starts below 2 ** 79, so it can't overflow within a millisecond
+    _RANDOM_BITS = 79
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._last_ms = -1
+        self._counter = 0
+
+    def __call__(self) -> str:
+        return self.reserve(1)[0]
+
+    def reserve(self, n: int) -> List[str]:
+        with self._lock:
+            ms = int(time.time() * 1000)
+            if ms > self._last_ms:
+                self._last_ms = ms
+                self._counter = random.getrandbits(self._RANDOM_BITS)
+
+            # the clock may go backwards, the last millisecond is used until it catches up
+            prefix = f"{self._last_ms:012x}"
+            start = self._counter
+            self._counter += n
+
+        return [f"{prefix}{i:020x}" for i in range(start, start + n)]
+
+    def sort_key(self, _id: str) -> Optional[Tuple[int, str]]:
+        return (0, _id) if len(_id) == 32 else None
+
+
+class UUIDIds(IdGenerator):
+    """Random ids, the hex of a uuid4"""
+
+    def __call__(self) -> str:
+        return uuid.uuid4().hex
+
+    def reserve(self, n: int) -> List[str]:
+        # the random bytes of all the ids are created at once, with the version and variant bits of a uuid4
+        data = bytearray(os.urandom(16 * n))
+        data[6::16] = bytes(b & 0x0F | 0x40 for b in data[6::16])
+        data[8::16] = bytes(b & 0x3F | 0x80 for b in data[8::16])
+        text = data.hex()
+        return [text[i:i + 32] for i in range(0, 32 * n, 32)]
+
+
+ID_GENERATORS: Dict[str, Type[IdGenerator]] = {
+    "counter": CounterIds,
+    "time": TimeIds,
+    "uuid": UUIDIds,
+}
+
+
+def new_id_generator(name: str) -> IdGenerator:
+    if name not in ID_GENERATORS:
+        raise ValueError(f"Unknown id generator {name!r}, use one of {sorted(ID_GENERATORS)}")
+    return ID_GENERATORS[name]()
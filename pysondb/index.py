@@ -0,0 +1,285 @@
+from bisect import bisect_left
+from bisect import bisect_right
+from itertools import groupby
+from typing import Any
+from typing import Collection
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+# an insertion ordered set of ids
+IdSet = Dict[str, None]
+
+# a sorted index adds this many values one at a time, more are sorted and merged into it at once
+_MERGE_SIZE = 256
+
+
+class HashIndex:
+    """Maps the values of a single key to the ids of the records that hold them"""
+
+    kind = "hash"
+    operators: FrozenSet[str] = frozenset({"$eq", "$in"})
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._map: Dict[Any, IdSet] = {}
+
+        # ids of the records whose value can't be hashed (lists, dicts ...)
+        self._unhashable: IdSet = {}
+
+    def __repr__(self) -> str:
+        return f"HashIndex({self.key!r})"
+
+    def __len__(self) -> int:
+        """Get the number of distinct values in the index"""
+        return len(self._map)
+
+    def add(self, _id: str, record: Dict[str, Any]) -> None:
+        """Add the id of the record to the index"""
+        if self.key not in record:
+            return None
+
+        try:
+            self._map.setdefault(record[self.key], {})[_id] = None
+        except TypeError:
+            self._unhashable[_id] = None
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Add the ids of many records to the index"""
+        for _id, record in items:
+            self.add(_id, record)
+
+    def remove(self, _id: str, record: Dict[str, Any]) -> None:
+        """Remove the id of the record from the index"""
+        if self.key not in record:
+            return None
+
+        value = record[self.key]
+        try:
+            ids = self._map.get(value)
+        except TypeError:
+            self._unhashable.pop(_id, None)
+            return None
+
+        if ids is not None:
+            ids.pop(_id, None)
+            if not ids:
+                del self._map[value]
+
+    def lookup(self, ops: Dict[str, Any]) -> Optional[IdSet]:
+        """Get the ids of the records whose value satisfies all the operators,
+        None is returned if the index cannot answer the lookup"""
+        result: Optional[IdSet] = None
+        for op, arg in ops.items():
+            # a dict finds NaN by identity, but NaN equals nothing, the scan answers those lookups
+            if any(_is_nan(a) for a in ([arg] if op == "$eq" else arg)):
+                return None
+            try:
+                if op == "$eq":
+                    ids = self._map.get(arg, {})
+                else:
+                    ids = {}
+                    for a in arg:
+                        ids.update(self._map.get(a, {}))
+            except TypeError:
+                return None
+
+            result = ids if result is None else {i: None for i in result if i in ids}
+
+        return result
+
+    def groups(self) -> Optional[Iterator[Tuple[Any, Collection[str]]]]:
+        """Get the distinct values and the ids of the records holding each of them,
+        None is returned if some of the values are not in the index"""
+        if self._unhashable:
+            return None
+        return iter(self._map.items())
+
+    def clear(self) -> None:
+        self._map.clear()
+        self._unhashable.clear()
+
+    def rebuild(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Clear the index and add all the given (id, record) pairs to it"""
+        self.clear()
+        for _id, record in items:
+            self.add(_id, record)
+
+
+class SortedIndex:
+    """Keeps the values of a single key sorted, so that range lookups can use bisect.
+
+    Numbers and strings are kept in separate sorted arrays, since they cannot be compared
+    with each other. Values of any other type are not indexed, as they can never satisfy
+    a comparison. The ids of equal values are sorted too, so an id is found with a bisect."""
+
+    kind = "sorted"
+    operators: FrozenSet[str] = frozenset({"$eq", "$in", "$gt", "$gte", "$lt", "$lte"})
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+        # the sorted (value, id) pairs of the records, kept in two parallel lists
+        self._values: Dict[type, List[Any]] = {float: [], str: []}
+        self._ids: Dict[type, List[str]] = {float: [], str: []}
+
+        # ids of the records whose value can't be sorted
+        self._other: IdSet = {}
+
+    def __repr__(self) -> str:
+        return f"SortedIndex({self.key!r})"
+
+    def __len__(self) -> int:
+        """Get the number of records in the index"""
+        return sum(len(i) for i in self._ids.values())
+
+    def add(self, _id: str, record: Dict[str, Any]) -> None:
+        """Add the id of the record to the index"""
+        if self.key not in record:
+            return None
+
+        value = record[self.key]
+        group = _group(value)
+        if group is not None:
+            values, ids = self._values[group], self._ids[group]
+            pos = bisect_left(ids, _id, bisect_left(values, value), bisect_right(values, value))
+            values.insert(pos, value)
+            ids.insert(pos, _id)
+        else:
+            self._other[_id] = None
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Add the ids of many records to the index, a large number of them is sorted and merged into it at once"""
+        pairs = self._pairs(items)
+        for group, new in pairs.items():
+            if len(new) < _MERGE_SIZE:
+                for value, _id in new:
+                    self.add(_id, {self.key: value})
+                continue
+
+            # the sort finds the two sorted runs, so it merges them
+            new.extend(zip(self._values[group], self._ids[group]))
+            new.sort()
+            self._values[group] = [v for v, _ in new]
+            self._ids[group] = [i for _, i in new]
+
+    def remove(self, _id: str, record: Dict[str, Any]) -> None:
+        """Remove the id of the record from the index"""
+        if self.key not in record:
+            return None
+
+        value = record[self.key]
+        group = _group(value)
+        if group is not None:
+            values, ids = self._values[group], self._ids[group]
+            hi = bisect_right(values, value)
+            pos = bisect_left(ids, _id, bisect_left(values, value), hi)
+            if pos < hi and ids[pos] == _id:
+                del values[pos]
+                del ids[pos]
+        else:
+            self._other.pop(_id, None)
+
+    def lookup(self, ops: Dict[str, Any]) -> Optional[IdSet]:
+        """Get the ids of the records whose value satisfies all the operators,
+        None is returned if the index cannot answer the lookup"""
+        result: Optional[IdSet] = None
+
+        bounds = {op: arg for op, arg in ops.items() if op != "$in"}
+        if bounds:
+            groups = {_group(arg) for arg in bounds.values()}
+            if None in groups:
+                return None
+            if len(groups) > 1:
+                # a number can never be compared with a string
+                return {}
+
+            group = groups.pop()
+            assert group is not None
+            values = self._values[group]
+            lo, hi = 0, len(values)
+            for op, arg in bounds.items():
+                if op in ("$eq", "$gte"):
+                    lo = max(lo, bisect_left(values, arg))
+                if op == "$gt":
+                    lo = max(lo, bisect_right(values, arg))
+                if op in ("$eq", "$lte"):
+                    hi = min(hi, bisect_right(values, arg))
+                if op == "$lt":
+                    hi = min(hi, bisect_left(values, arg))
+
+            result = dict.fromkeys(self._ids[group][lo:hi])
+
+        if "$in" in ops:
+            ids: IdSet = {}
+            for arg in ops["$in"]:
+                group = _group(arg)
+                if group is None:
+                    return None
+                values = self._values[group]
+                ids.update(dict.fromkeys(self._ids[group][bisect_left(values, arg):bisect_right(values, arg)]))
+
+            result = ids if result is None else {i: None for i in result if i in ids}
+
+        return result
+
+    def groups(self) -> Optional[Iterator[Tuple[Any, Collection[str]]]]:
+        """Get the distinct values in sorted order and the ids of the records holding each of them,
+        None is returned if some of the values are not in the index"""
+        if self._other:
+            return None
+        return (
+            (value, [i for _, i in pairs])
+            for group in self._values
+            for value, pairs in groupby(zip(self._values[group], self._ids[group]), key=lambda x: x[0])
+        )
+
+    def clear(self) -> None:
+        for group in self._values:
+            self._values[group].clear()
+            self._ids[group].clear()
+        self._other.clear()
+
+    def rebuild(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Clear the index and add all the given (id, record) pairs to it"""
+        self._other.clear()
+        for group, p in self._pairs(items).items():
+            p.sort()
+            self._values[group] = [v for v, _ in p]
+            self._ids[group] = [i for _, i in p]
+
+    def _pairs(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[type, List[Tuple[Any, str]]]:
+        """Get the (value, id) pairs of the records in each sorted array, the ids of the other values are added here"""
+        pairs: Dict[type, List[Tuple[Any, str]]] = {group: [] for group in self._values}
+        for _id, record in items:
+            if self.key in record:
+                group = _group(record[self.key])
+                if group is not None:
+                    pairs[group].append((record[self.key], _id))
+                else:
+                    self._other[_id] = None
+        return pairs
+
+
+Index = Union[HashIndex, SortedIndex]
+
+INDEX_TYPES: Dict[str, Union[Type[HashIndex], Type[SortedIndex]]] = {"hash": HashIndex, "sorted": SortedIndex}
+
+
+def _group(value: Any) -> Optional[type]:
+    """Get the sorted array a value belongs to"""
+    if isinstance(value, str):
+        return str
+    if isinstance(value, (int, float)) and value == value:  # NaN can't be sorted
+        return float
+    return None
+
+
+def _is_nan(value: Any) -> bool:
+    return isinstance(value, float) and value != value
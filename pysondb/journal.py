@@ -0,0 +1,155 @@
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Generator
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from .header import file_checksum
+
+
+class Journal:
+    """An append-only log of the changes made to a DB since its file was last written in full.
+
+    The log is stored next to the DB file as `<filename>.log`, with one JSON entry per line.
+    The first entry holds the size and the checksum of the DB file, a log is only replayed onto that file."""
+
+    def __init__(self, compact_size: Optional[int] = None) -> None:
+        # the DB file the log belongs to, and the size of its log once all the taken changes are written
+        self.base: Optional[str] = None
+        self.size = 0
+        # the size and the checksum of the DB file, filled in once the file is on the disk.
+        # A DB file that is written in full gets a new dict
+        self.checksum: Dict[str, int] = {}
+        # the checksum of the last file whose log could not be written, its later changes are not appended
+        self._abandoned: Optional[Dict[str, int]] = None
+        # compact the log into the DB file when it grows beyond this many bytes
+        self.compact_size = compact_size
+
+        # changes that are not written to the log yet
+        self._pending: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        """Get the number of changes that are not written to the log yet"""
+        return len(self._pending)
+
+    @staticmethod
+    def log_path(filename: str) -> str:
+        return f"{filename}.log"
+
+    def record(self, op: str, _id: Optional[str] = None, data: Optional[Dict[str, Any]] = None) -> None:
+        """Record a change, it is written to the log on the next commit"""
+        entry: Dict[str, Any] = {"op": op}
+        if _id is not None:
+            entry["id"] = _id
+        if data is not None:
+            entry["data"] = data
+        self._pending.append(entry)
+
+    def take(self) -> str:
+        """Encode the pending changes as lines of the log and clear them.
+        The changes are captured at this point, so the lines can be written later"""
+        lines = "".join(f"{json.dumps(entry, separators=(',', ':'))}\n" for entry in self._pending)
+        self._pending.clear()
+        self.size += len(lines.encode())
+        return lines
+
+    def attach(self, filename: str) -> None:
+        """Continue the log of a DB file that was just loaded"""
+        self.base = filename
+        self._pending.clear()
+        self.size = os.path.getsize(self.log_path(filename)) if Path(self.log_path(filename)).is_file() else 0
+        self.checksum = {}
+
+    def reset(self, filename: str) -> None:
+        """Start a new log for a DB file that is written in full,
+        the old log must be removed with `remove` once the DB file is written"""
+        self.base = filename
+        self._pending.clear()
+        self.size = 0
+        self.checksum = {}
+
+    def abandon(self, checksum: Dict[str, int]) -> None:
+        """Stop the log of the DB file with this checksum, after the file could not be written in full
+        or some of its changes could not be appended to the log. The next commit writes the file in full"""
+        self._abandoned = checksum
+        if self.checksum is checksum:
+            self.base = None
+
+    def abandoned(self, checksum: Dict[str, int]) -> bool:
+        """Whether the log of the DB file with this checksum was stopped, the changes taken before that must not
+        be appended after the changes that were lost"""
+        return self._abandoned is checksum
+
+    def needs_compaction(self) -> bool:
+        return self.compact_size is not None and self.size > self.compact_size
+
+    @classmethod
+    def append(cls, filename: str, lines: str, base: Dict[str, int]) -> int:
+        """Append the lines to the log of a DB file and fsync it, returns the number of bytes written.
+        A new log starts with `base`, the size and the checksum of the DB file, read from the file if it is empty"""
+        path = cls.log_path(filename)
+        if not Path(path).is_file() or not os.path.getsize(path):
+            if not base:
+                base.update(file_checksum(filename))
+            lines = f"{json.dumps({'op': 'base', **base}, separators=(',', ':'))}\n{lines}"
+
+        with open(path, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines.encode())
+
+    @classmethod
+    def remove(cls, filename: str) -> None:
+        """Remove the log of a DB file"""
+        if Path(cls.log_path(filename)).is_file():
+            os.remove(cls.log_path(filename))
+
+    def read(self, filename: str) -> Iterator[Dict[str, Any]]:
+        """Get the entries from the log of a DB file. A log that was written for another version of the file
+        (like the old log left behind by a crash while the file was written in full) is removed"""
+        if not Path(self.log_path(filename)).is_file():
+            return None
+
+        entries = self._read_entries(filename)
+        first = next(entries, None)
+        if first is None:
+            return None
+
+        try:
+            base: Optional[Dict[str, int]] = file_checksum(filename)
+        except OSError:
+            base = None
+        if first.get("op") != "base" or base is None or {k: first.get(k) for k in base} != base:
+            entries.close()
+            warnings.warn(UserWarning(
+                f"Removing {self.log_path(filename)!r}, it was not written for {filename!r}"), stacklevel=3)
+            os.remove(self.log_path(filename))
+            return None
+
+        yield from entries
+
+    def _read_entries(self, filename: str) -> Generator[Dict[str, Any], None, None]:
+        offset = 0
+        with open(self.log_path(filename), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                offset += len(line)
+                yield entry
+            else:
+                return None
+
+        # only the last entry can be partially written, drop it so that new entries can be appended
+        warnings.warn(UserWarning(
+            f"Dropping the truncated entry at the end of {self.log_path(filename)!r}"), stacklevel=3)
+        os.truncate(self.log_path(filename), offset)
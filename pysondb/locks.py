@@ -0,0 +1,100 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any
+from typing import Callable
+from typing import cast
+from typing import ContextManager
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+from typing import TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class RWLock:
+    """A lock that lets many threads read at once, but gives a writing thread exclusive access.
+
+    Both sides are reentrant, and a thread that holds the write lock can also read. Waiting
+    writers block new readers, so that the writers are not starved."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+
+        # thread id -> the number of times it acquired the read lock
+        self._readers: Dict[int, int] = {}
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._readers[me] > 1:
+                self._readers[me] -= 1
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return None
+
+            if me in self._readers:
+                raise RuntimeError("Cannot write to the DB from a thread that is reading from it")
+
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+
+def locked(lock: Callable[[], ContextManager[None]], func: F) -> F:
+    """Wrap the function so that it is called while holding the lock"""
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with lock():
+            return func(*args, **kwargs)
+
+    return cast(F, wrapper)
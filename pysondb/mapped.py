@@ -0,0 +1,193 @@
+import json
+import mmap
+import struct
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .query import match
+from .query import normalize_query
+
+# the first bytes of a mapped DB file, the last byte is the version of the binary formats
+MAGIC = b"\x00PYSONDB\x02"
+
+_HEADER = struct.Struct("<I")
+
+# an entry of the index: the offset and length of the id, and of its record
+_ENTRY = struct.Struct("<QIQI")
+
+# the end of the file: the offset of the index and the number of records
+_TRAILER = struct.Struct("<QQ")
+
+
+def dump(data: Dict[str, Dict[str, Any]], keys: List[str], f: BinaryIO) -> None:
+    """Write the values of a DB to a file that can be opened by `MappedDB`.
+
+    Every record is a line of JSON with its id, in the order of the DB. They are followed
+    by the ids, an index of fixed size entries sorted by the id, and a trailer that points
+    to the index, so a record can be found without reading the rest of the file."""
+    header = json.dumps({"keys": keys}).encode()
+    f.write(MAGIC)
+    f.write(_HEADER.pack(len(header)))
+    f.write(header)
+
+    pos = len(MAGIC) + _HEADER.size + len(header)
+    records: Dict[bytes, Tuple[int, int]] = {}
+    for _id, value in data.items():
+        line = json.dumps([_id, value]).encode() + b"\n"
+        f.write(line)
+        records[_id.encode()] = (pos, len(line) - 1)
+        pos += len(line)
+
+    ids = sorted(records)
+    entries = []
+    for id_bytes in ids:
+        f.write(id_bytes)
+        entries.append(_ENTRY.pack(pos, len(id_bytes), *records[id_bytes]))
+        pos += len(id_bytes)
+
+    f.write(b"".join(entries))
+    f.write(_TRAILER.pack(pos, len(ids)))
+    f.write(MAGIC)
+
+
+class MappedDB:
+    """A read-only DB that is read from a memory mapped file, without loading the file.
+
+    The file is written by `DB.commit(filename, format="mapped")`. Opening it only reads the
+    header and the trailer, a lookup by id is a binary search over the index in the file and
+    decodes only that record. The queries read the records one at a time, only the matching
+    records are kept."""
+
+    def __init__(self, filename: str) -> None:
+        self._file = open(filename, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        try:
+            self._read_layout()
+        except BaseException:
+            self.close()
+            raise
+
+    def __repr__(self) -> str:
+        return f"MappedDB({self._file.name!r}, {len(self)} values)"
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "MappedDB":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def keys(self) -> List[str]:
+        return self._keys
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def id_exists(self, _id: str) -> bool:
+        return self._find(str(_id)) is not None
+
+    def get_by_id(self, _id: str) -> Union[None, Dict[str, Any]]:
+        """Get the value from the DB based on the _id"""
+        entry = self._find(str(_id))
+        if entry is None:
+            return None
+
+        _, _, offset, length = entry
+        value: Dict[str, Any] = json.loads(self._mm[offset:offset + length])[1]
+        return value
+
+    def get_by_query(self, query: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Get the values from the DB based on the query conditions"""
+        conditions = normalize_query(query)
+        return {i: x for i, x in self._iter_records() if match(x, conditions)}
+
+    def get_all(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the entire DB, this reads every record in the file"""
+        return dict(self._iter_records())
+
+    def values(self, count: int = 5, last: bool = False) -> Dict[str, Dict[str, Any]]:
+        if not last:
+            result: Dict[str, Dict[str, Any]] = {}
+            for _id, value in self._iter_records():
+                if len(result) >= count:
+                    break
+                result[_id] = value
+            return result
+
+        # the records are in order, so the last ones are found by reading the file backwards
+        end = self._records_end
+        lines: List[bytes] = []
+        while len(lines) < count and end > self._records_start:
+            start = self._mm.rfind(b"\n", self._records_start, end - 1) + 1 or self._records_start
+            lines.append(self._mm[start:end - 1])
+            end = start
+        return dict(json.loads(line) for line in reversed(lines))
+
+    ###############################################################################################
+
+    def _read_layout(self) -> None:
+        mm = self._mm
+        size = len(mm)
+        if size < len(MAGIC) * 2 + _HEADER.size + _TRAILER.size or mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self._file.name!r} is not a mapped DB file")
+        if mm[size - len(MAGIC):] != MAGIC:
+            raise ValueError(f"{self._file.name!r} is truncated")
+
+        (header_size,) = _HEADER.unpack_from(mm, len(MAGIC))
+        self._records_start = len(MAGIC) + _HEADER.size + header_size
+        self._keys: List[str] = json.loads(mm[len(MAGIC) + _HEADER.size:self._records_start])["keys"]
+
+        self._index, self._count = _TRAILER.unpack_from(mm, size - len(MAGIC) - _TRAILER.size)
+        if self._count:
+            # the ids are written right after the records
+            self._records_end: int = _ENTRY.unpack_from(mm, self._index)[0]
+        else:
+            self._records_end = self._index
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        entry: Tuple[int, int, int, int] = _ENTRY.unpack_from(self._mm, self._index + i * _ENTRY.size)
+        return entry
+
+    def _find(self, _id: str) -> Optional[Tuple[int, int, int, int]]:
+        """Binary search for the index entry of the id"""
+        key = _id.encode()
+        mm = self._mm
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            if mm[entry[0]:entry[0] + entry[1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < self._count:
+            entry = self._entry(lo)
+            if mm[entry[0]:entry[0] + entry[1]] == key:
+                return entry
+        return None
+
+    def _iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Decode the records one at a time, in the order of the DB"""
+        mm = self._mm
+        pos = self._records_start
+        while pos < self._records_end:
+            end = mm.find(b"\n", pos, self._records_end)
+            _id, value = json.loads(mm[pos:end])
+            yield _id, value
+            pos = end + 1
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any
+from typing import Callable
+from typing import cast
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# the upper bounds in seconds of the buckets of the latency histograms, the last bucket has no bound
+LATENCY_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+
+class Operation:
+    """A single call of a method of a DB or a Cluster, the hooks get the same object when it starts and ends.
+    `scanned` is the number of values a query checked and `returned` the number of values that matched"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = 0.0
+        self.duration: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.scanned = 0
+        self.returned = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+Hook = Callable[[Operation], None]
+
+
+class OpMetrics(NamedTuple):
+    """The totals of all the calls of an operation.
+    `histogram` is the number of calls in each latency bucket, the bounds are `LATENCY_BUCKETS`"""
+    calls: int
+    errors: int
+    total_time: float
+    max_time: float
+    histogram: Tuple[int, ...]
+    scanned: int
+    returned: int
+    bytes_read: int
+    bytes_written: int
+
+
+class _OpStats:
+    __slots__ = ("calls", "errors", "total_time", "max_time", "histogram", "scanned", "returned",
+                 "bytes_read", "bytes_written")
+
+    def __init__(self) -> None:
+        self.calls = self.errors = self.scanned = self.returned = self.bytes_read = self.bytes_written = 0
+        self.total_time = self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, op: Operation) -> None:
+        duration = op.duration or 0.0
+        self.calls += 1
+        self.errors += op.error is not None
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.histogram[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.add_counts(op.scanned, op.returned, op.bytes_read, op.bytes_written)
+
+    def add_counts(self, scanned: int = 0, returned: int = 0, bytes_read: int = 0, bytes_written: int = 0) -> None:
+        self.scanned += scanned
+        self.returned += returned
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+
+    def snapshot(self) -> OpMetrics:
+        return OpMetrics(self.calls, self.errors, self.total_time, self.max_time, tuple(self.histogram),
+                         self.scanned, self.returned, self.bytes_read, self.bytes_written)
+
+
+class Metrics:
+    """Counts the calls, the latencies, the scanned values and the bytes of the operations of a DB or a Cluster,
+    and calls the `on_op_start` and `on_op_end` hooks around every operation.
+
+    A call made from inside another operation (like `values` reading through `iter`) is a part of
+    the outer operation, only the outer one is counted."""
+
+    def __init__(self) -> None:
+        self._ops: Dict[str, _OpStats] = {}
+        self._lock = threading.Lock()
+        # the operation running on each thread
+        self._local = threading.local()
+        self._start_hooks: List[Hook] = []
+        self._end_hooks: List[Hook] = []
+
+    def on_op_start(self, hook: Hook) -> Hook:
+        """Call the hook before every operation, can be used as a decorator"""
+        self._start_hooks.append(hook)
+        return hook
+
+    def on_op_end(self, hook: Hook) -> Hook:
+        """Call the hook after every operation, also when it raised, can be used as a decorator"""
+        self._end_hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook: Hook) -> None:
+        for hooks in (self._start_hooks, self._end_hooks):
+            if hook in hooks:
+                hooks.remove(hook)
+
+    def stats(self) -> Dict[str, OpMetrics]:
+        """The totals of each operation that was called at least once"""
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self._ops.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ops.clear()
+
+    def count_scan(self, scanned: int, returned: int) -> None:
+        """Add the values checked by a query and the values that matched to the running operation"""
+        op: Optional[Operation] = getattr(self._local, "op", None)
+        if op is not None:
+            op.scanned += scanned
+            op.returned += returned
+
+    def count_bytes(self, name: str, read: int = 0, written: int = 0) -> None:
+        """Add the bytes read or written to the running operation, the bytes written by
+        a background thread are added to the totals of the operation `name`"""
+        op: Optional[Operation] = getattr(self._local, "op", None)
+        if op is not None:
+            op.bytes_read += read
+            op.bytes_written += written
+            return None
+
+        with self._lock:
+            self._stats(name).add_counts(bytes_read=read, bytes_written=written)
+
+    def start(self, name: str) -> Optional[Operation]:
+        """Start an operation, None if an operation is already running on this thread"""
+        if getattr(self._local, "op", None) is not None:
+            return None
+
+        op = Operation(name)
+        for hook in self._start_hooks:
+            hook(op)
+        self._local.op = op
+        # the time of the hooks is not a part of the operation
+        op.start = time.perf_counter()
+        return op
+
+    def end(self, op: Operation, error: Optional[BaseException] = None) -> None:
+        op.duration = time.perf_counter() - op.start
+        op.error = error
+        self._local.op = None
+        with self._lock:
+            self._stats(op.name).add(op)
+        for hook in self._end_hooks:
+            hook(op)
+
+    def _stats(self, name: str) -> _OpStats:
+        stats = self._ops.get(name)
+        if stats is None:
+            stats = self._ops[name] = _OpStats()
+        return stats
+
+
+def instrumented(metrics: Metrics, name: str, func: F) -> F:
+    """Wrap the function so that each call is counted as the operation `name`"""
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        op = metrics.start(name)
+        if op is None:
+            return func(*args, **kwargs)
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            metrics.end(op, e)
+            raise
+        metrics.end(op)
+        return result
+
+    return cast(F, wrapper)
+
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,58 @@
+import operator
+from typing import Any
+from typing import Callable
+from typing import Dict
+
+# key -> {operator: argument}
+Conditions = Dict[str, Dict[str, Any]]
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+    # `in` finds a NaN by identity, but NaN equals nothing, as with $eq
+    "$in": lambda value, arg: value in arg and value == value,
+}
+
+
+def normalize_query(query: Dict[str, Any]) -> Conditions:
+    """Convert a query into conditions, plain values become `$eq` conditions"""
+    conditions: Conditions = {}
+    for k, v in query.items():
+        if isinstance(v, dict) and any(isinstance(op, str) and op.startswith("$") for op in v):
+            for op, arg in v.items():
+                if op not in OPERATORS:
+                    raise ValueError(f"Unknown query operator {op!r} for the key {k!r}")
+                if op == "$in" and not isinstance(arg, (list, tuple, set, frozenset)):
+                    raise ValueError(f"The argument of '$in' for the key {k!r} must be a list")
+            conditions[k] = v
+        else:
+            conditions[k] = {"$eq": v}
+
+    return conditions
+
+
+def match(data: Dict[str, Any], conditions: Conditions) -> bool:
+    """Check whether the data satisfies all the conditions,
+    values that cannot be compared with the argument do not match"""
+    for k, ops in conditions.items():
+        if k not in data:
+            return False
+
+        value = data[k]
+        for op, arg in ops.items():
+            if op == "$eq":
+                if value != arg:
+                    return False
+                continue
+
+            try:
+                if not OPERATORS[op](value, arg):
+                    return False
+            except TypeError:
+                return False
+
+    return True
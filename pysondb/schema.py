@@ -0,0 +1,103 @@
+import hashlib
+import json
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+# the type of the values of a key, or a tuple of types like isinstance takes
+KeyType = Union[Type[Any], Tuple[Type[Any], ...]]
+
+
+class Schema:
+    """The keys of the values of a DB, and optionally the types of their values.
+
+    The checks are built once from the keys, a value is checked by comparing its keys to a
+    set and by an isinstance call for each typed key."""
+
+    def __init__(self, keys: List[str], types: Optional[Dict[str, KeyType]] = None) -> None:
+        self.keys = sorted(keys)
+        self.types = dict(types or {})
+        self._key_set: FrozenSet[str] = frozenset(keys)
+        self._checks: List[Tuple[str, KeyType]] = [(k, t) for k, t in self.types.items() if k in self._key_set]
+
+    def __repr__(self) -> str:
+        return f"Schema({self.keys}, types={self.types})"
+
+    @property
+    def fingerprint(self) -> str:
+        """A hash of the keys and the types, equal schemas have the same fingerprint"""
+        types = {k: _type_names(t) for k, t in self._checks}
+        text = json.dumps([self.keys, types], sort_keys=True)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def header(self, count: int) -> Dict[str, Any]:
+        """The header of a file with `count` values that were verified by this schema"""
+        return {"keys": self.keys, "fingerprint": self.fingerprint, "count": count}
+
+    def trusts(self, header: Optional[Dict[str, Any]], dynamic: bool = False) -> bool:
+        """Whether the values of a file with this header were verified by an equal schema,
+        a dynamic DB takes the keys of the file so only the types are compared"""
+        if header is None:
+            return False
+        schema = Schema(header["keys"], self.types) if dynamic else self
+        return bool(header.get("fingerprint") == schema.fingerprint)
+
+    def validate(self, data: Dict[str, Any], _id: Optional[str] = None) -> None:
+        """Check the keys and the types of a value"""
+        if data.keys() != self._key_set:
+            raise KeyError(f"The keys provided in the data{_for(_id)} does not match the provided keys.")
+
+        for k, t in self._checks:
+            if not isinstance(data[k], t):
+                raise TypeError(_type_error(k, t, data[k], _id))
+
+    def validate_many(self, data: Iterable[Dict[str, Any]]) -> None:
+        """Check a list of values, the errors give the position of the first value that is not valid"""
+        data = list(data)
+        key_set = self._key_set
+        bad = next((i for i, d in enumerate(data) if d.keys() != key_set), None)
+        if bad is not None:
+            raise KeyError(f"The keys provided in the data (at position {bad}) does not match the provided keys.")
+
+        for k, t in self._checks:
+            for i, d in enumerate(data):
+                if not isinstance(d[k], t):
+                    raise TypeError(_type_error(k, t, d[k], None, f" (at position {i})"))
+
+    def validate_update(self, data: Dict[str, Any], _id: Optional[str] = None) -> None:
+        """Check the types of the values that update some of the keys of a value"""
+        for k, t in self._checks:
+            if k in data and not isinstance(data[k], t):
+                raise TypeError(_type_error(k, t, data[k], _id))
+
+    def validate_columns(self, keys: List[str], ids: List[str], columns: List[List[Any]]) -> None:
+        """Check the values of a DB given as one list of values for each key"""
+        if frozenset(keys) != self._key_set or len(keys) != len(self._key_set):
+            raise KeyError("The keys provided in the data does not match the provided keys.")
+
+        for k, t in self._checks:
+            column = columns[keys.index(k)]
+            check: Callable[[Any], bool] = lambda v: isinstance(v, t)  # noqa: E731
+            if not all(map(check, column)):
+                i = next(i for i, v in enumerate(column) if not check(v))
+                raise TypeError(_type_error(k, t, column[i], ids[i]))
+
+
+def _for(_id: Optional[str]) -> str:
+    return "" if _id is None else f" of the id {_id!r}"
+
+
+def _type_names(t: KeyType) -> List[str]:
+    return [f"{x.__module__}.{x.__qualname__}" for x in (t if isinstance(t, tuple) else (t,))]
+
+
+def _type_error(key: str, t: KeyType, value: Any, _id: Optional[str], where: str = "") -> str:
+    names = " or ".join(x.__name__ for x in (t if isinstance(t, tuple) else (t,)))
+    return f"The value of {key!r}{_for(_id)}{where} must be of type {names}, not {type(value).__name__}"
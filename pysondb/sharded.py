@@ -0,0 +1,314 @@
+import json
+import os
+import warnings
+import zlib
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from random import randint
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .cache import CacheInfo
+from .core import DB
+from .files import atomic_write
+from .header import write_header
+from .ids import IdGenerator
+from .ids import new_id_generator
+from .schema import KeyType
+
+
+class ShardedDB:
+    """A DB whose values are split across multiple DB shards by the hash of their id.
+
+    Every shard is stored in its own file, next to a manifest file that lists them. The
+    shards are loaded and committed in parallel by a pool of worker processes, and a
+    commit only rewrites the shards that changed since they were last loaded or committed.
+    The values are returned shard by shard, so the order in which they were added is only
+    kept within a shard."""
+
+    def __init__(self, keys: List[str], shards: int = 8, verify_data: bool = True, dynamic: bool = False,
+                 copy_on_read: bool = True, processes: Optional[int] = None, storage: str = "dict",
+                 types: Optional[Dict[str, KeyType]] = None, query_cache: int = 0) -> None:
+        """`processes` is the number of worker processes used to load and commit the shards,
+        it defaults to the number of CPUs, 0 loads and commits them in this process.
+        `storage`, `types` and `query_cache` are passed to the shards, see `DB`"""
+        if shards < 1:
+            raise ValueError("A ShardedDB needs at least one shard")
+
+        self._keys = sorted(keys)
+        self._verify = verify_data
+        self._d_loading = dynamic
+        self._copy_on_read = copy_on_read
+        self._storage = storage
+        self._types = types
+        self._query_cache = query_cache
+        self._shards = [self._new_shard() for _ in range(shards)]
+        self._id_generator: Callable[[], str] = self._generate_id
+
+        self._processes = (os.cpu_count() or 1) if processes is None else processes
+        self._executor: Optional[Executor] = None
+
+        # the file the shards were last loaded from or committed to
+        self._filename: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"ShardedDB({len(self._shards)} shards, {len(self)} values)"
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    @property
+    def keys(self) -> List[str]:
+        return self._keys
+
+    @property
+    def indexes(self) -> List[str]:
+        return self._shards[0].indexes
+
+    @property
+    def shards(self) -> int:
+        return len(self._shards)
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def load(self, filename: str, force: bool = False, verify: Union[bool, str] = True) -> None:
+        """Load the shards listed in the manifest file, `verify` is passed to the load of every shard"""
+        if verify not in (True, False, "auto"):
+            raise ValueError(f"Unknown verify {verify!r}, use True, False or 'auto'")
+
+        if any(shard._db_updated for shard in self._shards) and force is not True:
+            warnings.warn(UserWarning(
+                "You have un-committed data in your DB. This data will be lost during the "
+                "loading of an external DB. If this is intentional use 'force=True'"), stacklevel=2)
+            return None
+
+        if not Path(filename).is_file():
+            return None
+
+        with open(filename, "r") as f:
+            manifest = json.load(f)
+
+        if self._d_loading:
+            self._keys = sorted(manifest["keys"])
+        elif self._verify and self._keys != sorted(manifest["keys"]):
+            raise KeyError(f"The keys of the DB ({self._keys}) do not match the keys of the "
+                           f"sharded DB in {filename!r} ({sorted(manifest['keys'])})")
+
+        indexes = [(k, type(v)) for k, v in self._shards[0]._indexes.items()]
+        self._shards = [self._new_shard() for _ in manifest["shards"]]
+        for shard in self._shards:
+            shard._indexes = {k: kind(k) for k, kind in indexes}
+
+        paths = [self._shard_path(filename, name) for name in manifest["shards"]]
+        loaded = self._map(_load_shard, paths, [self._verify] * len(paths), [self._keys] * len(paths),
+                           [self._types] * len(paths), [verify] * len(paths))
+        for shard, data in zip(self._shards, loaded):
+            shard._set_db(data)
+            shard._rebuild_indexes()
+            if isinstance(self._id_generator, IdGenerator):
+                self._id_generator.seen(data)
+
+        self._filename = filename
+
+    def commit(self, filename: str, indent: Optional[int] = None, header: bool = False) -> None:
+        """Store the shards that changed in their files, and the manifest in `filename`.
+        With `header=True` each shard file gets a header, so that `load(verify="auto")` can skip verifying it"""
+        names = [f"{Path(filename).name}.{i}" for i in range(len(self._shards))]
+
+        dirty = [
+            i for i, shard in enumerate(self._shards)
+            if shard._db_updated or filename != self._filename
+            or not Path(self._shard_path(filename, names[i])).is_file()
+        ]
+        paths = [self._shard_path(filename, names[i]) for i in dirty]
+        data = [self._shards[i]._as_dict() for i in dirty]
+        headers = [
+            self._shards[i]._schema.header(len(d)) if header and self._verify else None for i, d in zip(dirty, data)
+        ]
+        list(self._map(_dump_shard, paths, data, [indent] * len(dirty), headers))
+
+        manifest = {"keys": self._keys, "shards": names}
+        atomic_write(filename, lambda f: json.dump(manifest, f))
+
+        for shard in self._shards:
+            shard._db_updated = False
+        self._filename = filename
+
+    def set_id_generator(self, func: Union[str, Callable[[], str]]) -> None:
+        """Use a function or one of the built in generators of `DB.set_id_generator` to create the ids"""
+        if isinstance(func, str):
+            func = new_id_generator(func)
+        if isinstance(func, IdGenerator):
+            for shard in self._shards:
+                func.seen(shard._db)
+        self._id_generator = func
+
+    def reserve_ids(self, n: int) -> List[str]:
+        """Get n new ids at once"""
+        generate = self._id_generator
+        if isinstance(generate, IdGenerator):
+            return generate.reserve(n)
+
+        if generate != self._generate_id:
+            return [str(generate()) for _ in range(n)]
+
+        ids: Dict[str, None] = {}
+        while len(ids) < n:
+            ids[self._generate_id()] = None
+        return list(ids)
+
+    def id_exists(self, _id: str) -> bool:
+        return self._shard(str(_id)).id_exists(_id)
+
+    def create_index(self, key: str, kind: str = "hash") -> None:
+        for shard in self._shards:
+            shard.create_index(key, kind)
+
+    def drop_index(self, key: str) -> None:
+        for shard in self._shards:
+            shard.drop_index(key)
+
+    def query_cache_info(self) -> CacheInfo:
+        """The statistics of the query caches of all the shards"""
+        infos = [shard.query_cache_info() for shard in self._shards]
+        return CacheInfo(*(sum(values) for values in zip(*infos)))
+
+    def add(self, data: Dict[str, Any]) -> str:
+        """Add a value to the shard of its id"""
+        self._shards[0]._verify_data(data)
+        _id = str(self._id_generator())
+        shard = self._shard(_id)
+        shard._insert(_id, data)
+        shard._db_updated = True
+        return _id
+
+    def add_many(self, data: List[Dict[str, Any]]) -> None:
+        if self._verify:
+            self._shards[0]._schema.validate_many(data)
+
+        items: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {}
+        for _id, d in zip(self.reserve_ids(len(data)), data):
+            items.setdefault(self._shard_number(_id), []).append((_id, d))
+
+        for i, shard_items in items.items():
+            self._shards[i]._insert_many(shard_items)
+            self._shards[i]._db_updated = True
+
+    def get_by_id(self, _id: str) -> Union[None, Dict[str, Any]]:
+        return self._shard(str(_id)).get_by_id(_id)
+
+    def get_by_query(self, query: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        result: Dict[str, Dict[str, Any]] = {}
+        for shard in self._shards:
+            result.update(shard.get_by_query(query))
+        return result
+
+    def get_all(self) -> Dict[str, Dict[str, Any]]:
+        result: Dict[str, Dict[str, Any]] = {}
+        for shard in self._shards:
+            result.update(shard.get_all())
+        return result
+
+    def pop(self, _id: str) -> Union[None, Dict[str, Any]]:
+        return self._shard(str(_id)).pop(_id)
+
+    def values(self, count: int = 5, last: bool = False) -> Dict[str, Dict[str, Any]]:
+        result: Dict[str, Dict[str, Any]] = {}
+        for shard in (reversed(self._shards) if last else self._shards):
+            if len(result) >= count:
+                break
+            part = shard.values(count - len(result), last=last)
+            result = {**part, **result} if last else {**result, **part}
+        return result
+
+    def update_by_id(self, _id: str, data: Dict[str, Any]) -> None:
+        # checked here, the shard only checks the keys if it holds some values
+        if not all(i in self._keys for i in data):
+            raise KeyError(
+                "Some keys provided in the update data does not match the keys in the DB"
+            )
+        self._shard(str(_id)).update_by_id(_id, data)
+
+    def update_by_query(self, query: Dict[str, Any], new_data: Dict[str, Any]) -> List[str]:
+        if not (all(i in self._keys for i in query) and all(i in self._keys for i in new_data)):
+            raise KeyError(
+                "The key in the query or the key in the new_data does not match the keys in the DB"
+            )
+
+        ids: List[str] = []
+        for shard in self._shards:
+            ids.extend(shard.update_by_query(query, new_data))
+        return ids
+
+    def delete_by_id(self, _id: str) -> None:
+        self._shard(str(_id)).delete_by_id(_id)
+
+    def delete_all(self) -> None:
+        for shard in self._shards:
+            shard.delete_all()
+
+    def delete_by_query(self, query: Dict[str, Any]) -> List[str]:
+        ids: List[str] = []
+        for shard in self._shards:
+            ids.extend(shard.delete_by_query(query))
+        return ids
+
+    ###############################################################################################
+
+    def _new_shard(self) -> DB:
+        return DB(keys=self._keys, verify_data=self._verify, copy_on_read=self._copy_on_read, storage=self._storage,
+                  types=self._types, query_cache=self._query_cache)
+
+    def _shard(self, _id: str) -> DB:
+        return self._shards[self._shard_number(_id)]
+
+    def _shard_number(self, _id: str) -> int:
+        # crc32 gives the same shard for an id in every process, unlike hash()
+        return zlib.crc32(_id.encode()) % len(self._shards)
+
+    def _generate_id(self) -> str:
+        _id = str(randint(int("1" + "0" * 19), int("9" * 20)))
+
+        while self._shard(_id).id_exists(_id):
+            _id = str(randint(int("1" + "0" * 19), int("9" * 20)))
+
+        return _id
+
+    def _shard_path(self, filename: str, name: str) -> str:
+        """The shard files are stored next to the manifest"""
+        return str(Path(filename).parent / name)
+
+    def _map(self, func: Callable[..., Any], *args: List[Any]) -> List[Any]:
+        """Run the function for every shard, in the worker processes if there are any"""
+        if self._processes == 0 or len(args[0]) < 2:
+            return list(map(func, *args))
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._processes)
+        return list(self._executor.map(func, *args))
+
+
+def _load_shard(path: str, verify_data: bool, keys: List[str], types: Optional[Dict[str, KeyType]],
+                verify: Union[bool, str]) -> Dict[str, Dict[str, Any]]:
+    """Read and verify the values of a shard file, runs in a worker process"""
+    db = DB(keys=keys, verify_data=verify_data, types=types)
+    db._load_db_file(path, verify=verify)
+    return db._as_dict()
+
+
+def _dump_shard(path: str, data: Dict[str, Dict[str, Any]], indent: Optional[int],
+                header: Optional[Dict[str, Any]]) -> None:
+    """Write the values of a shard to its file, runs in a worker process"""
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent))
+    if header is not None:
+        write_header(path, header)
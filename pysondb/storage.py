@@ -0,0 +1,201 @@
+from itertools import repeat
+from operator import itemgetter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import MutableMapping
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+Record = Dict[str, Any]
+
+
+class TupleStore(MutableMapping[str, Record]):
+    """Stores every record as a tuple of its values, in the order of the keys of the DB.
+
+    A tuple takes a fraction of the memory of a dict, the dicts are only built when a
+    record is read. The records that don't have exactly the keys of the DB (when the
+    data is not verified) are kept as dicts."""
+
+    def __init__(self, keys: List[str]) -> None:
+        self._keys = list(keys)
+        self._key_set = frozenset(keys)
+        self._rows: Dict[str, Union[Tuple[Any, ...], Record]] = {}
+        self._get_values: Callable[[Record], Tuple[Any, ...]] = _values_getter(self._keys)
+
+    @classmethod
+    def from_columns(cls, keys: List[str], ids: List[str], columns: List[List[Any]]) -> "TupleStore":
+        """Create the store from the values of each key, the keys must be the keys of the DB"""
+        store = cls(keys)
+        store._rows = dict(zip(ids, _rows(ids, columns)))
+        return store
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __getitem__(self, _id: str) -> Record:
+        row = self._rows[_id]
+        if type(row) is tuple:
+            return dict(zip(self._keys, row))
+        return dict(row)
+
+    def __setitem__(self, _id: str, record: Record) -> None:
+        if len(record) == len(self._keys) and self._key_set.issuperset(record):
+            self._rows[_id] = self._get_values(record)
+        else:
+            self._rows[_id] = dict(record)
+
+    def __delitem__(self, _id: str) -> None:
+        del self._rows[_id]
+
+    def __contains__(self, _id: object) -> bool:
+        return _id in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self) -> None:
+        self._rows.clear()
+
+
+class ColumnStore(MutableMapping[str, Record]):
+    """Stores the values of each key in a list of its own, the records are rows across the lists.
+
+    An id is mapped to the row of its record, and the dicts are only built when a record
+    is read. The row of a deleted record is reused by moving the last row into it. The
+    records that don't have exactly the keys of the DB are kept as dicts."""
+
+    def __init__(self, keys: List[str]) -> None:
+        self._keys = list(keys)
+        self._key_set = frozenset(keys)
+        self._columns: List[List[Any]] = [[] for _ in self._keys]
+
+        # id -> row, in the order the ids were added. -1 for the ids whose record is a dict
+        self._rows: Dict[str, int] = {}
+        self._row_ids: List[str] = []
+        self._other: Dict[str, Record] = {}
+
+    @classmethod
+    def from_columns(cls, keys: List[str], ids: List[str], columns: List[List[Any]]) -> "ColumnStore":
+        """Create the store from the values of each key, the keys must be the keys of the DB"""
+        store = cls(keys)
+        store._columns = columns
+        store._row_ids = ids
+        store._rows = dict(zip(ids, range(len(ids))))
+        return store
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __getitem__(self, _id: str) -> Record:
+        row = self._rows[_id]
+        if row < 0:
+            return dict(self._other[_id])
+        return {k: column[row] for k, column in zip(self._keys, self._columns)}
+
+    def __setitem__(self, _id: str, record: Record) -> None:
+        conforms = len(record) == len(self._keys) and self._key_set.issuperset(record)
+        row = self._rows.get(_id)
+
+        if row is not None and row >= 0 and conforms:
+            for k, column in zip(self._keys, self._columns):
+                column[row] = record[k]
+            return None
+
+        if row is not None:
+            # the record moves between the columns and the dicts, it keeps its place in the order
+            self._remove(_id, row)
+
+        if conforms:
+            self._rows[_id] = len(self._row_ids)
+            self._row_ids.append(_id)
+            for k, column in zip(self._keys, self._columns):
+                column.append(record[k])
+        else:
+            self._rows[_id] = -1
+            self._other[_id] = dict(record)
+
+    def __delitem__(self, _id: str) -> None:
+        self._remove(_id, self._rows.pop(_id))
+
+    def __contains__(self, _id: object) -> bool:
+        return _id in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self) -> None:
+        self._rows.clear()
+        self._row_ids.clear()
+        self._other.clear()
+        for column in self._columns:
+            column.clear()
+
+    def _remove(self, _id: str, row: int) -> None:
+        if row < 0:
+            del self._other[_id]
+            return None
+
+        last = len(self._row_ids) - 1
+        if row != last:
+            moved = self._row_ids[last]
+            self._row_ids[row] = moved
+            self._rows[moved] = row
+            for column in self._columns:
+                column[row] = column[last]
+
+        self._row_ids.pop()
+        for column in self._columns:
+            column.pop()
+
+
+def _values_getter(keys: List[str]) -> Callable[[Record], Tuple[Any, ...]]:
+    """Get the values of the keys from a record as a tuple"""
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda record: (record[key],)
+    if not keys:
+        return lambda record: ()
+    return itemgetter(*keys)
+
+
+# the kinds of storage a DB can use, a plain dict keeps every record as a dict
+STORAGE_TYPES: Dict[str, Optional[Union[Type[TupleStore], Type[ColumnStore]]]] = {
+    "dict": None,
+    "tuple": TupleStore,
+    "columns": ColumnStore,
+}
+
+
+def new_store(kind: str, keys: List[str]) -> MutableMapping[str, Record]:
+    """Create the storage of the records of a DB"""
+    store_type = STORAGE_TYPES[kind]
+    if store_type is None:
+        return {}
+    return store_type(keys)
+
+
+def store_from_columns(kind: str, keys: List[str], ids: List[str],
+                       columns: List[List[Any]]) -> MutableMapping[str, Record]:
+    """Create the storage of the records of a DB from the values of each key"""
+    store_type = STORAGE_TYPES[kind]
+    if store_type is None:
+        return dict(zip(ids, map(dict, map(zip, repeat(keys), _rows(ids, columns)))))
+    return store_type.from_columns(keys, ids, columns)
+
+
+def _rows(ids: List[str], columns: List[List[Any]]) -> Iterator[Tuple[Any, ...]]:
+    """Get the values of each id from the values of each key, an empty row per id when there are no keys"""
+    if not columns:
+        return repeat((), len(ids))
+    return zip(*columns)
@@ -0,0 +1,243 @@
+import codecs
+import json
+import re
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import cast
+from typing import Dict
+from typing import Iterator
+from typing import Match
+from typing import Optional
+from typing import Tuple
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# called with the number of bytes read so far and the total size of the file
+ProgressCallback = Callable[[int, int], None]
+
+# the pattern always matches, so the result is never None
+_skip_whitespace = cast(Callable[[str, int], Match[str]], re.compile(r"[ \t\n\r]*").match)
+
+# the C accelerated string scanner used by the json module
+_scanstring: Callable[[str, int], Tuple[str, int]] = getattr(json.decoder, "scanstring")
+
+# the characters that can continue a number, a number followed only by these might continue in the next chunk
+_number_tail = cast(Callable[[str, int], Match[str]], re.compile(r"[0-9.eE+-]*").match)
+
+# skips everything but the brackets, a string that is not closed in the buffer is not skipped
+_skip_plain = cast(Callable[[str, int], Match[str]], re.compile(
+    r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL).match)
+
+
+class JSONObjectStream:
+    """Parse JSON objects from a file one member at a time, reading the file in chunks.
+
+    Only the current chunk and the value being parsed are held in memory, so a large
+    `{id: record}` object can be consumed without loading the entire file first."""
+
+    def __init__(self, f: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 progress: Optional[ProgressCallback] = None, total: int = 0) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._total = total
+
+        self._scan_once: Callable[[str, int], Tuple[Any, int]] = getattr(json.JSONDecoder(), "scan_once")
+
+        # json.load shares the key strings across the entire document, but the scanner only
+        # shares them within a single value, so the keys of the values are shared here
+        self._key_memo: Dict[str, str] = {}
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.bytes_read = 0
+
+    def iter_keys(self) -> Iterator[str]:
+        """Iterate over the keys of the next object in the stream.
+        The value of each key must be consumed before asking for the next key"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return None
+
+        while True:
+            yield self._read_key()
+
+            c = self._peek()
+            self._pos += 1
+            if c == "}":
+                return None
+            if c != ",":
+                self._pos -= 1
+                self._error("Expecting ',' delimiter")
+
+    def iter_object(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over the (key, value) pairs of the next object in the stream"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return None
+
+        ws, scan_once, memo = _skip_whitespace, self._scan_once, self._key_memo.setdefault
+        while True:
+            buf = self._buf
+            try:
+                # fast path, the entire member and the delimiter after it are in the buffer
+                pos = self._pos
+                if buf[pos] in " \t\n\r":
+                    pos = ws(buf, pos).end()
+                if buf[pos] != '"':
+                    raise ValueError
+                key, pos = _scanstring(buf, pos + 1)
+                if buf[pos] != ":":
+                    pos = ws(buf, pos).end()
+                    if buf[pos] != ":":
+                        raise ValueError
+                pos += 1
+                if buf[pos] in " \t\n\r":
+                    pos = ws(buf, pos).end()
+                value, pos = scan_once(buf, pos)
+                c = buf[pos]
+                if c in " \t\n\r":
+                    pos = ws(buf, pos).end()
+                    c = buf[pos]
+                if c != "," and c != "}":
+                    # a number cut by the end of the buffer, like "1." of "1.25", or an error
+                    raise ValueError
+                self._pos = pos + 1
+
+            except (IndexError, StopIteration, ValueError):
+                key = self._read_key()
+                value = self.read_value()
+                c = self._peek()
+                self._pos += 1
+
+            if type(value) is dict:
+                value = {memo(k, k): v for k, v in value.items()}
+            yield key, value
+
+            if c == "}":
+                return None
+            if c != ",":
+                self._pos -= 1
+                self._error("Expecting ',' delimiter")
+
+    def read_value(self) -> Any:
+        """Parse the next value in the stream"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._scan_once(self._buf, self._pos)
+            except StopIteration:
+                if self._fill():
+                    continue
+                self._error("Expecting value")
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+
+            # a number at the end of the buffer might continue in the next chunk, like "1." of "1.25"
+            if _number_tail(self._buf, end).end() == len(self._buf) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        """Skip the next value in the stream without building it, only its strings and brackets are scanned.
+        The skipped value is not validated"""
+        if self._peek() not in ("{", "["):
+            # a single number, string or literal
+            self.read_value()
+            return None
+
+        depth = 0
+        while True:
+            buf, pos = self._buf, self._pos
+            while True:
+                pos = _skip_plain(buf, pos).end()
+                if pos == len(buf) or buf[pos] == '"':
+                    # the string continues in the next chunk
+                    break
+                pos += 1
+                if buf[pos - 1] in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        self._pos = pos
+                        return None
+
+            self._pos = pos
+            if not self._fill():
+                self._error("Unterminated value")
+
+    def finish(self) -> None:
+        """Make sure that nothing but whitespace is left in the stream"""
+        if self._peek():
+            self._error("Extra data")
+
+    def _fill(self) -> bool:
+        """Read the next chunk, returns False if the end of the file is reached"""
+        if self._eof:
+            return False
+
+        chunk = self._f.read(self._chunk_size)
+        self._eof = not chunk
+        self.bytes_read += len(chunk)
+
+        # drop the part of the buffer that is already parsed
+        self._buf = self._buf[self._pos:] + self._text_decoder.decode(chunk, final=self._eof)
+        self._pos = 0
+
+        if self._progress is not None and chunk:
+            self._progress(self.bytes_read, self._total)
+        return bool(chunk)
+
+    def _read_key(self) -> str:
+        """Parse the next `"key":` in the stream"""
+        while True:
+            buf = self._buf
+            pos = _skip_whitespace(buf, self._pos).end()
+            if buf.startswith('"', pos):
+                try:
+                    key, end = _scanstring(buf, pos + 1)
+                except json.JSONDecodeError:
+                    # the key might continue in the next chunk
+                    pass
+                else:
+                    end = _skip_whitespace(buf, end).end()
+                    if buf.startswith(":", end):
+                        self._pos = end + 1
+                        return key
+                    if end < len(buf):
+                        self._pos = end
+                        self._error("Expecting ':' delimiter")
+
+            elif pos < len(buf):
+                self._pos = pos
+                self._error("Expecting property name enclosed in double quotes")
+
+            if not self._fill():
+                self._pos = pos
+                self._error("Expecting property name enclosed in double quotes")
+
+    def _peek(self) -> str:
+        """Skip the whitespace and get the next character, an empty string at the end of the file"""
+        while True:
+            self._pos = _skip_whitespace(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof or not self._fill():
+                return ""
+
+    def _expect(self, c: str) -> None:
+        if self._peek() != c:
+            self._error(f"Expecting {c!r}")
+        self._pos += 1
+
+    def _error(self, msg: str) -> None:
+        raise json.JSONDecodeError(msg, self._buf, self._pos)
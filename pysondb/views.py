@@ -0,0 +1,80 @@
+from copy import deepcopy
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Sequence
+from typing import Union
+
+
+class FrozenView(Mapping[str, Any]):
+    """A read-only view over a dict stored in the DB.
+
+    Nothing is copied, the nested dicts and lists are wrapped in views when they are accessed.
+    Since it is a view, it reflects the changes made to the DB after it was created."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Mapping[str, Any]) -> None:
+        self._data = data
+
+    def __getitem__(self, k: str) -> Any:
+        return freeze(self._data[k])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, k: object) -> bool:
+        return k in self._data
+
+    def __repr__(self) -> str:
+        return repr(self._data)
+
+    def copy(self) -> Dict[str, Any]:
+        """Get a mutable copy of the data"""
+        if isinstance(self._data, dict):
+            return deepcopy(self._data)
+        # the view is over the compact storage of a DB
+        return deepcopy(dict(self._data.items()))
+
+
+class FrozenList(Sequence[Any]):
+    """A read-only view over a list stored in the DB"""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: List[Any]) -> None:
+        self._data = data
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return FrozenList(self._data[i])
+        return freeze(self._data[i])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (FrozenList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._data)
+
+    def copy(self) -> List[Any]:
+        """Get a mutable copy of the data"""
+        return deepcopy(self._data)
+
+
+def freeze(value: Any) -> Union[FrozenView, FrozenList, Any]:
+    """Wrap dicts and lists in read-only views, any other value is returned as is"""
+    if isinstance(value, dict):
+        return FrozenView(value)
+    if isinstance(value, list):
+        return FrozenList(value)
+    return value
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from pysondb import AsyncCluster
+from pysondb import AsyncDB
+from pysondb.aio import ReadWriteLock
+from pysondb.cluster import Cluster
+from pysondb.core import DB
+from pysondb.header import header_path
+from pysondb.header import read_header
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def test_async_db_crud(filename):
+    async def main():
+        db = AsyncDB(DB(keys=["name", "age"]))
+        _id = await db.add({"name": "ad", "age": 1})
+        await db.add_many([{"name": "fred", "age": 2}, {"name": "mike", "age": 1}])
+
+        assert db.get_by_id(_id) == {"name": "ad", "age": 1}
+        assert db.id_exists(_id)
+        assert len(db) == 3
+        assert len(await db.get_by_query({"age": 1})) == 2
+        assert await db.count({"age": 1}) == 2
+        assert await db.distinct("age") == [1, 2]
+        assert await db.aggregate("age") == {1: {"count": 2}, 2: {"count": 1}}
+
+        await db.update_by_id(_id, {"age": 5})
+        assert len(await db.update_by_query({"age": 1}, {"name": "changed"})) == 1
+        assert await db.delete_by_query({"age": 2}) != []
+        assert await db.pop(_id) == {"name": "ad", "age": 5}
+
+        await db.commit(filename)
+        new_db = AsyncDB(DB(keys=["name", "age"]))
+        await new_db.load(filename)
+        return await new_db.get_all()
+
+    assert list(run(main()).values()) == [{"name": "changed", "age": 1}]
+
+
+def test_async_db_background_commit(filename):
+    async def main():
+        db = AsyncDB(DB(keys=["name"], async_commit=True))
+        await db.add({"name": "ad"})
+        await db.commit(filename)
+
+    run(main())
+    with open(filename, "r") as f:
+        assert list(json.load(f).values()) == [{"name": "ad"}]
+
+
+def test_read_write_lock():
+    events = []
+
+    async def reader(lock, name):
+        async with lock.read():
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    async def writer(lock):
+        async with lock.write():
+            events.append("writer start")
+            await asyncio.sleep(0.01)
+            events.append("writer end")
+
+    async def main():
+        lock = ReadWriteLock()
+        await asyncio.gather(reader(lock, "r1"), reader(lock, "r2"), writer(lock), reader(lock, "r3"))
+
+    run(main())
+
+    # the first readers run together, the writer runs alone, and the reader after it waits for the writer
+    assert events[:2] == ["r1 start", "r2 start"]
+    assert events[events.index("writer start") + 1] == "writer end"
+    assert events.index("r3 start") > events.index("writer end")
+
+
+def test_async_cluster(filename):
+    async def main():
+        c = AsyncCluster(Cluster({"users": DB(keys=["name"]), "posts": DB(keys=["title"])}))
+        assert c.databases == ["posts", "users"]
+        assert c.test is None
+
+        await c.users.add({"name": "ad"})
+        await c["posts"].add({"title": "hello"})
+        await c.commit(filename)
+
+        new_c = AsyncCluster(Cluster({}, dynamic=True))
+        await new_c.load(filename)
+        return list((await new_c.users.get_all()).values())
+
+    assert run(main()) == [{"name": "ad"}]
+
+
+def test_async_commit_options(tmp_path):
+    filename = str(tmp_path / "db.json")
+    directory = str(tmp_path / "cluster")
+    progress = []
+
+    async def main():
+        db = AsyncDB(DB(keys=["name"]))
+        await db.add({"name": "ad"})
+        await db.commit(filename, compression="gzip", compression_level=1, header=True)
+        await db.compact(str(tmp_path / "db.bin"), format="binary")
+
+        new_db = AsyncDB(DB(keys=["name"]))
+        await new_db.load(filename, progress=lambda done, total: progress.append((done, total)))
+
+        c = AsyncCluster(Cluster({"users": DB(keys=["name"])}))
+        await c.users.add({"name": "fred"})
+        await c.commit(directory, layout="directory", header=True)
+
+        new_c = AsyncCluster(Cluster({"users": DB(keys=["name"])}))
+        await new_c.load(directory, progress=lambda *args: progress.append(args))
+        return list((await new_db.get_all()).values()), list((await new_c.users.get_all()).values())
+
+    assert run(main()) == ([{"name": "ad"}], [{"name": "fred"}])
+    with open(filename, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+    assert read_header(filename)["keys"] == ["name"]
+    assert os.path.isdir(directory)
+    assert os.path.isfile(header_path(os.path.join(directory, "users.db.json")))
+    assert len(progress) >= 2
@@ -0,0 +1,36 @@
+import json
+
+from benchmarks.__main__ import main
+from benchmarks.runner import compare
+from benchmarks.runner import percentile
+from benchmarks.runner import Result
+
+
+def result(name, p50):
+    return Result(name, 100, 4, 10, 1 / p50, p50, p50, None)
+
+
+def test_percentile():
+    durations = [float(i) for i in range(1, 101)]
+    assert percentile(durations, 50) == 50
+    assert percentile(durations, 99) == 99
+    assert percentile([3.0], 99) == 3
+
+
+def test_compare():
+    baseline = [result("add", 1.0), result("load", 1.0)]
+    current = [result("add", 1.1), result("load", 1.5), result("commit", 9.0)]
+    assert [r.name for r in compare(baseline, current, threshold=0.2)] == ["load"]
+    assert compare(baseline, current, threshold=1.0) == []
+
+
+def test_benchmarks_cli(tmp_path):
+    output = str(tmp_path / "results.json")
+    assert main(["--records", "50", "--keys", "4,6", "--repeat", "2", "--output", output]) == 0
+
+    with open(output) as f:
+        results = json.load(f)["results"]
+    assert {(r["records"], r["keys"]) for r in results} == {(50, 4), (50, 6)}
+    assert all(r["runs"] == 2 and r["peak_memory"] is not None for r in results)
+
+    assert main(["--records", "50", "--only", "get_all", "--baseline", output, "--threshold", "-1"]) == 1
@@ -0,0 +1,189 @@
+import json
+import os
+
+import pytest
+
+from pysondb.cluster import Cluster
+from pysondb.core import DB
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "cluster")
+
+
+@pytest.fixture
+def cluster():
+    users = DB(keys=["name", "email"])
+    posts = DB(keys=["by", "title", "content"])
+    users.add_many([{"name": "ad", "email": "ad@y.com"}, {"name": "fred", "email": "fred@prox.com"}])
+    posts.add({"by": "ad", "title": "hello", "content": "hello World"})
+    return Cluster({"users": users, "posts": posts})
+
+
+def new_cluster(**kwargs):
+    return Cluster({"users": DB(keys=["name", "email"]), "posts": DB(keys=["by", "title", "content"])}, **kwargs)
+
+
+def test_cluster_directory_commit(cluster, directory):
+    cluster.commit(directory, layout="directory")
+
+    with open(os.path.join(directory, "manifest.json")) as f:
+        assert json.load(f) == {"dbs": {
+            "users": {"keys": ["email", "name"], "file": "users.db.json"},
+            "posts": {"keys": ["by", "content", "title"], "file": "posts.db.json"},
+        }}
+
+    # every DB file can be loaded by a DB on its own
+    users = DB(keys=["name", "email"])
+    users.load(os.path.join(directory, "users.db.json"))
+    assert users.get_all() == cluster.users.get_all()
+
+
+def test_cluster_directory_load(cluster, directory):
+    cluster.commit(directory, layout="directory")
+
+    c = new_cluster()
+    c.load(directory)
+    assert c.users.get_all() == cluster.users.get_all()
+    assert c.posts.get_all() == cluster.posts.get_all()
+
+
+def test_cluster_directory_load_dynamic(cluster, directory):
+    cluster.commit(directory, layout="directory")
+
+    c = Cluster({}, dynamic=True)
+    c.load(directory)
+    assert c.databases == ["posts", "users"]
+    assert c.posts.keys == ["by", "content", "title"]
+    assert c.users.get_all() == cluster.users.get_all()
+
+
+def test_cluster_directory_load_selective(cluster, directory):
+    cluster.commit(directory, layout="directory")
+
+    c = Cluster({"posts": DB(keys=["by", "title", "content"])})
+    c.load(directory)
+    assert c.posts.get_all() == cluster.posts.get_all()
+    assert c.users is None
+
+
+def test_cluster_directory_load_errors(cluster, directory):
+    cluster.commit(directory, layout="directory")
+
+    with pytest.raises(KeyError):
+        Cluster({"comments": DB(keys=["text"])}).load(directory)
+
+    with pytest.raises(KeyError):
+        Cluster({"users": DB(keys=["name"])}).load(directory)
+
+
+def test_cluster_directory_commit_only_changed(cluster, directory):
+    cluster.commit(directory, layout="directory")
+    for name in ("users", "posts"):
+        os.utime(os.path.join(directory, f"{name}.db.json"), ns=(0, 0))
+
+    # an existing directory is committed to with the directory layout
+    cluster.users.add({"name": "mike", "email": "mike@g.com"})
+    cluster.commit(directory)
+
+    assert os.stat(os.path.join(directory, "users.db.json")).st_mtime_ns != 0
+    assert os.stat(os.path.join(directory, "posts.db.json")).st_mtime_ns == 0
+
+    c = new_cluster()
+    c.load(directory)
+    assert len(c.users) == 3
+
+
+def test_cluster_directory_migrate(cluster, directory, tmp_path):
+    filename = str(tmp_path / "cluster.json")
+    cluster.commit(filename)
+
+    c = new_cluster()
+    c.load(filename)
+    c.commit(directory, layout="directory")
+
+    c = new_cluster()
+    c.load(directory)
+    assert c.users.get_all() == cluster.users.get_all()
+    assert c.posts.get_all() == cluster.posts.get_all()
+
+
+def test_cluster_directory_async_commit(cluster, directory):
+    c = Cluster({"users": cluster.users, "posts": cluster.posts}, async_commit=True)
+    future = c.commit(directory, layout="directory")
+    future.result()
+
+    loaded = new_cluster()
+    loaded.load(directory)
+    assert loaded.users.get_all() == cluster.users.get_all()
+
+
+def test_cluster_directory_progress(cluster, directory):
+    cluster.commit(directory, layout="directory")
+    calls = []
+
+    c = new_cluster(max_workers=1)
+    c.load(directory, progress=lambda read, total: calls.append((read, total)))
+
+    total = sum(os.path.getsize(os.path.join(directory, f"{n}.db.json")) for n in ("users", "posts"))
+    assert calls[-1] == (total, total)
+
+
+def test_cluster_unknown_layout(cluster, directory):
+    with pytest.raises(ValueError):
+        cluster.commit(directory, layout="zip")
+
+
+@pytest.mark.parametrize("async_commit", (False, True))
+def test_cluster_directory_failed_commit(directory, monkeypatch, async_commit):
+    c = new_cluster(async_commit=async_commit)
+    c.commit(directory, layout="directory")
+    if async_commit:
+        c._writer.wait()
+    c.users.add({"name": "ad", "email": "ad@y.com"})
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr("pysondb.cluster.atomic_write", fail)
+        with pytest.raises(OSError):
+            future = c.commit(directory, layout="directory")
+            if future is not None:
+                future.result()
+
+    # the retry writes the DB that failed to be written
+    future = c.commit(directory, layout="directory")
+    if future is not None:
+        future.result()
+    loaded = new_cluster()
+    loaded.load(directory)
+    assert len(loaded.users) == 1
+
+
+def test_cluster_directory_removes_stale_files(cluster, directory):
+    dynamic = Cluster({"users": cluster.users, "posts": cluster.posts}, dynamic=True)
+    dynamic.commit(directory, layout="directory", header=True)
+    dynamic.delete_db("posts")
+    dynamic.commit(directory, layout="directory", compression="gzip")
+
+    assert sorted(os.listdir(directory)) == ["manifest.json", "users.db.json.gz"]
+    loaded = Cluster({}, dynamic=True)
+    loaded.load(directory)
+    assert loaded.databases == ["users"]
+
+
+def test_cluster_directory_keeps_other_files(cluster, tmp_path):
+    directory = str(tmp_path / "data")
+    os.mkdir(directory)
+    # files of the user that only look like DB files
+    for name in ("notes.db.json", "other.db.json.header", "users.db.json.gz"):
+        with open(os.path.join(directory, name), "w") as f:
+            f.write("{}")
+
+    cluster.commit(directory)
+    cluster.commit(directory, compression="gzip")
+    assert sorted(os.listdir(directory)) == [
+        "manifest.json", "notes.db.json", "other.db.json.header", "posts.db.json.gz", "users.db.json.gz"
+    ]
@@ -0,0 +1,134 @@
+import json
+import os
+
+import pytest
+
+from pysondb.cluster import Cluster
+from pysondb.core import DB
+from pysondb.stream import JSONObjectStream
+
+
+@pytest.fixture
+def cluster():
+    users = DB(keys=["name", "email"])
+    posts = DB(keys=["by", "title", "content"])
+    users.add_many([{"name": "ad", "email": "ad@y.com"}, {"name": "fred", "email": "fred@prox.com"}])
+    posts.add({"by": "ad", "title": "hello", "content": "hello World"})
+    return Cluster({"users": users, "posts": posts})
+
+
+@pytest.fixture(params=("file", "directory"))
+def path(request, tmp_path, cluster):
+    path = str(tmp_path / "cluster")
+    cluster.commit(path, layout=request.param)
+    return path
+
+
+def new_cluster(**kwargs):
+    return Cluster({"users": DB(keys=["name", "email"]), "posts": DB(keys=["by", "title", "content"])}, **kwargs)
+
+
+def test_cluster_lazy_load(cluster, path):
+    c = new_cluster(lazy=True)
+    c.load(path)
+    assert sorted(c._unloaded) == ["posts", "users"]
+
+    assert c.users.get_all() == cluster.users.get_all()
+    assert list(c._unloaded) == ["posts"]
+    assert c["posts"].get_all() == cluster.posts.get_all()
+    assert not c._unloaded
+
+
+def test_cluster_lazy_load_dynamic(cluster, path):
+    c = Cluster({}, dynamic=True, lazy=True)
+    c.load(path)
+    assert c.databases == ["posts", "users"]
+
+    assert c.posts.keys == ["by", "content", "title"]
+    assert c.posts.get_all() == cluster.posts.get_all()
+    assert "users" in c._unloaded
+
+
+def test_cluster_lazy_load_skips_values(cluster, tmp_path, monkeypatch):
+    path = str(tmp_path / "cluster")
+    cluster.commit(path)
+
+    def fail(*args):
+        raise AssertionError("the values were parsed")
+
+    # only the DB that is used is parsed, the values of the other DBs are skipped
+    with monkeypatch.context() as m:
+        m.setattr(JSONObjectStream, "iter_object", fail)
+        c = Cluster({}, dynamic=True, lazy=True)
+        c.load(path)
+    assert c.users.get_all() == cluster.users.get_all()
+
+
+def test_cluster_lazy_load_indexes(path):
+    c = new_cluster(lazy=True)
+    c._dbs["users"].create_index("name")
+    c.load(path)
+
+    assert list(c.users.get_by_query({"name": "fred"}).values()) == [{"name": "fred", "email": "fred@prox.com"}]
+
+
+def test_cluster_lazy_load_key_error(path):
+    c = Cluster({"users": DB(keys=["name"])}, lazy=True)
+    c.load(path)
+
+    with pytest.raises(KeyError):
+        c.users
+
+    c = Cluster({"comments": DB(keys=["text"])}, lazy=True)
+    with pytest.raises(KeyError):
+        c.load(path)
+        c.comments
+
+
+def test_cluster_lazy_commit(cluster, path, tmp_path):
+    c = new_cluster(lazy=True)
+    c.load(path)
+    c.users.add({"name": "mike", "email": "mike@g.com"})
+
+    filename = str(tmp_path / "other.json")
+    c.commit(filename)
+    with open(filename) as f:
+        data = json.load(f)
+    assert len(data["users"]["data"]) == 3
+    assert data["posts"]["data"] == cluster.posts.get_all()
+
+
+def test_cluster_lazy_directory_commit_skips_unloaded(tmp_path, cluster):
+    directory = str(tmp_path / "cluster")
+    cluster.commit(directory, layout="directory")
+    os.utime(os.path.join(directory, "posts.db.json"), ns=(0, 0))
+
+    c = new_cluster(lazy=True)
+    c.load(directory)
+    c.users.add({"name": "mike", "email": "mike@g.com"})
+    c.commit(directory)
+
+    assert "posts" in c._unloaded
+    assert os.stat(os.path.join(directory, "posts.db.json")).st_mtime_ns == 0
+
+    c = new_cluster()
+    c.load(directory)
+    assert len(c.users) == 3
+    assert c.posts.get_all() == cluster.posts.get_all()
+
+
+def test_cluster_lazy_directory_commit_other_compression(tmp_path, cluster):
+    directory = str(tmp_path / "cluster")
+    cluster.commit(directory, layout="directory")
+
+    c = new_cluster(lazy=True)
+    c.load(directory)
+    c.posts.add({"by": "fred", "title": "hi", "content": "hi"})
+    # the DB that was never accessed moves to another file, so it is read and written there
+    c.commit(directory, compression="gzip")
+    assert sorted(os.listdir(directory)) == ["manifest.json", "posts.db.json.gz", "users.db.json.gz"]
+
+    loaded = new_cluster()
+    loaded.load(directory)
+    assert loaded.users.get_all() == cluster.users.get_all()
+    assert len(loaded.posts) == 2
@@ -0,0 +1,130 @@
+import pytest
+
+from pysondb import DB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1, "score": 4},
+    {"name": "fred", "age": 2, "score": 10},
+    {"name": "mike", "age": 1, "score": 2},
+    {"name": "steve", "age": 3, "score": 7},
+    {"name": "fit", "age": 1, "score": 6},
+]
+
+
+@pytest.fixture(params=(None, "hash", "sorted"))
+def db(request):
+    db = DB(keys=["name", "age", "score"])
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    if request.param is not None:
+        db.create_index("age", kind=request.param)
+    return db
+
+
+def test_db_count(db):
+    assert db.count() == 5
+    assert db.count({"age": 1}) == 3
+    assert db.count({"age": {"$gte": 2}, "score": {"$gt": 7}}) == 1
+    assert db.count({"age": 5}) == 0
+
+
+def test_db_distinct(db):
+    assert sorted(db.distinct("age")) == [1, 2, 3]
+    assert sorted(db.distinct("age", {"score": {"$gt": 5}})) == [1, 2, 3]
+    assert db.distinct("age", {"score": {"$lt": 5}}) == [1]
+    assert db.distinct("name", {"age": 3}) == ["steve"]
+
+
+def test_db_distinct_unhashable():
+    db = DB(keys=["name", "tags"])
+    db.add_many([{"name": "ad", "tags": ["a"]}, {"name": "fred", "tags": ["a"]}, {"name": "mike", "tags": "b"}])
+    assert db.distinct("tags") == ["b", ["a"]]
+
+    db.create_index("tags")
+    assert db.distinct("tags") == ["b", ["a"]]
+
+
+def test_db_aggregate(db):
+    result = db.aggregate("age", {"score": ["sum", "min", "max", "avg"]})
+    assert result == {
+        1: {"count": 3, "score": {"sum": 12, "min": 2, "max": 6, "avg": 4}},
+        2: {"count": 1, "score": {"sum": 10, "min": 10, "max": 10, "avg": 10}},
+        3: {"count": 1, "score": {"sum": 7, "min": 7, "max": 7, "avg": 7}},
+    }
+
+
+def test_db_aggregate_count(db):
+    assert db.aggregate("age") == {1: {"count": 3}, 2: {"count": 1}, 3: {"count": 1}}
+    assert db.aggregate("age", query={"score": {"$gt": 5}}) == {1: {"count": 1}, 2: {"count": 1}, 3: {"count": 1}}
+
+
+def test_db_aggregate_no_group(db):
+    assert db.aggregate(ops={"score": ["count", "sum"], "name": ["min", "max"]}) == {
+        None: {"count": 5, "score": {"count": 5, "sum": 29}, "name": {"min": "ad", "max": "steve"}},
+    }
+    assert db.aggregate(ops={"score": ["max"]}, query={"age": 1}) == {None: {"count": 3, "score": {"max": 6}}}
+    assert db.aggregate(query={"age": 5}) == {}
+
+
+def test_db_aggregate_errors(db):
+    with pytest.raises(ValueError):
+        db.aggregate("age", {"score": ["median"]})
+    with pytest.raises(KeyError):
+        db.aggregate("height")
+    with pytest.raises(KeyError):
+        db.aggregate(ops={"height": ["sum"]})
+    with pytest.raises(KeyError):
+        db.distinct("height")
+
+
+def test_db_aggregate_changes():
+    db = DB(keys=["name", "age"])
+    db.create_index("age", kind="sorted")
+    _id = db.add({"name": "ad", "age": 1})
+    db.add({"name": "fred", "age": 2})
+
+    db.update_by_id(_id, {"age": 2})
+    db.add({"name": "mike", "age": "old"})
+    assert db.aggregate("age") == {2: {"count": 2}, "old": {"count": 1}}
+    assert db.distinct("age") == [2, "old"]
+
+    db.add({"name": "steve", "age": None})
+    assert db.aggregate("age") == {2: {"count": 2}, "old": {"count": 1}, None: {"count": 1}}
+
+
+@pytest.mark.parametrize("values,expected", [
+    ([1, None, 3], {"count": 3, "sum": 4, "min": 1, "max": 3, "avg": 2}),
+    ([None, 2], {"count": 2, "sum": 2, "min": 2, "max": 2, "avg": 2}),
+    ([None], {"count": 1, "sum": 0, "min": None, "max": None, "avg": None}),
+    ([2, "a", [1], 4], {"count": 4, "sum": 6, "min": 2, "max": 4, "avg": 3}),
+    ([{"a": 1}, 5], {"count": 2, "sum": 5, "min": 5, "max": 5, "avg": 5}),
+])
+def test_db_aggregate_mixed_values(values, expected):
+    db = DB(keys=["v"])
+    db.add_many([{"v": v} for v in values])
+    result = db.aggregate(ops={"v": ["count", "sum", "min", "max", "avg"]})
+    assert result == {None: {"count": len(values), "v": expected}}
+
+
+def test_db_aggregate_mixed_values_min_max():
+    db = DB(keys=["v"])
+    db.add_many([{"v": v} for v in ["b", None, 1, "a"]])
+    assert db.aggregate(ops={"v": ["min", "max"]}) == {None: {"count": 4, "v": {"min": "a", "max": "b"}}}
+
+
+@pytest.mark.parametrize("index", (None, "hash", "sorted"))
+def test_db_aggregate_unhashable_group(index):
+    db = DB(keys=["tags", "score"])
+    db.add_many([
+        {"tags": ["a", "b"], "score": 1},
+        {"tags": "a", "score": 2},
+        {"tags": ["a", "b"], "score": 3},
+        {"tags": {"x": [1]}, "score": 4},
+    ])
+    if index is not None:
+        db.create_index("tags", kind=index)
+    assert db.aggregate("tags", {"score": ["sum"]}) == {
+        ("a", "b"): {"count": 2, "score": {"sum": 4}},
+        "a": {"count": 1, "score": {"sum": 2}},
+        (("x", (1,)),): {"count": 1, "score": {"sum": 4}},
+    }
+    assert db.aggregate("tags") == {("a", "b"): {"count": 2}, "a": {"count": 1}, (("x", (1,)),): {"count": 1}}
@@ -0,0 +1,120 @@
+import json
+import os
+import stat
+
+import pytest
+
+from pysondb import core
+from pysondb.cluster import Cluster
+from pysondb.core import DB
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def read_json(filename):
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def test_db_commit_failure_keeps_file(filename, monkeypatch):
+    db = DB(keys=["name"])
+    _id = db.add({"name": "ad"})
+    db.commit(filename)
+
+    def broken_dump(data, f, indent=None):
+        f.write('{"1": {"na')
+        raise RuntimeError("crash")
+
+    db.add({"name": "fred"})
+    monkeypatch.setattr(core.json, "dump", broken_dump)
+    with pytest.raises(RuntimeError):
+        db.commit(filename)
+
+    assert read_json(filename) == {_id: {"name": "ad"}}
+    assert os.listdir(os.path.dirname(filename)) == [os.path.basename(filename)]
+
+
+@pytest.mark.parametrize("async_commit", (False, True))
+def test_db_failed_commit_keeps_changes(tmp_path, filename, async_commit):
+    db = DB(keys=["name"], async_commit=async_commit)
+    db.add({"name": "ad"})
+
+    with pytest.raises(FileNotFoundError):
+        future = db.commit(str(tmp_path / "missing" / "strip.pysondb.json"))
+        if future is not None:
+            future.result()
+
+    # the values are not on the disk, so a load still warns before dropping them
+    with open(filename, "w") as f:
+        json.dump({}, f)
+    with pytest.warns(UserWarning):
+        db.load(filename)
+    assert len(db.get_all()) == 1
+
+
+def test_db_commit_keeps_permissions(filename):
+    db = DB(keys=["name"])
+    db.commit(filename)
+    os.chmod(filename, 0o600)
+
+    db.add({"name": "ad"})
+    db.commit(filename)
+
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o600
+
+
+def test_db_async_commit_snapshot(filename):
+    db = DB(keys=["name", "age"], async_commit=True)
+    _id = db.add({"name": "ad", "age": 1})
+
+    future = db.commit(filename)
+    db.update_by_id(_id, {"age": 2})
+    db.add({"name": "fred", "age": 3})
+    future.result()
+
+    assert read_json(filename) == {_id: {"name": "ad", "age": 1}}
+
+    db.commit(filename)
+    db.load(filename)
+    assert db.get_by_id(_id) == {"name": "ad", "age": 2}
+    assert len(db) == 2
+
+
+def test_db_sync_commit_returns_none(filename):
+    db = DB(keys=["name"])
+    assert db.commit(filename) is None
+
+
+def test_db_async_commit_journal(filename):
+    db = DB(keys=["name", "age"], journal=True, async_commit=True)
+    id1 = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+
+    id2 = db.add({"name": "fred", "age": 2})
+    db.update_by_id(id1, {"age": 5})
+    db.commit(filename).result()
+
+    assert read_json(filename) == {id1: {"name": "ad", "age": 1}}
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    new_db.load(filename)
+    assert new_db._db == {id1: {"name": "ad", "age": 5}, id2: {"name": "fred", "age": 2}}
+
+    db.compact(filename).result()
+    assert not os.path.isfile(f"{filename}.log")
+    assert read_json(filename) == new_db._db
+
+
+def test_cluster_async_commit(filename):
+    users = DB(keys=["name"])
+    c = Cluster({"users": users}, async_commit=True)
+    _id = c.users.add({"name": "ad"})
+
+    future = c.commit(filename)
+    c.users.update_by_id(_id, {"name": "changed"})
+    future.result()
+
+    assert read_json(filename) == {"users": {"keys": ["name"], "data": {_id: {"name": "ad"}}}}
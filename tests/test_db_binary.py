@@ -0,0 +1,172 @@
+import io
+import json
+
+import pytest
+
+from pysondb import binary
+from pysondb import DB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1, "score": 1.5, "active": True, "tags": ["a"]},
+    {"name": "fred", "age": 2 ** 70, "score": -2.0, "active": False, "tags": []},
+    {"name": "ad", "age": -3, "score": 0.0, "active": True, "tags": None},
+    {"name": "nul\0 é", "age": 4, "score": 1e100, "active": False, "tags": {"x": 1}},
+]
+KEYS = ["name", "age", "score", "active", "tags"]
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.bin")
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=KEYS)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+@pytest.mark.parametrize("storage", ("dict", "tuple", "columns"))
+def test_db_binary_commit_load(db, filename, storage):
+    db.commit(filename, format="binary")
+
+    with open(filename, "rb") as f:
+        assert f.read(len(binary.MAGIC)) == binary.MAGIC
+
+    new_db = DB(keys=KEYS, storage=storage)
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+    assert list(new_db.get_all()) == list(db.get_all())
+
+
+@pytest.mark.parametrize(
+    "values",
+    (
+        [1, 2, 3],
+        [1.5, 2.5],
+        [True, False],
+        ["a", "b", "a", ""],
+        ["a", "b", "c"],
+        [""],
+        ["x\0y", "x", "x\0y"],
+        [1, 1.5, None, True, "a", [1]],
+        [2 ** 63, 1],
+        [],
+    )
+)
+def test_binary_columns(values):
+    data = {str(i): {"v": v} for i, v in enumerate(values)}
+    f = io.BytesIO()
+    binary.dump(data, ["v"], f)
+    f.seek(0)
+
+    loaded = binary.load(f)
+    assert loaded.keys == ["v"]
+    assert loaded.ids == list(data)
+    assert loaded.columns == [values]
+    assert [type(v) for v in loaded.columns[0]] == [type(v) for v in values]
+
+
+def test_db_binary_smaller_than_json(tmp_path):
+    db = DB(keys=["name", "age"])
+    db.add_many([{"name": f"user{i % 10}", "age": i} for i in range(1000)])
+    db.commit(str(tmp_path / "db.json"))
+    db.commit(str(tmp_path / "db.bin"), format="binary")
+
+    assert (tmp_path / "db.bin").stat().st_size < (tmp_path / "db.json").stat().st_size
+
+
+def test_db_binary_unverified_values(filename):
+    db = DB(keys=["name", "age"], verify_data=False)
+    db.add({"name": "ad", "age": 1})
+    db.add({"name": "fred"})
+    db.commit(filename, format="binary")
+
+    new_db = DB(keys=["name", "age"], verify_data=False)
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+
+
+def test_db_binary_load_dynamic(db, filename):
+    db.commit(filename, format="binary")
+
+    new_db = DB(keys=[], dynamic=True)
+    new_db.load(filename)
+    assert new_db.keys == sorted(KEYS)
+    assert new_db.get_all() == db.get_all()
+
+
+def test_db_binary_load_key_error(db, filename):
+    db.commit(filename, format="binary")
+
+    with pytest.raises(KeyError):
+        DB(keys=["name"]).load(filename)
+
+
+def test_db_binary_load_truncated(db, filename):
+    db.commit(filename, format="binary")
+    with open(filename, "rb") as f:
+        data = f.read()
+    with open(filename, "wb") as f:
+        f.write(data[:-10])
+
+    new_db = DB(keys=KEYS)
+    with pytest.warns(UserWarning):
+        new_db.load(filename)
+    assert new_db.get_all() == {}
+
+
+def test_db_binary_empty(filename):
+    DB(keys=KEYS).commit(filename, format="binary")
+
+    new_db = DB(keys=KEYS)
+    new_db.load(filename)
+    assert new_db.get_all() == {}
+
+
+@pytest.mark.parametrize("storage", ("dict", "tuple", "columns"))
+def test_db_binary_no_keys(filename, storage):
+    db = DB(keys=[])
+    db.add_many([{}, {}])
+    db.commit(filename, format="binary")
+
+    new_db = DB(keys=[], storage=storage)
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+
+
+def test_db_binary_back_to_json(db, filename):
+    db.commit(filename, format="binary")
+    db.commit(filename)
+
+    with open(filename) as f:
+        assert json.load(f) == db.get_all()
+
+
+def test_db_binary_unknown_format(db, filename):
+    with pytest.raises(ValueError):
+        db.commit(filename, format="xml")
+
+
+def test_db_binary_async_commit(filename):
+    db = DB(keys=["name"], async_commit=True)
+    db.add({"name": "ad"})
+    db.commit(filename, format="binary").result()
+
+    new_db = DB(keys=["name"])
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+
+
+def test_db_binary_journal(filename):
+    db = DB(keys=["name"], journal=True)
+    db.add({"name": "ad"})
+    db.compact(filename, format="binary")
+    _id = db.add({"name": "fred"})
+    db.commit(filename)
+
+    new_db = DB(keys=["name"], journal=True)
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+    assert new_db.get_by_id(_id) == {"name": "fred"}
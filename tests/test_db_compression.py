@@ -0,0 +1,130 @@
+import gzip
+import json
+import lzma
+import os
+import zlib
+
+import pytest
+
+from pysondb import Cluster
+from pysondb import DB
+from pysondb.compression import compression_for
+
+DB_TEST_DATA = [{"name": f"user{i}", "age": i % 7} for i in range(200)]
+
+DECOMPRESS = {"gzip": gzip.decompress, "lzma": lzma.decompress, "zlib": zlib.decompress}
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=["name", "age"])
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+def read(path, compression):
+    with open(path, "rb") as f:
+        return json.loads(DECOMPRESS[compression](f.read()))
+
+
+@pytest.mark.parametrize("name,compression", (
+    ("db.json.gz", "gzip"),
+    ("db.json.xz", "lzma"),
+    ("db.json.zz", "zlib"),
+    ("db.json", "gzip"),
+))
+@pytest.mark.parametrize("verify", (True, "auto"))
+def test_db_compressed_commit_load(db, tmp_path, name, compression, verify):
+    path = str(tmp_path / name)
+    db.commit(path, compression=None if name.endswith((".gz", ".xz", ".zz")) else compression)
+    assert read(path, compression) == db.get_all()
+
+    new_db = DB(keys=["name", "age"])
+    progress = []
+    new_db.load(path, verify=verify, progress=lambda read, total: progress.append((read, total)))
+    assert new_db.get_all() == db.get_all()
+    assert progress[-1] == (os.path.getsize(path), os.path.getsize(path))
+
+
+def test_db_compression_level(db, tmp_path):
+    fast, small = str(tmp_path / "fast.json.gz"), str(tmp_path / "small.json.gz")
+    db.commit(fast, compression_level=0)
+    db.commit(small, compression_level=9)
+    assert os.path.getsize(small) < os.path.getsize(fast)
+
+    with pytest.raises(ValueError):
+        db.commit(fast, compression_level=10)
+
+
+def test_db_compressed_binary(db, tmp_path):
+    path = str(tmp_path / "db.bin.xz")
+    db.commit(path, format="binary")
+    new_db = DB(keys=["name", "age"])
+    new_db.load(path)
+    assert new_db.get_all() == db.get_all()
+
+
+def test_db_compression_errors(db, tmp_path):
+    with pytest.raises(ValueError):
+        db.commit(str(tmp_path / "db.json"), compression="bz2")
+    with pytest.raises(ValueError):
+        db.commit(str(tmp_path / "db.map.gz"), format="mapped")
+
+
+def test_db_compressed_broken_file(db, tmp_path):
+    path = str(tmp_path / "db.json.gz")
+    db.commit(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "wb") as f:
+        f.write(content[:len(content) // 2])
+
+    new_db = DB(keys=["name", "age"])
+    with pytest.warns(UserWarning):
+        new_db.load(path, verify="auto")
+    assert len(new_db) == 0
+
+
+def test_db_compressed_journal(tmp_path):
+    path = str(tmp_path / "db.json.gz")
+    db = DB(keys=["name", "age"], journal=True)
+    db.add({"name": "ad", "age": 1})
+    db.commit(path)
+    db.add({"name": "fred", "age": 2})
+    db.commit(path)
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    new_db.load(path)
+    assert new_db.get_all() == db.get_all()
+
+
+def test_compression_for():
+    assert compression_for("db.json") is None
+    assert compression_for("db.JSON.GZ") == "gzip"
+    assert compression_for("db.json.lzma") == "lzma"
+    assert compression_for("db.json.gz", "zlib") == "zlib"
+
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_cluster_compressed_file(db, tmp_path, lazy):
+    path = str(tmp_path / "cluster.json.xz")
+    Cluster({"users": db}).commit(path)
+    assert read(path, "lzma")["users"]["data"] == db.get_all()
+
+    c = Cluster({"users": DB(keys=["name", "age"])}, lazy=lazy)
+    c.load(path)
+    assert c.users.get_all() == db.get_all()
+
+    c = Cluster({"users": DB(keys=["name", "age"])})
+    c.load(path, verify="auto")
+    assert c.users.get_all() == db.get_all()
+
+
+def test_cluster_compressed_directory(db, tmp_path):
+    path = str(tmp_path / "cluster")
+    Cluster({"users": db}).commit(path, layout="directory", compression="zlib", compression_level=1)
+    assert read(os.path.join(path, "users.db.json.zz"), "zlib") == db.get_all()
+
+    c = Cluster({"users": DB(keys=["name", "age"])})
+    c.load(path)
+    assert c.users.get_all() == db.get_all()
@@ -0,0 +1,245 @@
+import json
+import os
+
+import pytest
+
+from pysondb import DB
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def read_delta(filename, seq):
+    with open(f"{filename}.delta.{seq}", "r") as f:
+        return json.load(f)
+
+
+def test_db_delta_first_commit_is_full(filename):
+    db = DB(keys=["name", "age"])
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename, mode="delta")
+
+    with open(filename, "r") as f:
+        assert json.load(f) == {_id: {"name": "ad", "age": 1}}
+    assert not os.path.isfile(f"{filename}.delta.1")
+
+
+def test_db_delta_commit_writes_changes(filename):
+    db = DB(keys=["name", "age"])
+    id1 = db.add({"name": "ad", "age": 1})
+    id2 = db.add({"name": "fred", "age": 2})
+    id3 = db.add({"name": "mike", "age": 3})
+    db.commit(filename)
+
+    id4 = db.add({"name": "steve", "age": 4})
+    db.update_by_id(id1, {"age": 5})
+    db.update_by_id(id4, {"age": 6})
+    db.delete_by_id(id2)
+    # added and deleted before the commit, so it is not a part of the delta
+    db.delete_by_id(db.add({"name": "sam", "age": 7}))
+    db.delete_by_id(id3)
+    db.commit(filename, mode="delta")
+
+    # the DB file is left untouched
+    with open(filename, "r") as f:
+        assert len(json.load(f)) == 3
+
+    delta = read_delta(filename, 1)
+    assert delta["cleared"] is False
+    assert delta["added"][id4] == {"name": "steve", "age": 6}
+    assert delta["updated"] == {id1: {"name": "ad", "age": 5}}
+    assert delta["deleted"] == [id2, id3]
+
+    # nothing changed since, so no delta is written
+    db.commit(filename, mode="delta")
+    assert not os.path.isfile(f"{filename}.delta.2")
+
+
+def test_db_delta_load_applies_chain(filename):
+    db = DB(keys=["name", "age"])
+    id1 = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+
+    id2 = db.add({"name": "fred", "age": 2})
+    db.commit(filename, mode="delta")
+    db.update_by_query({"age": 1}, {"name": "changed"})
+    db.delete_by_id(id2)
+    db.add({"name": "mike", "age": 3})
+    db.commit(filename, mode="delta")
+    db.delete_by_query({"age": 3})
+    db.commit(filename, mode="delta")
+
+    new_db = DB(keys=["name", "age"])
+    new_db.create_index("age")
+    new_db.load(filename)
+    assert new_db._db == {id1: {"name": "changed", "age": 1}}
+    assert list(new_db.get_by_query({"age": 1})) == [id1]
+
+    # the loaded DB continues the chain
+    new_db.delete_all()
+    id3 = new_db.add({"name": "steve", "age": 4})
+    new_db.commit(filename, mode="delta")
+    assert read_delta(filename, 4)["cleared"] is True
+
+    db.load(filename, force=True)
+    assert db._db == {id3: {"name": "steve", "age": 4}}
+
+
+def test_db_delta_squash(filename):
+    db = DB(keys=["name", "age"])
+    db.commit(filename)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename, mode="delta")
+    assert os.path.isfile(f"{filename}.delta.1")
+
+    db.squash(filename)
+    assert not os.path.isfile(f"{filename}.delta.1")
+    with open(filename, "r") as f:
+        assert json.load(f) == {_id: {"name": "ad", "age": 1}}
+
+    # a full commit also starts a new chain
+    db.add({"name": "fred", "age": 2})
+    db.commit(filename, mode="delta")
+    db.commit(filename)
+    assert not os.path.isfile(f"{filename}.delta.1")
+
+
+def test_db_delta_of_another_file_is_ignored(filename):
+    db = DB(keys=["name", "age"])
+    db.commit(filename)
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename, mode="delta")
+
+    # the file is replaced, but the delta of the old file is left behind
+    with open(filename, "w") as f:
+        json.dump({"1": {"name": "fred", "age": 2}}, f)
+
+    new_db = DB(keys=["name", "age"])
+    with pytest.warns(UserWarning):
+        new_db.load(filename)
+    assert new_db._db == {"1": {"name": "fred", "age": 2}}
+
+    # the stale delta is replaced by the next one
+    new_db.add({"name": "mike", "age": 3})
+    new_db.commit(filename, mode="delta")
+    db.load(filename, force=True)
+    assert sorted(x["name"] for x in db._db.values()) == ["fred", "mike"]
+
+
+def test_db_delta_verifies_values(filename):
+    db = DB(keys=["name", "age"])
+    db.commit(filename)
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename, mode="delta")
+
+    delta = read_delta(filename, 1)
+    delta["added"] = {"1": {"name": "ad"}}
+    with open(f"{filename}.delta.1", "w") as f:
+        json.dump(delta, f)
+
+    with pytest.raises(KeyError):
+        DB(keys=["name", "age"]).load(filename)
+
+
+@pytest.mark.parametrize("storage", ("dict", "tuple", "columns"))
+def test_db_delta_storage(filename, storage):
+    db = DB(keys=["name", "age"], storage=storage)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+    db.update_by_id(_id, {"age": 2})
+    db.commit(filename, mode="delta")
+
+    new_db = DB(keys=["name", "age"], storage=storage)
+    new_db.load(filename)
+    assert new_db.get_by_id(_id) == {"name": "ad", "age": 2}
+
+
+def test_db_delta_async_commit(filename):
+    db = DB(keys=["name", "age"], async_commit=True)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename, mode="delta")
+    db.update_by_id(_id, {"age": 2})
+    future = db.commit(filename, mode="delta")
+    # the delta holds the value as it was at the commit
+    db.update_by_id(_id, {"age": 3})
+    future.result()
+
+    assert read_delta(filename, 1)["updated"] == {_id: {"name": "ad", "age": 2}}
+
+
+def test_db_delta_compressed(filename):
+    db = DB(keys=["name", "age"])
+    db.commit(filename + ".gz")
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename + ".gz", mode="delta")
+
+    with open(f"{filename}.gz.delta.1", "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+    new_db = DB(keys=["name", "age"])
+    new_db.load(filename + ".gz")
+    assert new_db.get_by_id(_id) == {"name": "ad", "age": 1}
+
+
+def test_db_delta_errors(filename):
+    with pytest.raises(ValueError):
+        DB(keys=["name", "age"]).commit(filename, mode="patch")
+    with pytest.raises(ValueError):
+        DB(keys=["name", "age"], journal=True).commit(filename, mode="delta")
+
+
+@pytest.mark.parametrize("async_commit", (False, True))
+def test_db_delta_failed_write(filename, monkeypatch, async_commit):
+    db = DB(keys=["name", "age"], async_commit=async_commit)
+    id1 = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+    db.update_by_id(id1, {"age": 2})
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr("pysondb.core.write_delta", fail)
+        with pytest.raises(OSError):
+            future = db.commit(filename, mode="delta")
+            if future is not None:
+                future.result()
+
+    id2 = db.add({"name": "fred", "age": 3})
+    future = db.commit(filename, mode="delta")
+    if future is not None:
+        future.result()
+
+    new_db = DB(keys=["name", "age"])
+    new_db.load(filename)
+    assert new_db._db == {id1: {"name": "ad", "age": 2}, id2: {"name": "fred", "age": 3}}
+
+
+def test_db_delta_failed_full_write(filename, monkeypatch):
+    db = DB(keys=["name", "age"])
+    db.commit(filename)
+    id1 = db.add({"name": "ad", "age": 1})
+
+    with monkeypatch.context() as m:
+        m.setattr("pysondb.core.atomic_write", lambda *args, **kwargs: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            db.commit(filename)
+
+    # the value added before the failed commit is not lost by the next delta
+    id2 = db.add({"name": "fred", "age": 2})
+    db.commit(filename, mode="delta")
+
+    new_db = DB(keys=["name", "age"])
+    new_db.load(filename)
+    assert sorted(new_db._db) == sorted([id1, id2])
+
+
+def test_db_squash_thread_safe(filename):
+    db = DB(keys=["name", "age"], thread_safe=True, metrics=True)
+    db.commit(filename)
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename, mode="delta")
+    db.squash(filename)
+    assert not os.path.isfile(f"{filename}.delta.1")
+    assert db.metrics.stats()["compact"].calls == 1
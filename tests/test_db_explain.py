@@ -0,0 +1,118 @@
+import pytest
+
+from pysondb import DB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "mike", "age": 1},
+    {"name": "steve", "age": 3},
+    {"name": "fit", "age": 1},
+]
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=["name", "age"])
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+def test_explain_full_scan(db):
+    plan = db.explain({"age": 1})
+    assert plan["plan"] == "full_scan"
+    assert plan["indexes"] == []
+    assert plan["filter"] == {"age": {"$eq": 1}}
+    assert (plan["estimated"], plan["examined"], plan["returned"]) == (5, 5, 3)
+    assert set(plan["time"]) == {"plan", "index", "filter", "total"}
+    assert plan["time"]["total"] >= plan["time"]["filter"] >= 0
+
+
+def test_explain_index_lookup(db):
+    db.create_index("age")
+    plan = db.explain({"age": 1})
+    assert plan["plan"] == "index_lookup"
+    assert plan["indexes"] == [{"key": "age", "kind": "hash", "operators": ["$eq"], "matched": 3}]
+    assert plan["filter"] == {}
+    assert (plan["estimated"], plan["examined"], plan["returned"]) == (3, 0, 3)
+
+    plan = db.explain({"age": 1, "name": {"$ne": "ad"}})
+    assert plan["filter"] == {"name": {"$ne": "ad"}}
+    assert (plan["estimated"], plan["examined"], plan["returned"]) == (3, 3, 2)
+
+
+def test_explain_partial_index(db):
+    db.create_index("age")
+    plan = db.explain({"age": {"$in": [1, 3], "$ne": 3}})
+    assert plan["indexes"][0]["operators"] == ["$in"]
+    assert plan["filter"] == {"age": {"$ne": 3}}
+    assert (plan["estimated"], plan["examined"], plan["returned"]) == (4, 4, 3)
+
+
+def test_explain_index_intersection(db):
+    db.create_index("age", kind="sorted")
+    db.create_index("name")
+    plan = db.explain({"age": {"$lte": 2}, "name": {"$in": ["fred", "steve", "fit"]}})
+    assert plan["plan"] == "index_intersection"
+    assert [(i["key"], i["kind"], i["matched"]) for i in plan["indexes"]] == [("age", "sorted", 4), ("name", "hash", 3)]
+    assert (plan["estimated"], plan["examined"], plan["returned"]) == (3, 0, 2)
+
+
+def test_explain_no_match(db):
+    db.create_index("age")
+    plan = db.explain({"age": 7, "name": "ad"})
+    assert plan["plan"] == "index_lookup"
+    assert (plan["estimated"], plan["examined"], plan["returned"]) == (0, 0, 0)
+
+
+@pytest.mark.parametrize("query", (
+    {"age": 1},
+    {"age": {"$gte": 2}},
+    {"age": {"$in": [1, 3]}, "name": {"$ne": "ad"}},
+    {"name": "fred", "age": 2},
+    {"age": 9},
+))
+def test_explain_matches_query(db, query):
+    expected = len(db.get_by_query(query))
+    assert db.explain(query)["returned"] == expected
+    db.create_index("age", kind="sorted")
+    assert db.explain(query)["returned"] == expected
+    db.create_index("name")
+    assert db.explain(query)["returned"] == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    (
+        {"age": 1},
+        {"age": 1, "name": {"$ne": "ad"}},
+        {"age": {"$lte": 2}, "name": {"$in": ["fred", "steve", "fit"]}, "age2": 1},
+    )
+)
+def test_explain_counts_like_query(query):
+    db = DB(keys=["name", "age", "age2"], metrics=True)
+    db.add_many([dict(d, age2=d["age"]) for d in DB_TEST_DATA])
+    db.create_index("age", kind="sorted")
+    db.create_index("name")
+
+    plan = db.explain(query)
+    db.get_by_query(query)
+    stats = db.metrics.stats()["get_by_query"]
+    assert (stats.scanned, stats.returned) == (plan["examined"], plan["returned"])
+
+
+def test_explain_cached():
+    db = DB(keys=["name", "age"], query_cache=4)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    assert db.explain({"age": 1})["cached"] is False
+    db.get_by_query({"age": 1})
+    assert db.explain({"age": 1})["cached"] is True
+    assert db.query_cache_info().hits == 0
+
+    db.add({"name": "sam", "age": 1})
+    assert db.explain({"age": 1})["cached"] is False
+
+
+def test_explain_errors(db):
+    with pytest.raises(ValueError):
+        db.explain({"age": {"$unknown": 1}})
@@ -0,0 +1,190 @@
+import json
+import os
+
+import pytest
+
+from pysondb import DB
+from pysondb import ShardedDB
+from pysondb.cluster import Cluster
+from pysondb.header import header_path
+from pysondb.header import read_header
+from pysondb.header import write_header
+from pysondb.schema import Schema
+
+KEYS = ["name", "age"]
+
+# a value that does not have the keys of the DB
+BAD_DATA = {"1": {"name": "ad", "age": 1}, "2": {"name": "fred"}}
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def write_trusted(filename, data, keys=KEYS, types=None):
+    """Write a file with a header that trusts it, as if a DB with the schema wrote it"""
+    with open(filename, "w") as f:
+        json.dump(data, f)
+    write_header(filename, Schema(keys, types).header(len(data)))
+
+
+def test_commit_writes_header(filename):
+    db = DB(keys=KEYS)
+    db.add_many([{"name": "ad", "age": 1}, {"name": "fred", "age": 2}])
+    db.commit(filename)
+    assert not os.path.isfile(header_path(filename))
+    db.commit(filename, header=True)
+
+    header = read_header(filename)
+    assert header["keys"] == sorted(KEYS)
+    assert header["count"] == 2
+    assert header["size"] == os.path.getsize(filename)
+    assert header["fingerprint"] == Schema(KEYS).fingerprint
+
+
+def test_commit_without_verify_has_no_header(filename):
+    db = DB(keys=KEYS, verify_data=False)
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename, header=True)
+    assert not os.path.isfile(header_path(filename))
+
+
+def test_load_verify_auto_trusts_header(filename):
+    write_trusted(filename, BAD_DATA)
+
+    db = DB(keys=KEYS)
+    db.load(filename, verify="auto")
+    assert db.get_all() == BAD_DATA
+
+    with pytest.raises(KeyError, match="of the id '2'"):
+        DB(keys=KEYS).load(filename)
+
+
+@pytest.mark.parametrize("storage", ("dict", "tuple", "columns"))
+def test_load_verify_auto_round_trip(filename, storage):
+    db = DB(keys=KEYS, storage=storage)
+    db.add_many([{"name": "ad", "age": 1}, {"name": "fred", "age": 2}])
+    db.commit(filename, header=True)
+
+    progress = []
+    new_db = DB(keys=KEYS, storage=storage)
+    new_db.load(filename, verify="auto", progress=lambda read, total: progress.append((read, total)))
+    assert new_db.get_all() == db.get_all()
+    assert progress[-1] == (os.path.getsize(filename),) * 2
+
+
+def test_load_verify_auto_changed_file(filename):
+    write_trusted(filename, BAD_DATA)
+    with open(filename, "a") as f:
+        f.write(" ")
+
+    with pytest.raises(KeyError, match="of the id '2'"):
+        DB(keys=KEYS).load(filename, verify="auto")
+
+
+def test_load_verify_auto_other_schema(filename):
+    write_trusted(filename, BAD_DATA)
+
+    with pytest.raises(KeyError):
+        DB(keys=KEYS, types={"age": int}).load(filename, verify="auto")
+    with pytest.raises(KeyError):
+        DB(keys=["name", "age", "score"]).load(filename, verify="auto")
+
+
+def test_load_verify_auto_dynamic(filename):
+    write_trusted(filename, {"1": {"name": "ad", "age": 1}})
+
+    db = DB(keys=[], dynamic=True)
+    db.load(filename, verify="auto")
+    assert db.keys == sorted(KEYS)
+    assert db.get_all() == {"1": {"name": "ad", "age": 1}}
+
+
+@pytest.mark.parametrize("format", ("binary", "mapped"))
+def test_load_verify_auto_formats(filename, format):
+    db = DB(keys=KEYS, types={"age": int})
+    db.add_many([{"name": "ad", "age": 1}, {"name": "fred", "age": 2}])
+    db.commit(filename, format=format, header=True)
+
+    new_db = DB(keys=KEYS, types={"age": int})
+    new_db.load(filename, verify="auto")
+    assert new_db.get_all() == db.get_all()
+
+
+def test_load_verify_false(filename):
+    with open(filename, "w") as f:
+        json.dump(BAD_DATA, f)
+
+    db = DB(keys=KEYS)
+    db.load(filename, verify=False)
+    assert db.get_all() == BAD_DATA
+
+    with pytest.raises(ValueError):
+        db.load(filename, verify="always")
+
+
+def test_cluster_load_verify_auto(filename):
+    users = DB(keys=KEYS)
+    users.add({"name": "ad", "age": 1})
+    Cluster({"users": users}).commit(filename, header=True)
+
+    c = Cluster({"users": DB(keys=KEYS)})
+    c.load(filename, verify="auto")
+    assert c.users.get_all() == users.get_all()
+
+    c = Cluster({}, dynamic=True)
+    c.load(filename, verify="auto")
+    assert c.users.get_all() == users.get_all()
+
+    with pytest.raises(KeyError):
+        Cluster({"users": DB(keys=["name"])}).load(filename, verify="auto")
+
+
+def test_cluster_load_verify_auto_trusts_header(filename):
+    with open(filename, "w") as f:
+        json.dump({"users": {"keys": KEYS, "data": BAD_DATA}}, f)
+    write_header(filename, {"dbs": {"users": Schema(KEYS).header(len(BAD_DATA))}})
+
+    c = Cluster({"users": DB(keys=KEYS)})
+    c.load(filename, verify="auto")
+    assert c.users.get_all() == BAD_DATA
+
+    with pytest.raises(KeyError, match="of the id '2'"):
+        Cluster({"users": DB(keys=KEYS)}).load(filename)
+
+
+def test_cluster_load_verify_auto_untrusted_db(filename):
+    with open(filename, "w") as f:
+        json.dump({"users": {"keys": KEYS, "data": BAD_DATA}, "posts": {"keys": ["title"], "data": {}}}, f)
+    write_header(filename, {"dbs": {"posts": Schema(["title"]).header(0)}})
+
+    # the DBs without a header of their own are still verified
+    with pytest.raises(KeyError, match="of the id '2'"):
+        Cluster({"users": DB(keys=KEYS), "posts": DB(keys=["title"])}).load(filename, verify="auto")
+
+
+def test_cluster_directory_load_verify_auto(tmp_path):
+    directory = str(tmp_path / "cluster")
+    os.mkdir(directory)
+    users = DB(keys=KEYS)
+    users.add({"name": "ad", "age": 1})
+    Cluster({"users": users}).commit(directory)
+
+    write_trusted(os.path.join(directory, "users.db.json"), BAD_DATA)
+    c = Cluster({"users": DB(keys=KEYS)})
+    c.load(directory, verify="auto")
+    assert c.users.get_all() == BAD_DATA
+
+    with pytest.raises(KeyError):
+        Cluster({"users": DB(keys=KEYS)}).load(directory)
+
+
+def test_sharded_load_verify_auto(filename):
+    db = ShardedDB(keys=KEYS, shards=2, processes=0)
+    db.add_many([{"name": str(i), "age": i} for i in range(10)])
+    db.commit(filename, header=True)
+
+    new_db = ShardedDB(keys=KEYS, shards=2, processes=0)
+    new_db.load(filename, verify="auto")
+    assert new_db.get_all() == db.get_all()
@@ -0,0 +1,146 @@
+import re
+import threading
+import uuid
+
+import pytest
+
+from pysondb import DB
+from pysondb import ShardedDB
+from pysondb.ids import CounterIds
+from pysondb.ids import IdGenerator
+from pysondb.ids import TimeIds
+from pysondb.ids import UUIDIds
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def test_counter_ids():
+    ids = CounterIds()
+    assert [ids(), ids()] == ["1", "2"]
+    assert ids.reserve(3) == ["3", "4", "5"]
+
+    ids.seen(["10", "abc", "7"])
+    assert ids() == "11"
+    ids.seen(["3"])
+    assert ids() == "12"
+
+
+def test_id_generator_is_abstract():
+    with pytest.raises(TypeError):
+        IdGenerator()
+
+    class OnlyReserve(IdGenerator):
+        def reserve(self, n):
+            return ["1"] * n
+
+    with pytest.raises(TypeError):
+        OnlyReserve()
+
+
+def test_time_ids_are_ordered():
+    ids = TimeIds()
+    created = [ids() for _ in range(100)] + ids.reserve(100) + [ids() for _ in range(100)]
+
+    assert all(re.fullmatch(r"[0-9a-f]{32}", i) for i in created)
+    assert created == sorted(created)
+    assert len(set(created)) == len(created)
+
+
+def test_uuid_ids():
+    ids = UUIDIds()
+    created = [ids()] + ids.reserve(10)
+
+    assert all(uuid.UUID(i).version == 4 and uuid.UUID(i).hex == i for i in created)
+    assert len(set(created)) == 11
+
+
+def test_ids_threads():
+    ids = CounterIds()
+    created = []
+
+    def reserve():
+        for _ in range(100):
+            created.extend(ids.reserve(3))
+
+    threads = [threading.Thread(target=reserve) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(created, key=int) == [str(i) for i in range(1, 1201)]
+
+
+@pytest.mark.parametrize("name", ("counter", "time", "uuid"))
+def test_db_id_generator(name):
+    db = DB(keys=["name"], id_generator=name)
+    first = db.add({"name": "ad"})
+    db.add_many([{"name": "fred"}, {"name": "mike"}])
+
+    ids = list(db.get_all())
+    assert ids[0] == first
+    assert len(set(ids)) == 3
+    if name != "uuid":
+        assert ids == sorted(ids, key=lambda i: (len(i), i))
+
+
+def test_db_set_id_generator_by_name():
+    db = DB(keys=["name"])
+    db.set_id_generator("counter")
+    assert db.add({"name": "ad"}) == "1"
+
+    with pytest.raises(ValueError):
+        db.set_id_generator("snowflake")
+
+    with pytest.raises(ValueError):
+        DB(keys=["name"], id_generator="snowflake")
+
+
+def test_db_counter_continues_after_load(filename):
+    db = DB(keys=["name"], id_generator="counter")
+    db.add_many([{"name": "ad"}, {"name": "fred"}])
+    db.commit(filename)
+
+    new_db = DB(keys=["name"], id_generator="counter")
+    new_db.load(filename)
+    assert new_db.add({"name": "mike"}) == "3"
+
+    new_db = DB(keys=["name"])
+    new_db.load(filename)
+    new_db.set_id_generator("counter")
+    assert new_db.reserve_ids(2) == ["3", "4"]
+
+
+def test_db_reserve_ids_default():
+    db = DB(keys=["name"])
+    db.add({"name": "ad"})
+
+    ids = db.reserve_ids(100)
+    assert len(set(ids)) == 100
+    assert all(len(i) == 20 and not db.id_exists(i) for i in ids)
+
+
+def test_db_reserve_ids_custom():
+    db = DB(keys=["name"])
+    ids = iter(range(10))
+    db.set_id_generator(lambda: next(ids))
+
+    assert db.reserve_ids(3) == ["0", "1", "2"]
+    db.add_many([{"name": "ad"}, {"name": "fred"}])
+    assert list(db.get_all()) == ["3", "4"]
+
+
+def test_sharded_db_id_generator(tmp_path):
+    db = ShardedDB(keys=["name"], shards=2, processes=0)
+    db.set_id_generator("counter")
+    db.add_many([{"name": "ad"}, {"name": "fred"}])
+    assert sorted(db.get_all()) == ["1", "2"]
+
+    filename = str(tmp_path / "sharded.json")
+    db.commit(filename)
+    new_db = ShardedDB(keys=["name"], processes=0)
+    new_db.set_id_generator("counter")
+    new_db.load(filename)
+    assert new_db.add({"name": "mike"}) == "3"
@@ -0,0 +1,158 @@
+import json
+import os
+
+import pytest
+
+from pysondb.core import DB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "mike", "age": 3},
+    {"name": "steve", "age": 4},
+    {"name": "fit", "age": 1},
+]
+
+
+@pytest.fixture
+def db_w_index():
+    db = DB(keys=["name", "age"])
+    db.create_index("age")
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+@pytest.fixture
+def rm_file():
+    yield
+    os.remove("strip.pysondb.json")
+
+
+def test_db_create_index():
+    db = DB(keys=["name", "age"])
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    db.create_index("age")
+
+    assert db.indexes == ["age"]
+    assert list(db._indexes["age"].lookup({"$eq": 1})) == list(db.get_by_query({"age": 1}))
+
+
+def test_db_create_index_error():
+    db = DB(keys=["name", "age"])
+
+    with pytest.raises(KeyError):
+        db.create_index("test")
+
+
+def test_db_drop_index(db_w_index):
+    db_w_index.drop_index("age")
+    db_w_index.drop_index("age")
+
+    assert db_w_index.indexes == []
+    assert list(db_w_index.get_by_query({"age": 1}).values()) == [
+        {"name": "ad", "age": 1},
+        {"name": "fit", "age": 1},
+    ]
+
+
+def test_db_index_get_by_query(db_w_index):
+    db_w_index.create_index("name")
+
+    assert list(db_w_index.get_by_query({"age": 1}).values()) == [
+        {"name": "ad", "age": 1},
+        {"name": "fit", "age": 1},
+    ]
+    assert list(db_w_index.get_by_query({"name": "fit", "age": 1}).values()) == [
+        {"name": "fit", "age": 1}
+    ]
+    assert db_w_index.get_by_query({"name": "fit", "age": 2}) == {}
+    assert db_w_index.get_by_query({"age": 10}) == {}
+
+
+def test_db_index_add(db_w_index):
+    _id = db_w_index.add({"name": "new", "age": 1})
+
+    assert _id in db_w_index.get_by_query({"age": 1})
+    assert len(db_w_index.get_by_query({"age": 1})) == 3
+
+
+def test_db_index_update(db_w_index):
+    _id = db_w_index.add({"name": "new", "age": 10})
+
+    db_w_index.update_by_id(_id, {"age": 20})
+    assert db_w_index.get_by_query({"age": 10}) == {}
+    assert db_w_index.get_by_query({"age": 20}) == {_id: {"name": "new", "age": 20}}
+
+    ids = db_w_index.update_by_query({"age": 1}, {"age": 30})
+    assert len(ids) == 2
+    assert db_w_index.get_by_query({"age": 1}) == {}
+    assert list(db_w_index.get_by_query({"age": 30})) == ids
+
+
+@pytest.mark.parametrize("kind", ("hash", "sorted"))
+def test_db_index_update_same_value(kind):
+    db = DB(keys=["name", "age"])
+    db.create_index("age", kind=kind)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    ids = list(db.get_by_query({"age": 1}))
+
+    # the value of the indexed key doesn't change, so the ids keep their order in the index
+    db.update_by_id(ids[0], {"name": "changed", "age": 1})
+    assert list(db.get_by_query({"age": 1})) == ids
+
+    db.update_by_id(ids[0], {"age": 1.0})
+    assert db.get_by_id(ids[0]) == {"name": "changed", "age": 1.0}
+    assert sorted(db.get_by_query({"age": 1})) == sorted(ids)
+
+
+def test_db_index_delete(db_w_index):
+    _id = db_w_index.add({"name": "new", "age": 10})
+
+    assert db_w_index.pop(_id) == {"name": "new", "age": 10}
+    assert db_w_index.get_by_query({"age": 10}) == {}
+
+    assert len(db_w_index.delete_by_query({"age": 1})) == 2
+    assert db_w_index.get_by_query({"age": 1}) == {}
+
+    db_w_index.delete_all()
+    assert db_w_index.get_by_query({"age": 2}) == {}
+    assert len(db_w_index._indexes["age"]) == 0
+
+
+def test_db_index_unhashable_value():
+    db = DB(keys=["name", "tags"])
+    db.create_index("tags")
+    _id = db.add({"name": "ad", "tags": ["a", "b"]})
+
+    assert db.get_by_query({"tags": ["a", "b"]}) == {_id: {"name": "ad", "tags": ["a", "b"]}}
+    db.delete_by_id(_id)
+    assert db.get_by_query({"tags": ["a", "b"]}) == {}
+
+
+@pytest.mark.parametrize("kind", (None, "hash", "sorted"))
+@pytest.mark.parametrize("query", ({"$eq": "nan"}, {"$in": ["nan", 1]}))
+def test_db_index_nan_lookup(kind, query):
+    nan = float("nan")
+    query = {op: nan if arg == "nan" else [nan if a == "nan" else a for a in arg] for op, arg in query.items()}
+    db = DB(keys=["name", "age"])
+    if kind is not None:
+        db.create_index("age", kind=kind)
+    db.add_many([{"name": "ad", "age": nan}, {"name": "fred", "age": 1}])
+
+    # NaN equals nothing, not even itself, an index gives the same answer as the scan
+    expected = [] if "$eq" in query else ["fred"]
+    assert [v["name"] for v in db.get_by_query({"age": query}).values()] == expected
+    assert db.count({"age": query}) == len(expected)
+
+
+@pytest.mark.usefixtures("rm_file")
+def test_db_index_rebuilt_on_load():
+    with open("strip.pysondb.json", "w") as f:
+        json.dump({"1": {"name": "ad", "age": 1}, "2": {"name": "fred", "age": 2}}, f)
+
+    db = DB(keys=["name", "age"])
+    db.create_index("age")
+    db.load("strip.pysondb.json")
+
+    assert list(db._indexes["age"].lookup({"$eq": 2})) == ["2"]
+    assert db.get_by_query({"age": 2}) == {"2": {"name": "fred", "age": 2}}
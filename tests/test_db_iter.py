@@ -0,0 +1,111 @@
+import pytest
+
+from pysondb import DB
+
+DB_TEST_DATA = [{"name": str(i), "age": i % 3} for i in range(10)]
+
+
+@pytest.fixture(params=("dict", "tuple", "columns"))
+def db(request):
+    db = DB(keys=["name", "age"], storage=request.param)
+    db.set_id_generator("counter")
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+def names(pairs):
+    return [v["name"] for _, v in pairs]
+
+
+def test_db_iter(db):
+    assert list(db.iter()) == list(db.get_all().items())
+    assert list(db.iter(batch_size=3)) == list(db.get_all().items())
+
+
+def test_db_iter_offset_limit(db):
+    assert names(db.iter(offset=2, limit=3, batch_size=2)) == ["2", "3", "4"]
+    assert names(db.iter(offset=8, limit=5)) == ["8", "9"]
+    assert names(db.iter(limit=0)) == []
+    assert names(db.iter(offset=20)) == []
+
+
+def test_db_iter_query(db):
+    assert names(db.iter({"age": 1}, batch_size=2)) == ["1", "4", "7"]
+    assert names(db.iter({"age": {"$gte": 1}}, offset=2, limit=2)) == ["4", "5"]
+    assert list(db.iter({"age": 1})) == list(db.get_by_query({"age": 1}).items())
+
+
+def test_db_iter_copies(db):
+    for _, value in db.iter():
+        value["age"] = 5
+    assert db.get_by_query({"age": 5}) == {}
+
+
+def test_db_iter_cursor(db):
+    cursor = db.iter({"age": 1})
+    assert names([next(cursor)]) == ["1"]
+
+    assert names(db.iter({"age": 1}, cursor=cursor.token)) == ["4", "7"]
+    assert names(cursor) == ["4", "7"]
+    assert names(db.iter(cursor=cursor.token)) == ["8", "9"]
+
+
+def test_db_iter_cursor_changes(db):
+    ids = {v["name"]: i for i, v in db.get_all().items()}
+    cursor = db.iter(batch_size=2)
+    assert names([next(cursor), next(cursor), next(cursor)]) == ["0", "1", "2"]
+    token = cursor.token
+
+    db.delete_by_id(ids["1"])
+    db.add({"name": "10", "age": 0})
+    assert names(db.iter(cursor=token, limit=2)) == ["3", "4"]
+
+    # the rest of the batch was already read, the next batch continues after it
+    db.delete_by_id(ids["4"])
+    assert names(cursor) == ["3", "5", "6", "7", "8", "9", "10"]
+
+
+def test_db_iter_cursor_deleted_id(db):
+    ids = {v["name"]: i for i, v in db.get_all().items()}
+    cursor = db.iter()
+    assert names([next(cursor), next(cursor), next(cursor)]) == ["0", "1", "2"]
+
+    db.delete_by_id(ids["2"])
+    assert names(db.iter(cursor=cursor.token, limit=2)) == ["3", "4"]
+
+
+@pytest.mark.parametrize("generator", ("counter", "time"))
+def test_db_iter_cursor_deleted_ids(generator):
+    db = DB(keys=["name", "age"], id_generator=generator)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    ids = {v["name"]: i for i, v in db.get_all().items()}
+    cursor = db.iter()
+    assert names([next(cursor) for _ in range(4)]) == ["0", "1", "2", "3"]
+
+    # the ids tell where to continue, however many of the values before the cursor were deleted
+    db.delete_by_id(ids["3"])
+    db.delete_by_id(ids["1"])
+    assert names(db.iter(cursor=cursor.token, limit=2)) == ["4", "5"]
+
+
+def test_db_iter_errors(db):
+    with pytest.raises(ValueError):
+        db.iter(batch_size=0)
+    with pytest.raises(ValueError):
+        db.iter(cursor="not a token")
+    with pytest.raises(ValueError):
+        db.iter({"age": {"$unknown": 1}})
+
+
+@pytest.mark.parametrize("count", (-12, -3, 0, 1, 3, 12))
+def test_db_values_slices(db, count):
+    ids = list(db.get_all())
+    assert list(db.values(count)) == ids[:count]
+    assert list(db.values(count, last=True)) == ids[-count:]
+
+
+def test_db_iter_thread_safe():
+    db = DB(keys=["name", "age"], thread_safe=True)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    assert len(list(db.iter(batch_size=3))) == len(DB_TEST_DATA)
+    assert len(db.values(4)) == 4
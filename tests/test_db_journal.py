@@ -0,0 +1,190 @@
+import json
+import os
+
+import pytest
+
+from pysondb.core import DB
+from pysondb.journal import Journal
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def read_log(filename):
+    with open(f"{filename}.log", "r") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_db_journal_first_commit_is_full(filename):
+    db = DB(keys=["name", "age"], journal=True)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+
+    with open(filename, "r") as f:
+        assert json.load(f) == {_id: {"name": "ad", "age": 1}}
+    assert not os.path.isfile(f"{filename}.log")
+
+
+def test_db_journal_commit_appends_changes(filename):
+    db = DB(keys=["name", "age"], journal=True)
+    id1 = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+
+    id2 = db.add({"name": "fred", "age": 2})
+    db.update_by_id(id1, {"age": 3})
+    db.delete_by_id(id2)
+    db.commit(filename)
+
+    # the DB file is left untouched
+    with open(filename, "r") as f:
+        assert json.load(f) == {id1: {"name": "ad", "age": 1}}
+
+    assert [e["op"] for e in read_log(filename)] == ["base", "add", "update", "delete"]
+
+
+def test_db_journal_load_replays_log(filename):
+    db = DB(keys=["name", "age"], journal=True)
+    id1 = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+
+    id2 = db.add({"name": "fred", "age": 2})
+    db.update_by_query({"age": 1}, {"name": "changed"})
+    db.add({"name": "mike", "age": 3})
+    db.delete_by_query({"age": 3})
+    db.commit(filename)
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    new_db.create_index("age")
+    new_db.load(filename)
+    assert new_db._db == {id1: {"name": "changed", "age": 1}, id2: {"name": "fred", "age": 2}}
+    assert list(new_db.get_by_query({"age": 2})) == [id2]
+
+    new_db.delete_all()
+    new_db.add({"name": "steve", "age": 4})
+    new_db.commit(filename)
+
+    db.load(filename, force=True)
+    assert list(db._db.values()) == [{"name": "steve", "age": 4}]
+
+
+def test_db_journal_compact(filename):
+    db = DB(keys=["name", "age"], journal=True)
+    db.commit(filename)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+    assert os.path.isfile(f"{filename}.log")
+
+    db.compact(filename)
+    assert not os.path.isfile(f"{filename}.log")
+    with open(filename, "r") as f:
+        assert json.load(f) == {_id: {"name": "ad", "age": 1}}
+
+
+def test_db_journal_compact_size(filename):
+    db = DB(keys=["name", "age"], journal=True, compact_size=100)
+    db.commit(filename)
+
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+    assert os.path.isfile(f"{filename}.log")
+
+    db.add_many([{"name": f"name{i}", "age": i} for i in range(5)])
+    db.commit(filename)
+    assert not os.path.isfile(f"{filename}.log")
+    with open(filename, "r") as f:
+        assert len(json.load(f)) == 6
+
+
+def test_db_journal_truncated_log(filename):
+    db = DB(keys=["name", "age"], journal=True)
+    db.commit(filename)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+
+    with open(f"{filename}.log", "a") as f:
+        f.write('{"op":"add","id":"2","da')
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    with pytest.warns(UserWarning):
+        new_db.load(filename)
+
+    assert new_db._db == {_id: {"name": "ad", "age": 1}}
+
+    new_db.add({"name": "fred", "age": 2})
+    new_db.commit(filename)
+    assert [e["op"] for e in read_log(filename)] == ["base", "add", "add"]
+
+
+def test_db_journal_stale_log_after_crash(filename, monkeypatch):
+    db = DB(keys=["name", "age"], journal=True)
+    _id = db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+    db.update_by_id(_id, {"age": 2})
+    db.commit(filename)
+    db.update_by_id(_id, {"age": 3})
+    db.add({"name": "fred", "age": 20})
+
+    # a crash after the file is written in full, before the old log is removed
+    with monkeypatch.context() as m:
+        m.setattr(Journal, "remove", classmethod(lambda cls, filename: None))
+        db.compact(filename)
+    assert os.path.isfile(f"{filename}.log")
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    with pytest.warns(UserWarning):
+        new_db.load(filename)
+    assert sorted(x["age"] for x in new_db._db.values()) == [3, 20]
+    assert not os.path.isfile(f"{filename}.log")
+
+    # the next commit starts a new log for the new file
+    new_db.delete_by_id(_id)
+    new_db.commit(filename)
+    db.load(filename, force=True)
+    assert [x["age"] for x in db._db.values()] == [20]
+
+
+def test_db_journal_failed_full_write(filename, monkeypatch):
+    db = DB(keys=["name", "age"], journal=True)
+    db.commit(filename)
+    id1 = db.add({"name": "ad", "age": 1})
+
+    with monkeypatch.context() as m:
+        m.setattr("pysondb.core.atomic_write", lambda *args, **kwargs: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            db.compact(filename)
+
+    id2 = db.add({"name": "fred", "age": 2})
+    db.commit(filename)
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    new_db.load(filename)
+    assert sorted(new_db._db) == sorted([id1, id2])
+
+
+@pytest.mark.parametrize("async_commit", (False, True))
+def test_db_journal_failed_append(filename, async_commit):
+    db = DB(keys=["name", "age"], journal=True, async_commit=async_commit)
+    id1 = db.add({"name": "ad", "age": 1})
+    future = db.commit(filename)
+    if future is not None:
+        future.result()
+
+    # the log can't be opened for appending
+    os.mkdir(Journal.log_path(filename))
+    id2 = db.add({"name": "fred", "age": 2})
+    with pytest.raises(OSError):
+        future = db.commit(filename)
+        if future is not None:
+            future.result()
+    os.rmdir(Journal.log_path(filename))
+
+    id3 = db.add({"name": "mike", "age": 3})
+    future = db.commit(filename)
+    if future is not None:
+        future.result()
+
+    new_db = DB(keys=["name", "age"], journal=True)
+    new_db.load(filename)
+    assert sorted(new_db._db) == sorted([id1, id2, id3])
@@ -82,7 +82,8 @@ def test_load_json_decode_error():
     db = DB(keys=[])
 
     try:
-        db.load("strip.pysondb.json")
+        with pytest.warns(UserWarning):
+            db.load("strip.pysondb.json")
 
     except json.JSONDecodeError:
         pytest.fail("Json decode error raised while loading")
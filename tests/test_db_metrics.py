@@ -0,0 +1,161 @@
+import os
+
+import pytest
+
+from pysondb import Cluster
+from pysondb import DB
+from pysondb.metrics import LATENCY_BUCKETS
+from pysondb.metrics import Metrics
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "mike", "age": 1},
+    {"name": "steve", "age": 3},
+]
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=["name", "age"], metrics=True)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+def test_metrics_disabled():
+    db = DB(keys=["name", "age"])
+    assert db.metrics is None
+    assert "add" not in vars(db)
+
+
+def test_metrics_calls(db):
+    db.add({"name": "sam", "age": 5})
+    db.get_by_query({"age": 1})
+    db.get_by_query({"age": 2})
+
+    stats = db.metrics.stats()
+    assert stats["add_many"].calls == 1
+    assert stats["add"].calls == 1
+    assert stats["get_by_query"].calls == 2
+    assert stats["get_by_query"].errors == 0
+    assert stats["get_by_query"].total_time >= stats["get_by_query"].max_time > 0
+    assert len(stats["get_by_query"].histogram) == len(LATENCY_BUCKETS) + 1
+    assert sum(stats["get_by_query"].histogram) == 2
+
+
+def test_metrics_errors(db):
+    with pytest.raises(KeyError):
+        db.add({"name": "sam"})
+    assert db.metrics.stats()["add"].errors == 1
+
+
+def test_metrics_scanned(db):
+    db.get_by_query({"age": 1})
+    stats = db.metrics.stats()
+    assert (stats["get_by_query"].scanned, stats["get_by_query"].returned) == (4, 2)
+
+    db.create_index("age")
+    db.metrics.reset()
+    db.get_by_query({"age": 1, "name": "ad"})
+    db.delete_by_query({"age": 5})
+    stats = db.metrics.stats()
+    assert (stats["get_by_query"].scanned, stats["get_by_query"].returned) == (2, 1)
+    assert (stats["delete_by_query"].scanned, stats["delete_by_query"].returned) == (0, 0)
+
+
+def test_metrics_iter(db):
+    assert len(list(db.iter({"age": 1}, batch_size=1))) == 2
+    stats = db.metrics.stats()
+    assert (stats["iter"].calls, stats["iter"].scanned, stats["iter"].returned) == (3, 4, 2)
+
+    # the batches read by `values` are a part of the call of `values`
+    db.metrics.reset()
+    db.values(2)
+    assert list(db.metrics.stats()) == ["values"]
+
+
+def test_metrics_bytes(db, filename):
+    db.commit(filename)
+    new_db = DB(keys=["name", "age"], metrics=True)
+    new_db.load(filename)
+
+    size = os.path.getsize(filename)
+    assert db.metrics.stats()["commit"].bytes_written == size
+    assert new_db.metrics.stats()["load"].bytes_read == size
+
+
+def test_metrics_journal_bytes(filename):
+    db = DB(keys=["name", "age"], journal=True, metrics=True)
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename)
+    db.add({"name": "fred", "age": 2})
+    db.commit(filename)
+
+    written = db.metrics.stats()["commit"].bytes_written
+    assert written == os.path.getsize(filename) + os.path.getsize(filename + ".log")
+
+
+def test_metrics_async_commit(filename):
+    db = DB(keys=["name", "age"], async_commit=True, metrics=True)
+    db.add({"name": "ad", "age": 1})
+    db.commit(filename).result()
+    assert db.metrics.stats()["commit"].bytes_written == os.path.getsize(filename)
+
+
+def test_metrics_hooks(db):
+    events = []
+    start = db.metrics.on_op_start(lambda op: events.append(("start", op.name)))
+
+    @db.metrics.on_op_end
+    def end(op):
+        events.append(("end", op.name, op.duration > 0, type(op.error), op.returned))
+
+    db.get_by_query({"age": 1})
+    with pytest.raises(KeyError):
+        db.add({"name": "sam"})
+    db.metrics.remove_hook(start)
+    db.metrics.remove_hook(end)
+    db.get_all()
+
+    assert events == [
+        ("start", "get_by_query"), ("end", "get_by_query", True, type(None), 2),
+        ("start", "add"), ("end", "add", True, KeyError, 0),
+    ]
+
+
+def test_metrics_thread_safe():
+    db = DB(keys=["name", "age"], thread_safe=True, metrics=True)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    db.get_by_query({"age": 1})
+    assert db.metrics.stats()["get_by_query"].returned == 2
+
+
+def test_metrics_shared():
+    metrics = Metrics()
+    first = DB(keys=["name", "age"], metrics=metrics)
+    second = DB(keys=["name", "age"], metrics=metrics)
+    first.add({"name": "ad", "age": 1})
+    second.add({"name": "fred", "age": 2})
+    assert first.metrics is second.metrics
+    assert metrics.stats()["add"].calls == 2
+
+
+@pytest.mark.parametrize("directory", (False, True))
+def test_cluster_metrics(tmp_path, directory):
+    path = str(tmp_path / ("cluster" if directory else "cluster.json"))
+    c = Cluster({"users": DB(keys=["name", "age"])}, metrics=True)
+    c.users.add_many([d.copy() for d in DB_TEST_DATA])
+    c.commit(path, layout="directory" if directory else "file")
+
+    new = Cluster({"users": DB(keys=["name", "age"])}, metrics=True)
+    new.load(path)
+
+    written = c.metrics.stats()["commit"].bytes_written
+    assert written > 0
+    assert new.metrics.stats()["load"].bytes_read == written
+    assert Cluster({"users": DB(keys=["name", "age"])}).metrics is None
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from pysondb import DB
+from pysondb import ShardedDB
+from pysondb.cache import query_key
+from pysondb.query import normalize_query
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "dev", "age": 1},
+]
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=["name", "age"], query_cache=2)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+def test_query_cache_hits(db):
+    first = db.get_by_query({"age": 1})
+    assert db.get_by_query({"age": {"$eq": 1}}) == first
+    assert len(first) == 2
+
+    info = db.query_cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (1, 1, 2, 1)
+
+
+def test_query_cache_lru(db):
+    db.get_by_query({"age": 1})
+    db.get_by_query({"age": 2})
+    db.get_by_query({"age": 1})
+    db.get_by_query({"name": "ad"})  # drops {"age": 2}
+
+    db.get_by_query({"age": 1})
+    db.get_by_query({"age": 2})
+    info = db.query_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 4, 2)
+
+
+@pytest.mark.parametrize("change", (
+    lambda db: db.add({"name": "sam", "age": 1}),
+    lambda db: db.add_many([{"name": "sam", "age": 1}]),
+    lambda db: db.update_by_query({"name": "fred"}, {"age": 1}),
+    lambda db: db.update_by_id(list(db.get_by_query({"name": "ad"}))[0], {"age": 3}),
+    lambda db: db.delete_by_query({"name": "ad"}),
+    lambda db: db.pop(list(db.get_by_query({"name": "ad"}))[0]),
+    lambda db: db.delete_all(),
+))
+def test_query_cache_changes(db, change):
+    db.get_by_query({"age": 1})
+    change(db)
+
+    expected = DB(keys=["name", "age"])
+    expected.add_many([dict(v) for v in db.get_all().values()])
+    assert list(db.get_by_query({"age": 1}).values()) == list(expected.get_by_query({"age": 1}).values())
+
+
+def test_query_cache_load(db, filename):
+    db.get_by_query({"age": 1})
+    with open(filename, "w") as f:
+        json.dump({"1": {"name": "sam", "age": 1}}, f)
+
+    db.load(filename, force=True)
+    assert db.get_by_query({"age": 1}) == {"1": {"name": "sam", "age": 1}}
+
+
+def test_query_cache_copies(db):
+    result = db.get_by_query({"age": 1})
+    for value in result.values():
+        value["age"] = 5
+    result.clear()
+
+    assert len(db.get_by_query({"age": 1})) == 2
+    assert db.query_cache_info().hits == 1
+
+
+def test_query_cache_disabled():
+    db = DB(keys=["name", "age"])
+    db.add({"name": "ad", "age": 1})
+    db.get_by_query({"age": 1})
+    assert db.query_cache_info() == (0, 0, 0, 0)
+
+
+def test_query_key():
+    key = query_key(normalize_query({"age": 1}))
+    assert key == query_key(normalize_query({"age": {"$eq": 1}}))
+    assert key != query_key(normalize_query({"age": 1.0}))
+    assert key != query_key(normalize_query({"age": True}))
+    assert query_key(normalize_query({"age": [1]})) != query_key(normalize_query({"age": (1,)}))
+    assert query_key(normalize_query({"age": {"$in": [1, 2]}})) is not None
+
+
+def test_sharded_query_cache():
+    db = ShardedDB(keys=["name", "age"], shards=2, processes=0, query_cache=4)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    db.get_by_query({"age": 1})
+    db.get_by_query({"age": 1})
+
+    info = db.query_cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (2, 2, 8)
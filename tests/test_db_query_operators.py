@@ -0,0 +1,125 @@
+import pytest
+
+from pysondb.core import DB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "mike", "age": 3},
+    {"name": "steve", "age": 4},
+    {"name": "fit", "age": 1},
+]
+
+
+@pytest.fixture(params=[None, "hash", "sorted"])
+def db_w_data(request):
+    db = DB(keys=["name", "age"])
+    if request.param is not None:
+        db.create_index("age", kind=request.param)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+def names(result):
+    return sorted(x["name"] for x in result.values())
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    (
+        ({"age": {"$gt": 2}}, ["mike", "steve"]),
+        ({"age": {"$gte": 2}}, ["fred", "mike", "steve"]),
+        ({"age": {"$lt": 2}}, ["ad", "fit"]),
+        ({"age": {"$gt": 1, "$lte": 3}}, ["fred", "mike"]),
+        ({"age": {"$eq": 3}}, ["mike"]),
+        ({"age": {"$ne": 1}}, ["fred", "mike", "steve"]),
+        ({"age": {"$in": [1, 4]}}, ["ad", "fit", "steve"]),
+        ({"age": {"$in": [1, 4], "$gt": 1}}, ["steve"]),
+        ({"age": {"$gte": 1, "$ne": 2}, "name": "mike"}, ["mike"]),
+        ({"age": {"$gt": "a"}}, []),
+        ({"age": {"$gt": 1, "$lt": 1}}, []),
+    )
+)
+def test_db_get_by_query_operators(db_w_data, query, expected):
+    assert names(db_w_data.get_by_query(query)) == expected
+
+
+def test_db_update_by_query_operators(db_w_data):
+    ids = db_w_data.update_by_query({"age": {"$gte": 3}}, {"name": "old"})
+
+    assert len(ids) == 2
+    assert names(db_w_data.get_by_query({"name": "old"})) == ["old", "old"]
+    assert names(db_w_data.get_by_query({"age": {"$lt": 3}})) == ["ad", "fit", "fred"]
+
+
+def test_db_delete_by_query_operators(db_w_data):
+    assert len(db_w_data.delete_by_query({"age": {"$in": [1, 2]}})) == 3
+    assert names(db_w_data.get_all()) == ["mike", "steve"]
+    assert db_w_data.get_by_query({"age": {"$lte": 2}}) == {}
+
+
+@pytest.mark.parametrize(
+    "query",
+    (
+        {"age": {"$gt": 1, "$regex": "a"}},
+        {"age": {"$in": 1}},
+    )
+)
+def test_db_query_operator_error(query):
+    db = DB(keys=["name", "age"])
+    db.add({"name": "ad", "age": 1})
+
+    with pytest.raises(ValueError):
+        db.get_by_query(query)
+
+
+def test_db_sorted_index_mixed_types():
+    db = DB(keys=["value"])
+    db.create_index("value", kind="sorted")
+    db.add_many([{"value": 1}, {"value": "b"}, {"value": None}, {"value": 2.5}, {"value": "a"}])
+
+    assert list(db.get_by_query({"value": {"$gt": 1}}).values()) == [{"value": 2.5}]
+    assert list(db.get_by_query({"value": {"$lt": "b"}}).values()) == [{"value": "a"}]
+    assert list(db.get_by_query({"value": None}).values()) == [{"value": None}]
+
+
+def test_db_sorted_index_update_delete():
+    db = DB(keys=["age"])
+    db.create_index("age", kind="sorted")
+    id1 = db.add({"age": 5})
+    id2 = db.add({"age": 5})
+
+    db.update_by_id(id1, {"age": 50})
+    assert list(db.get_by_query({"age": {"$gt": 10}})) == [id1]
+
+    db.delete_by_id(id2)
+    assert db.get_by_query({"age": {"$lte": 10}}) == {}
+    assert len(db._indexes["age"]) == 1
+
+
+@pytest.mark.parametrize("count", (10, 1000))
+def test_db_sorted_index_add_many(count):
+    db = DB(keys=["age"])
+    db.set_id_generator("counter")
+    db.create_index("age", kind="sorted")
+    db.add_many([{"age": i % 7} for i in range(count)])
+    db.add_many([{"age": i % 5} for i in range(count)])
+
+    index = db._indexes["age"]
+    pairs = list(zip(index._values[float], index._ids[float]))
+    assert pairs == sorted(pairs)
+    assert len(index) == 2 * count
+
+    # the ids of equal values are found by a bisect
+    ids = list(db.get_by_query({"age": 3}))
+    for _id in ids:
+        db.update_by_id(_id, {"age": 10})
+    assert sorted(db.get_by_query({"age": 10})) == sorted(ids)
+    assert db.get_by_query({"age": 3}) == {}
+
+
+def test_db_create_index_kind_error():
+    db = DB(keys=["age"])
+
+    with pytest.raises(ValueError):
+        db.create_index("age", kind="btree")
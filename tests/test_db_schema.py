@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from pysondb import DB
+from pysondb.cluster import Cluster
+from pysondb.schema import Schema
+
+KEYS = ["name", "age"]
+TYPES = {"name": str, "age": (int, float)}
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def test_schema_validate():
+    schema = Schema(KEYS, TYPES)
+    schema.validate({"age": 1, "name": "ad"})
+    schema.validate({"age": 1.5, "name": "ad"})
+
+    with pytest.raises(KeyError, match="of the id '1'"):
+        schema.validate({"name": "ad"}, "1")
+    with pytest.raises(TypeError, match="'age' of the id '1' must be of type int or float, not str"):
+        schema.validate({"age": "1", "name": "ad"}, "1")
+
+
+def test_db_add_types():
+    db = DB(keys=KEYS, types=TYPES)
+    db.add({"name": "ad", "age": 1})
+
+    with pytest.raises(TypeError, match="'name' must be of type str, not int"):
+        db.add({"name": 1, "age": 1})
+    assert len(db.get_all()) == 1
+
+
+def test_db_add_types_without_verify():
+    db = DB(keys=KEYS, types=TYPES, verify_data=False)
+    db.add({"name": 1, "age": 1})
+    assert len(db.get_all()) == 1
+
+
+def test_db_add_many_reports_position():
+    db = DB(keys=KEYS, types=TYPES)
+
+    with pytest.raises(KeyError, match="at position 2"):
+        db.add_many([{"name": "a", "age": 1}, {"name": "b", "age": 2}, {"name": "c"}])
+    with pytest.raises(TypeError, match="at position 1"):
+        db.add_many([{"name": "a", "age": 1}, {"name": "b", "age": None}])
+    assert db.get_all() == {}
+
+
+def test_db_update_types():
+    db = DB(keys=KEYS, types=TYPES)
+    _id = db.add({"name": "ad", "age": 1})
+    db.update_by_id(_id, {"age": 2})
+
+    with pytest.raises(TypeError, match=f"of the id '{_id}'"):
+        db.update_by_id(_id, {"age": "2"})
+    with pytest.raises(TypeError):
+        db.update_by_query({"name": "ad"}, {"name": None})
+    assert db.get_by_id(_id) == {"name": "ad", "age": 2}
+
+
+def test_db_load_reports_id(filename):
+    with open(filename, "w") as f:
+        json.dump({"1": {"name": "ad", "age": 1}, "2": {"name": "fred"}}, f)
+
+    db = DB(keys=KEYS)
+    with pytest.raises(KeyError, match="of the id '2'"):
+        db.load(filename)
+
+
+@pytest.mark.parametrize("format", ("json", "binary", "mapped"))
+def test_db_load_types(filename, format):
+    db = DB(keys=KEYS)
+    db.add({"name": "ad", "age": 1})
+    _id = db.add({"name": "fred", "age": "2"})
+    db.commit(filename, format=format)
+
+    with pytest.raises(TypeError, match=f"'age' of the id '{_id}'"):
+        DB(keys=KEYS, types=TYPES).load(filename)
+
+    DB(keys=KEYS, types={"name": str}).load(filename)
+
+
+def test_db_dynamic_keeps_types(filename):
+    with open(filename, "w") as f:
+        json.dump({"1": {"name": "ad", "age": "1"}}, f)
+
+    db = DB(keys=[], dynamic=True, types=TYPES)
+    with pytest.raises(TypeError, match="of the id '1'"):
+        db.load(filename)
+
+
+def test_cluster_load_reports_id(filename):
+    with open(filename, "w") as f:
+        json.dump({"users": {"keys": KEYS, "data": {"1": {"name": "ad", "age": 1}, "2": {"age": 2}}}}, f)
+
+    c = Cluster({"users": DB(keys=KEYS)})
+    with pytest.raises(KeyError, match="of the id '2'"):
+        c.load(filename)
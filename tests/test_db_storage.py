@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+from pysondb import DB
+from pysondb.storage import ColumnStore
+from pysondb.storage import TupleStore
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1, "tags": ["a"]},
+    {"name": "fred", "age": 2, "tags": []},
+    {"name": "mike", "age": 3, "tags": ["b", "c"]},
+    {"name": "steve", "age": 4, "tags": []},
+]
+
+STORAGES = ("tuple", "columns")
+
+
+@pytest.fixture(params=STORAGES)
+def storage(request):
+    return request.param
+
+
+@pytest.fixture
+def db(storage):
+    db = DB(keys=["name", "age", "tags"], storage=storage)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+def test_db_storage_type(db, storage):
+    assert isinstance(db._db, {"tuple": TupleStore, "columns": ColumnStore}[storage])
+
+
+def test_db_storage_unknown():
+    with pytest.raises(ValueError):
+        DB(keys=["name"], storage="rows")
+
+
+def test_db_storage_reads(db):
+    assert len(db) == 4
+    assert list(db.get_all().values()) == DB_TEST_DATA
+
+    _id = list(db.get_all())[1]
+    assert db.id_exists(_id)
+    assert db.get_by_id(_id) == DB_TEST_DATA[1]
+    assert list(db.get_by_query({"age": {"$gt": 2}}).values()) == DB_TEST_DATA[2:]
+    assert list(db.values(2, last=True).values()) == DB_TEST_DATA[2:]
+
+
+def test_db_storage_read_copies(db):
+    _id = list(db.get_all())[0]
+    db.get_by_id(_id)["tags"].append("x")
+    assert db.get_by_id(_id) == DB_TEST_DATA[0]
+
+
+def test_db_storage_updates(db):
+    db.create_index("age")
+    ids = list(db.get_all())
+
+    db.update_by_id(ids[0], {"age": 10})
+    assert db.get_by_id(ids[0]) == {"name": "ad", "age": 10, "tags": ["a"]}
+    assert list(db.get_by_query({"age": 10})) == [ids[0]]
+
+    assert db.update_by_query({"age": 2}, {"name": "changed"}) == [ids[1]]
+    assert db.get_by_id(ids[1])["name"] == "changed"
+
+
+def test_db_storage_deletes_keep_order(db):
+    ids = list(db.get_all())
+
+    db.delete_by_id(ids[0])
+    assert list(db.get_all()) == ids[1:]
+    assert list(db.get_all().values()) == DB_TEST_DATA[1:]
+
+    assert db.pop(ids[2]) == DB_TEST_DATA[2]
+    _id = db.add({"name": "new", "age": 5, "tags": []})
+    assert list(db.get_all()) == [ids[1], ids[3], _id]
+    assert db.get_by_id(ids[3]) == DB_TEST_DATA[3]
+
+    db.delete_all()
+    assert len(db) == 0
+    assert db.get_all() == {}
+
+
+def test_db_storage_unverified_values(storage):
+    db = DB(keys=["name", "age"], verify_data=False, storage=storage)
+    first = db.add({"name": "ad", "age": 1})
+    other = db.add({"name": "fred"})
+
+    assert db.get_by_id(other) == {"name": "fred"}
+    db.update_by_id(other, {"age": 2})
+    assert db.get_by_id(other) == {"name": "fred", "age": 2}
+    db.delete_by_id(first)
+    assert db.get_all() == {other: {"name": "fred", "age": 2}}
+
+
+def test_db_storage_commit_load(db, storage, filename):
+    db.commit(filename)
+    with open(filename) as f:
+        assert json.load(f) == db.get_all()
+
+    new_db = DB(keys=[], dynamic=True, storage=storage)
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+    assert type(new_db._db) is type(db._db)
+
+
+def test_db_storage_journal(storage, filename):
+    db = DB(keys=["name", "age"], journal=True, storage=storage)
+    db.commit(filename)
+    _id = db.add({"name": "ad", "age": 1})
+    db.update_by_id(_id, {"age": 2})
+    db.commit(filename)
+
+    new_db = DB(keys=["name", "age"], journal=True, storage=storage)
+    new_db.load(filename)
+    assert new_db.get_all() == {_id: {"name": "ad", "age": 2}}
+
+
+def test_db_storage_views(storage):
+    db = DB(keys=["name", "age"], copy_on_read=False, storage=storage)
+    _id = db.add({"name": "ad", "age": 1})
+
+    view = db.get_all()
+    assert view[_id] == {"name": "ad", "age": 1}
+    assert view.copy() == {_id: {"name": "ad", "age": 1}}
+    assert db.pop(_id) == {"name": "ad", "age": 1}
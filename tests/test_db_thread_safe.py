@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from pysondb.core import DB
+from pysondb.locks import RWLock
+
+
+def test_db_not_thread_safe_by_default():
+    db = DB(keys=["name"])
+
+    assert db._lock is None
+    assert "get_by_query" not in vars(db)
+    with db.write_batch():
+        db.add({"name": "ad"})
+    assert len(db) == 1
+
+
+def test_db_thread_safe_concurrent_writes_and_reads():
+    db = DB(keys=["name", "n"], thread_safe=True)
+    errors = []
+
+    def writer(i):
+        for j in range(100):
+            db.add({"name": f"w{i}", "n": j})
+
+    def reader():
+        try:
+            for _ in range(20):
+                db.get_by_query({"n": 1})
+                db.values(count=3, last=True)
+                len(repr(db))
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(db) == 400
+    assert len(db.get_by_query({"n": 1})) == 4
+
+
+def test_db_write_batch_excludes_readers():
+    db = DB(keys=["name"], thread_safe=True)
+    events = []
+    started = threading.Event()
+
+    def read():
+        started.wait()
+        events.append(("read", len(db.get_all())))
+
+    t = threading.Thread(target=read)
+    t.start()
+
+    with db.write_batch():
+        _id = db.add({"name": "ad"})
+        started.set()
+        time.sleep(0.05)
+        db.add({"name": "fred"})
+        # the lock is reentrant, so the methods that call other methods work in a batch
+        assert db.pop(_id) == {"name": "ad"}
+        events.append(("batch", len(db)))
+
+    t.join()
+    assert events == [("batch", 1), ("read", 1)]
+
+
+def test_rwlock_concurrent_readers():
+    lock = RWLock()
+    inside = []
+    barrier = threading.Barrier(3, timeout=2)
+
+    def read():
+        with lock.read():
+            inside.append(1)
+            barrier.wait()
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(inside) == 3
+
+
+def test_rwlock_no_upgrade():
+    lock = RWLock()
+
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+
+    with lock.write():
+        with lock.read():
+            with lock.write():
+                pass
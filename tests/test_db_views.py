@@ -0,0 +1,73 @@
+import pytest
+
+from pysondb.core import DB
+from pysondb.views import FrozenList
+from pysondb.views import FrozenView
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=["name", "tags"], copy_on_read=False)
+    db.add_many([
+        {"name": "ad", "tags": ["a", "b"]},
+        {"name": "fred", "tags": [{"x": 1}]},
+    ])
+    return db
+
+
+def test_db_view_get_by_id(db):
+    _id = db.add({"name": "test", "tags": []})
+    data = db.get_by_id(_id)
+
+    assert isinstance(data, FrozenView)
+    assert data == {"name": "test", "tags": []}
+    assert data["name"] == "test"
+    assert db.get_by_id("34") is None
+
+
+def test_db_view_is_read_only(db):
+    data = db.get_by_query({"name": "ad"})
+    view = list(data.values())[0]
+
+    with pytest.raises(TypeError):
+        view["name"] = "changed"
+
+    with pytest.raises(AttributeError):
+        view["tags"].append("c")
+
+    with pytest.raises(TypeError):
+        db.get_by_query({"name": "fred"}).popitem()[1]["tags"][0]["x"] = 2
+
+    assert list(db.get_all().values()) == [
+        {"name": "ad", "tags": ["a", "b"]},
+        {"name": "fred", "tags": [{"x": 1}]},
+    ]
+
+
+def test_db_view_get_all(db):
+    data = db.get_all()
+
+    assert isinstance(data, FrozenView)
+    assert len(data) == 2
+    assert isinstance(list(data.values())[0]["tags"], FrozenList)
+    assert list(data.values())[0]["tags"] == ["a", "b"]
+
+    with pytest.raises(TypeError):
+        data["1"] = {"name": "test", "tags": []}
+
+
+def test_db_view_copy(db):
+    data = db.values(count=1)
+    copy = list(data.values())[0].copy()
+    copy["tags"].append("c")
+
+    assert isinstance(copy, dict)
+    assert list(db.values(count=1).values())[0]["tags"] == ["a", "b"]
+
+
+def test_db_view_pop(db):
+    _id = db.add({"name": "test", "tags": []})
+
+    assert db.pop(_id) == {"name": "test", "tags": []}
+    assert db.pop(_id) is None
+    assert len(db) == 2
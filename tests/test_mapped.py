@@ -0,0 +1,97 @@
+import pytest
+
+from pysondb import DB
+from pysondb import MappedDB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "mike\n", "age": 3},
+    {"name": "stéve", "age": 4},
+]
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.mapped")
+
+
+@pytest.fixture
+def db():
+    db = DB(keys=["name", "age"])
+    ids = iter(["3", "10", "2", "ü"])
+    db.set_id_generator(lambda: next(ids))
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+@pytest.fixture
+def mapped_db(db, filename):
+    db.commit(filename, format="mapped")
+    with MappedDB(filename) as mapped_db:
+        yield mapped_db
+
+
+def test_mapped_db_get_by_id(db, mapped_db):
+    assert len(mapped_db) == 4
+    assert mapped_db.keys == ["age", "name"]
+
+    for _id in db.get_all():
+        assert mapped_db.id_exists(_id)
+        assert mapped_db.get_by_id(_id) == db.get_by_id(_id)
+
+    for _id in ("1", "30", "", "zz"):
+        assert not mapped_db.id_exists(_id)
+        assert mapped_db.get_by_id(_id) is None
+    assert mapped_db.get_by_id(10) == DB_TEST_DATA[1]
+
+
+def test_mapped_db_reads(db, mapped_db):
+    assert mapped_db.get_all() == db.get_all()
+    assert list(mapped_db.get_all()) == list(db.get_all())
+    assert mapped_db.get_by_query({"age": {"$gte": 3}}) == db.get_by_query({"age": {"$gte": 3}})
+
+    for count in (1, 3, 10):
+        assert mapped_db.values(count) == db.values(count)
+        assert mapped_db.values(count, last=True) == db.values(count, last=True)
+    assert mapped_db.values(0) == {}
+
+
+def test_mapped_db_empty(filename):
+    DB(keys=["name"]).commit(filename, format="mapped")
+
+    with MappedDB(filename) as mapped_db:
+        assert len(mapped_db) == 0
+        assert mapped_db.get_by_id("1") is None
+        assert mapped_db.get_all() == {}
+        assert mapped_db.values(2, last=True) == {}
+
+
+def test_mapped_db_invalid_file(db, filename):
+    db.commit(filename)
+    with pytest.raises(ValueError):
+        MappedDB(filename)
+
+    db.commit(filename, format="mapped")
+    with open(filename, "rb") as f:
+        data = f.read()
+    with open(filename, "wb") as f:
+        f.write(data[:-4])
+    with pytest.raises(ValueError):
+        MappedDB(filename)
+
+
+def test_db_load_mapped(db, filename):
+    db.commit(filename, format="mapped")
+
+    new_db = DB(keys=["name", "age"])
+    new_db.load(filename)
+    assert new_db.get_all() == db.get_all()
+
+    new_db = DB(keys=[], dynamic=True)
+    new_db.load(filename)
+    assert new_db.keys == ["age", "name"]
+    assert new_db.get_all() == db.get_all()
+
+    with pytest.raises(KeyError):
+        DB(keys=["name"]).load(filename)
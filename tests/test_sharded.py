@@ -0,0 +1,147 @@
+import json
+import os
+
+import pytest
+
+from pysondb import ShardedDB
+
+DB_TEST_DATA = [
+    {"name": "ad", "age": 1},
+    {"name": "fred", "age": 2},
+    {"name": "mike", "age": 3},
+    {"name": "steve", "age": 4},
+    {"name": "fit", "age": 1},
+]
+
+
+@pytest.fixture
+def db():
+    db = ShardedDB(keys=["name", "age"], shards=4, processes=0)
+    db.add_many([d.copy() for d in DB_TEST_DATA])
+    return db
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "sharded.json")
+
+
+def names(result):
+    return sorted(x["name"] for x in result.values())
+
+
+def test_sharded_db_routing(db):
+    assert len(db) == 5
+    assert sum(len(shard) for shard in db._shards) == 5
+
+    for _id in db.get_all():
+        assert db._shard(_id).id_exists(_id)
+        assert db.id_exists(_id)
+        assert db.get_by_id(_id) is not None
+
+
+def test_sharded_db_crud(db):
+    _id = db.add({"name": "new", "age": 10})
+    assert db.get_by_id(_id) == {"name": "new", "age": 10}
+
+    db.update_by_id(_id, {"age": 11})
+    assert db.get_by_id(_id) == {"name": "new", "age": 11}
+
+    assert names(db.get_by_query({"age": 1})) == ["ad", "fit"]
+    assert len(db.update_by_query({"age": 1}, {"name": "changed"})) == 2
+    assert names(db.get_by_query({"name": "changed"})) == ["changed", "changed"]
+
+    assert db.pop(_id) == {"name": "new", "age": 11}
+    assert len(db.delete_by_query({"age": {"$gte": 3}})) == 2
+    db.delete_by_id(list(db.get_all())[0])
+    assert len(db) == 2
+
+    db.delete_all()
+    assert len(db) == 0
+
+
+def test_sharded_db_values(db):
+    assert len(db.values(count=3)) == 3
+    assert len(db.values(count=2, last=True)) == 2
+    assert len(db.values(count=10)) == 5
+
+
+def test_sharded_db_errors(db):
+    with pytest.raises(KeyError):
+        db.add({"name": "test"})
+
+    with pytest.raises(KeyError):
+        db.update_by_query({"test": 1}, {"age": 2})
+
+    with pytest.raises(ValueError):
+        ShardedDB(keys=["name"], shards=0)
+
+
+@pytest.mark.parametrize("_id", ("zzz", "1"))
+def test_sharded_db_update_by_id_key_error(db, _id):
+    with pytest.raises(KeyError):
+        db.update_by_id(_id, {"bad": 1})
+
+    # a shard without values doesn't check the keys itself
+    with pytest.raises(KeyError):
+        ShardedDB(keys=["name"], shards=4, processes=0).update_by_id(_id, {"bad": 1})
+
+
+@pytest.mark.parametrize("processes", (0, 2))
+def test_sharded_db_commit_load(db, filename, processes):
+    db.create_index("age", kind="sorted")
+    db.commit(filename)
+
+    with open(filename, "r") as f:
+        manifest = json.load(f)
+    assert manifest == {"keys": ["age", "name"], "shards": [f"sharded.json.{i}" for i in range(4)]}
+
+    new_db = ShardedDB(keys=["name", "age"], shards=1, processes=processes)
+    new_db.create_index("age", kind="sorted")
+    new_db.load(filename)
+    new_db.close()
+
+    assert new_db.shards == 4
+    assert new_db.keys == ["age", "name"]
+    assert new_db.get_all() == db.get_all()
+    assert names(new_db.get_by_query({"age": {"$lt": 2}})) == ["ad", "fit"]
+
+
+def test_sharded_db_dynamic_load(db, filename):
+    db.commit(filename)
+
+    new_db = ShardedDB(keys=[], dynamic=True, processes=0)
+    new_db.load(filename)
+    assert new_db.keys == ["age", "name"]
+    assert new_db.get_all() == db.get_all()
+
+
+def test_sharded_db_load_uncommitted(db, filename):
+    db.commit(filename)
+    db.add({"name": "new", "age": 10})
+
+    with pytest.warns(UserWarning):
+        db.load(filename)
+    assert len(db) == 6
+
+    db.load(filename, force=True)
+    assert len(db) == 5
+
+
+def test_sharded_db_commit_only_dirty_shards(db, filename):
+    db.commit(filename)
+
+    _id = db.add({"name": "new", "age": 10})
+    changed = db._shards.index(db._shard(_id))
+    for i in range(4):
+        os.utime(f"{filename}.{i}", ns=(0, 0))
+    db.commit(filename)
+
+    assert [os.stat(f"{filename}.{i}").st_mtime_ns != 0 for i in range(4)] == [i == changed for i in range(4)]
+
+
+def test_sharded_db_load_key_error(db, filename):
+    db.commit(filename)
+
+    with pytest.raises(KeyError):
+        ShardedDB(keys=["name"], processes=0).load(filename)
@@ -0,0 +1,143 @@
+import io
+import json
+
+import pytest
+
+from pysondb.cluster import Cluster
+from pysondb.core import DB
+from pysondb.stream import JSONObjectStream
+
+TEST_DATA = {
+    "1": {"name": "ad", "age": 1, "tags": ["a", "b"], "score": 12345.678},
+    "13": {"name": "fréd", "age": 2, "tags": [], "score": -1e10},
+    "14": {"name": "mike \"m\"", "age": 3, "tags": [{"x": None}], "score": 0},
+}
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "strip.pysondb.json")
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 7, 64 * 1024))
+@pytest.mark.parametrize("indent", (None, 4))
+def test_stream_iter_object(chunk_size, indent):
+    f = io.BytesIO(json.dumps(TEST_DATA, indent=indent, ensure_ascii=False).encode())
+    stream = JSONObjectStream(f, chunk_size=chunk_size)
+
+    assert dict(stream.iter_object()) == TEST_DATA
+    stream.finish()
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 24))
+def test_stream_iter_object_scalars(chunk_size):
+    # the numbers are cut at every position by one of the chunk sizes
+    data = {"1": 1.25, "2": -0.5e-10, "3": 12345678901234567890, "4": "x", "5": [1.5, 2], "6": True, "7": None, "8": 0}
+    text = json.dumps(data, separators=(",", ":"))
+    stream = JSONObjectStream(io.BytesIO(text.encode()), chunk_size=chunk_size)
+
+    assert dict(stream.iter_object()) == data
+    stream.finish()
+
+
+@pytest.mark.parametrize("text", ("{}", " { } ", "{\"1\": 10}"))
+def test_stream_small_objects(text):
+    stream = JSONObjectStream(io.BytesIO(text.encode()), chunk_size=1)
+
+    assert dict(stream.iter_object()) == json.loads(text)
+    stream.finish()
+
+
+@pytest.mark.parametrize("text", ("{", "[]", "{\"1\": {}", "{\"1\": {},}", "{\"1\" {}}", "{1: {}}", "{} {}"))
+def test_stream_decode_error(text):
+    stream = JSONObjectStream(io.BytesIO(text.encode()), chunk_size=2)
+
+    with pytest.raises(json.JSONDecodeError):
+        dict(stream.iter_object())
+        stream.finish()
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 7, 64 * 1024))
+@pytest.mark.parametrize(
+    "value",
+    (TEST_DATA, [], {}, ["}", "{\"", "\\", ["]"]], "a \"b\" {", 12345.678, None, True)
+)
+def test_stream_skip_value(chunk_size, value):
+    text = json.dumps({"skipped": value, "read": [value]}, indent=2)
+    stream = JSONObjectStream(io.BytesIO(text.encode()), chunk_size=chunk_size)
+
+    keys = stream.iter_keys()
+    assert next(keys) == "skipped"
+    stream.skip_value()
+    assert next(keys) == "read"
+    assert stream.read_value() == [value]
+    assert list(keys) == []
+    stream.finish()
+
+
+def test_stream_skip_value_unterminated():
+    stream = JSONObjectStream(io.BytesIO(b'{"a": [1, {"b": "]}"}'), chunk_size=2)
+
+    next(stream.iter_keys())
+    with pytest.raises(json.JSONDecodeError):
+        stream.skip_value()
+
+
+def test_stream_progress():
+    text = json.dumps(TEST_DATA).encode()
+    calls = []
+    stream = JSONObjectStream(io.BytesIO(text), chunk_size=10, progress=lambda r, t: calls.append((r, t)),
+                              total=len(text))
+    dict(stream.iter_object())
+
+    assert calls[0] == (10, len(text))
+    assert calls[-1] == (len(text), len(text))
+
+
+def test_db_load_progress(filename):
+    with open(filename, "w") as f:
+        json.dump(TEST_DATA, f)
+
+    calls = []
+    db = DB(keys=["name", "age", "tags", "score"])
+    db.load(filename, progress=lambda r, t: calls.append((r, t)))
+
+    assert db._db == TEST_DATA
+    assert calls[-1][0] == calls[-1][1]
+
+
+def test_db_load_verify_error_keeps_db(filename):
+    with open(filename, "w") as f:
+        json.dump({"1": {"name": "ad"}, "2": {"age": 1}}, f)
+
+    db = DB(keys=["name"])
+    with pytest.raises(KeyError):
+        db.load(filename)
+
+    assert db._db == {}
+
+
+def test_cluster_load_progress(filename):
+    with open(filename, "w") as f:
+        json.dump({
+            "posts": {"data": {"2": {"title": "hello"}}, "keys": ["title"]},
+            "users": {"keys": ["name", "age", "tags", "score"], "data": TEST_DATA},
+        }, f)
+
+    calls = []
+    c = Cluster({}, dynamic=True)
+    c.load(filename, progress=lambda r, t: calls.append((r, t)))
+
+    assert c.databases == ["posts", "users"]
+    assert c.users._db == TEST_DATA
+    assert c.posts.keys == ["title"]
+    assert calls[-1][0] == calls[-1][1]
+
+
+def test_cluster_load_missing_db(filename):
+    with open(filename, "w") as f:
+        json.dump({"users": {"keys": ["name"], "data": {}}}, f)
+
+    c = Cluster({"posts": DB(keys=["title"])})
+    with pytest.raises(KeyError):
+        c.load(filename)